@@ -0,0 +1,92 @@
+"""
+准入控制 (admission control)：尖峰時段以有上限的並行數與等待佇列保護 worker，超出時快速拒絕。
+
+- `ConcurrencyLimiter`：每個路由群組同時處理的請求數上限；額滿時最多 `queue_size` 個請求排隊，
+  每個請求最多等待 `queue_timeout` 秒，因此被接受的請求延遲有上限；佇列已滿或等待逾時則回傳 503 + `Retry-After`
+- `RateLimiter`：每個用戶端一個 token bucket，限制高成本請求 (未篩選的 `/words`) 的頻率，超出時回傳 429
+
+皆為每個 worker 各自持有、只在事件迴圈中使用 (不需加鎖)。
+"""
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Optional, Tuple
+
+ADMITTED = "admitted"  # 直接取得名額
+QUEUED = "queued"  # 排隊後取得名額
+REJECTED = "rejected"  # 佇列已滿
+TIMEOUT = "timeout"  # 排隊逾時
+
+
+class ConcurrencyLimiter:
+    def __init__(self, limit: int, queue_size: int, queue_timeout: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    async def acquire(self) -> str:
+        """取得名額時回傳 ADMITTED / QUEUED，否則回傳 REJECTED / TIMEOUT (未取得名額)。"""
+        # 有人排隊時名額必定已滿 (release() 會直接轉交)，因此只需比較 active
+        if self.active < self.limit:
+            self.active += 1
+            return ADMITTED
+        while self._waiters and self._waiters[0].done():
+            self._waiters.popleft()  # 逾時離開的請求
+        if self.queued >= self.queue_size:
+            return REJECTED
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout=self.queue_timeout)
+            return QUEUED
+        except asyncio.TimeoutError:
+            # 逾時與釋放名額可能同時發生：名額已轉交給此請求時仍視為取得
+            if waiter.done() and not waiter.cancelled():
+                return QUEUED
+            return TIMEOUT
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        """把名額直接轉交給下一個仍在等待的請求 (不經過 active 遞減)，沒有等待者時才歸還。"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+class RateLimiter:
+    """每個用戶端一個 token bucket：每秒補充 `rate` 個，最多累積 `burst` 個；最多記住 `max_clients` 個用戶端。"""
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # client -> (tokens, 更新時間)
+
+    def allow(self, client: str, now: Optional[float] = None) -> Tuple[bool, float]:
+        """回傳 (是否允許, 需等待幾秒才會有下一個 token)。"""
+        now = time.monotonic() if now is None else now
+        tokens, updated = self._buckets.pop(client, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / self.rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
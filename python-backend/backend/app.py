@@ -1,120 +1,833 @@
 import argparse
-import hashlib
+import asyncio
+import gc
+import gzip
 import json
 import logging
+import math
 import os
+import socket
+import time
+import tracemalloc
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
 from logging.handlers import RotatingFileHandler
+from urllib.parse import parse_qs
+from typing import Callable, Dict, Hashable, List, Literal, Optional, Set, Tuple, TYPE_CHECKING
 
-import uvicorn
-from dotenv import load_dotenv
-from fastapi import Body, FastAPI, HTTPException, Query
+from fastapi import APIRouter, Body, FastAPI, Header, HTTPException, Path, Query, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.params import Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from starlette.responses import JSONResponse
-
+from starlette.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+
+import admission
+import cache
+import cdn
+import changes
+import events
+import grading
+import ingest
+import maintenance
+import metrics
 import models
-from database import SessionLocal, engine
-from schemas import *
-
-# 新增命令列參數處理
-parser = argparse.ArgumentParser(description="英簡單後端 API 服務")
-parser.add_argument('--env', type=str, default='.env', help='環境變數設定檔路徑')
-parser.add_argument('--log-file', type=str, default='api.log', help='日誌檔案路徑')
-parser.add_argument('--debug', action='store_true', help='啟用偵錯模式')
-args = parser.parse_args()
-
-# 設置日誌
-log_dir = os.path.dirname(args.log_file)
-if log_dir and not os.path.exists(log_dir):
-    os.makedirs(log_dir)
-
-logging.basicConfig(
-    level=logging.DEBUG if args.debug else logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        RotatingFileHandler(args.log_file, maxBytes=10 ** 6, backupCount=5)
-    ]
+import negotiation
+import profiling
+import readmodel
+import sqlstats
+import srs
+import staging
+import versioning
+from config import Settings
+from database import SessionLocal, get_engine, init_engine
+from schemas import (
+    ADD_PRACTICES_ADAPTER,
+    ADD_WORDS_ADAPTER,
+    LEARNER_ID_PATTERN,
+    REPLACE_TOPIC_ADAPTER,
+    AddPracticesRequestSchema,
+    AddPracticesResponseSchema,
+    AddWordsRequestSchema,
+    AddWordsResponseSchema,
+    AllocationReportResponse,
+    AllocationStatSchema,
+    BundleManifestResponse,
+    ChoiceSchema,
+    ChangesResponse,
+    ChoiceStatsSchema,
+    DefinitionSchema,
+    DeletedItemSchema,
+    EntryChangeSchema,
+    EntryStatsSchema,
+    ExampleSchema,
+    GradeRequestSchema,
+    GradeResponseSchema,
+    GradeResultSchema,
+    IngestJobResponse,
+    PartResponse,
+    PartsResponse,
+    PracticeEntrySchema,
+    PracticeResponse,
+    PracticeStatsResponse,
+    PronunciationSchema,
+    QuestionStatsSchema,
+    ReviewBatchResponse,
+    ReviewGradeRequestSchema,
+    ReviewGradeResponseSchema,
+    ReviewItemSchema,
+    ReviewStateSchema,
+    ReplaceTopicRequestSchema,
+    ReplaceTopicResponseSchema,
+    RouteAllocationSchema,
+    SqlStatementSchema,
+    SqlStatsResponse,
+    TopicsResponse,
+    VerbFormSchema,
+    WordChangeSchema,
+    WordSchema,
 )
+
+if TYPE_CHECKING:
+    # 只在設定 CORPUS_FILE / BUNDLE_DIR 時才匯入，避免增加冷啟動時間
+    import bundles
+    import corpusfile
+
 logger = logging.getLogger("quiz-api")
 
-# 載入環境變數
-load_dotenv(args.env)
-HOST = os.getenv("HOST", "0.0.0.0")
-PORT = int(os.getenv("PORT", 8000))
-REMOTE_HOST = os.getenv("REMOTE_HOST", "api.example.com")
-REMOTE_PORT = int(os.getenv("REMOTE_PORT", 443))
-BEARER_TOKEN = os.getenv("BEARER_TOKEN")
-ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "")
-ROOT_PATH = os.getenv("ROOT_PATH", "/api/v1")
-
-if not BEARER_TOKEN:
-    logger.warning("未設置 BEARER_TOKEN 環境變數，API 安全性受到影響")
-
-logger.info(f"啟動 API 伺服器於 {HOST}:{PORT}")
-logger.info(f"API 公開位址: {REMOTE_HOST}")
-logger.info(f"根路徑: {ROOT_PATH}")
-
-# 檢查資料庫
-if not os.path.exists(os.path.dirname(engine.url.database)):
-    os.makedirs(os.path.dirname(engine.url.database))
-    logger.info(f"已創建資料庫目錄: {os.path.dirname(engine.url.database)}")
-
-# 創建資料庫表格
-try:
-    models.Base.metadata.create_all(bind=engine)
-    logger.info("資料庫表格已創建或更新")
-except Exception as e:
-    logger.error(f"資料庫初始化錯誤: {e}")
-    raise
-
-app = FastAPI(
-    title="NTUST 英簡單後端",
-    description=(
-        "提供對題目、單字和習題提供增查功能。\n"
-        "可透過本 API 查詢各類 part 與 topic 對應的題目、單字，以及提交新的練習項目。"
-    ),
-    servers=[{"url": f"https://{REMOTE_HOST}", "description": "公開 API 位址"}],
-    version="1.0.0",
-    docs_url="/docs",
-    redoc_url="/redoc",
-    openapi_url="/openapi.json",
-    root_path=ROOT_PATH
-)
+# 匯入本模組不會產生任何副作用 (不解析命令列、不讀取 .env、不連線資料庫)，
+# 應用程式由 `create_app()` 建立；`uvicorn app:app` 則透過模組層級的 `__getattr__` 延遲建立。
+router = APIRouter()
+# 只在 `PROFILING=1` 時加入應用程式的診斷路由
+profiling_router = APIRouter()
+
+
+@dataclass
+class Services:
+    """每個 worker 進程各自持有的執行期狀態，透過全域資料版本協調失效。"""
+    settings: Settings
+    data_versions: versioning.VersionWatcher
+    read_cache: cache.ResponseCache
+    changes_cache: cache.ResponseCache  # `/changes` 的回應，與讀取快取分開，不會淘汰預熱的回應
+    changes_versions: cache.RecentKeys  # 本 worker 在 `/changes` 回應過的 `version`，只有這些 `since` 會放入快取
+    read_model: readmodel.ReadModelStore
+    corpus_file: Optional["corpusfile.CorpusFileStore"]
+    bundles: Optional["bundles.BundleStore"]
+    events: events.ChangeBroadcaster
+    answer_maps: grading.AnswerMapCache
+    attempt_log: grading.AttemptLog
+    metrics: metrics.Registry
+    purger: Optional[cdn.Purger]
+    sql_stats: sqlstats.SqlStats
+    ingest: Optional[ingest.IngestWriter]  # 只在 `INGEST_QUEUE=1` 時建立
+    maintenance: Optional[maintenance.MaintenanceScheduler]  # `MAINTENANCE_INTERVAL=0` 時停用
+    flights: cache.SingleFlight = field(default_factory=cache.SingleFlight)
+    profiler: profiling.RequestProfiler = field(default_factory=profiling.RequestProfiler)
+    allocations: profiling.AllocationTracker = field(default_factory=profiling.AllocationTracker)
+    ready: asyncio.Event = field(default_factory=asyncio.Event)  # 啟動預熱完成後設定，供 /ready 使用
+    background_tasks: Set[asyncio.Task] = field(default_factory=set)
+
+
+def get_services(request: Request) -> Services:
+    return request.app.state.services
+
+
+def configure_logging(settings: Settings):
+    """設置日誌，若已設置過 (例如由主進程) 則略過。"""
+    root = logging.getLogger()
+    if root.handlers:
+        return
+
+    log_dir = os.path.dirname(settings.log_file)
+    if log_dir and not os.path.exists(log_dir):
+        os.makedirs(log_dir)
+
+    logging.basicConfig(
+        level=logging.DEBUG if settings.debug else logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.StreamHandler(),
+            RotatingFileHandler(settings.log_file, maxBytes=10 ** 6, backupCount=5)
+        ]
+    )
+
+
+async def flush_attempts_periodically(attempt_log: grading.AttemptLog):
+    """定時將作答紀錄緩衝區寫入資料庫。"""
+    while True:
+        await asyncio.sleep(min(attempt_log.flush_interval, 1.0))
+        if attempt_log.due():
+            try:
+                await asyncio.to_thread(attempt_log.flush)
+            except Exception as e:
+                logger.error(f"寫入作答紀錄失敗: {e}")
+
+
+def warm_read_cache(services: Services, model: readmodel.ReadModel) -> int:
+    """
+    預先產生每個 (part, topic) 的 `/words`、`/practice`，以及未篩選的 `/words`、`/topics`、`/parts` 的 JSON 本文
+    並放入讀取快取，回傳放入的筆數。最多使用快取容量的一半，保留空間給其他查詢與 MessagePack / CBOR 本文。
+    """
+    limit = services.read_cache.max_entries // 2
+    # 空的集合在端點中回傳 404 (快取命中時不會再檢查)，不預熱；依 (part, topic) 分組的集合必定不是空的
+    renders = [
+        (key, render) for key, items, render in (
+            (("words", None, None), model.all_words, lambda: words_body(model.all_words)),
+            (("topics", None), model.all_topics, lambda: topics_body(model.all_topics)),
+            (("parts", None), model.all_parts, lambda: parts_body(model.all_parts)),
+        ) if items
+    ]
+    renders += [(("topics", part), lambda t=topics: topics_body(t)) for part, topics in model.topics_by_part.items()]
+    renders += [(("parts", topic), lambda p=parts: parts_body(p)) for topic, parts in model.parts_by_topic.items()]
+    for (part, topic), words in model.words_by_topic.items():
+        renders.append((("words", part, topic), lambda w=words: words_body(w)))
+    for (part, topic), entries in model.entries_by_topic.items():
+        renders.append((("practice", part, topic), lambda e=entries: practice_body(e)))
+    if len(renders) > limit:
+        logger.warning(f"讀取快取容量不足，只預熱 {limit} / {len(renders)} 個回應 (可調整 READ_CACHE_SIZE)")
+    for key, render in renders[:limit]:
+        services.read_cache.put(key, model.version, render())
+    return min(len(renders), limit)
+
+
+async def warm_up(services: Services):
+    """
+    預先建立唯讀模型與讀取快取 (使用語料檔時則是建立 / 開啟語料檔)，避免部署或匯入後第一波請求同時重算。
+    啟動時完成後才設定 `services.ready`；重複呼叫時同一資料版本只執行一次。
+    """
+    started = time.perf_counter()
+    try:
+        if services.corpus_file is not None:
+            # 語料檔的回應直接切自 mmap，不需放入讀取快取
+            corpus = await current_corpus_file(services)
+            version, warmed = (corpus.version if corpus is not None else None), 0
+        else:
+            model = await current_read_model(services)
+            version = model.version
+            warmed = await services.flights.run(
+                ("warm", version), lambda: asyncio.to_thread(warm_read_cache, services, model)
+            )
+        logger.info(
+            f"預熱完成: 版本={version}, 回應={warmed}, 耗時 {(time.perf_counter() - started) * 1000:.1f}ms "
+            f"(pid={os.getpid()})"
+        )
+    except Exception as e:
+        logger.error(f"預熱失敗: {e}")
+    finally:
+        services.ready.set()
+
+
+def spawn_background(services: Services, coroutine):
+    """於背景執行，保留 task 的參照直到完成。"""
+    task = asyncio.create_task(coroutine)
+    services.background_tasks.add(task)
+    task.add_done_callback(services.background_tasks.discard)
+
+
+def schedule_warm_up(services: Services):
+    """於背景重新預熱 (管理端寫入後)，不延遲寫入請求的回應。"""
+    spawn_background(services, warm_up(services))
+
+
+async def purge_cdn(services: Services, keys: List[str]):
+    """
+    等待 `DATA_VERSION_CHECK_INTERVAL` 秒 (其他 worker 已察覺新版本) 後在執行緒中呼叫清除 hook，
+    避免 CDN 清除後立刻由尚未更新的 worker 取回舊內容。
+    """
+    await asyncio.sleep(services.settings.data_version_check_interval)
+    purges = services.metrics.counter("quiz_cdn_purges_total", "CDN 清除 hook 的呼叫次數 (依結果)")
+    try:
+        await asyncio.to_thread(services.purger, keys)
+        purges.inc(outcome="ok")
+        logger.info(f"已清除 CDN 快取: {' '.join(keys)}")
+    except Exception as e:
+        purges.inc(outcome="error")
+        logger.error(f"清除 CDN 快取失敗: {e}")
+
+
+async def current_corpus_file(services: Services) -> Optional["corpusfile.CorpusFile"]:
+    """
+    未設定 `CORPUS_FILE` 時回傳 None，改由唯讀模型回答。
+    檔案尚未建立時等待建立完成，而不是載入唯讀模型，避免 worker 的私有記憶體隨語料成長；
+    只有建立失敗時才回傳 None。
+    """
+    if services.corpus_file is None:
+        return None
+    corpus = services.corpus_file.current(services.data_versions.current())
+    if corpus is None:
+        try:
+            corpus = await services.flights.run(
+                ("corpus-file",), lambda: asyncio.to_thread(services.corpus_file.publish)
+            )
+        except Exception as e:
+            logger.error(f"建立語料檔失敗，改用唯讀模型: {e}")
+    return corpus
+
+
+async def publish_changes(services: Services, purge_keys: List[str]):
+    """
+    管理端寫入後重新發佈語料檔 (本 worker 之後的讀取立即看到新資料)，立即推送變更事件，
+    並於背景重新預熱讀取快取、清除 CDN 中 `purge_keys` 對應的回應。
+    """
+    if services.corpus_file is not None:
+        await services.flights.run(("corpus-file",), lambda: asyncio.to_thread(services.corpus_file.publish))
+    services.events.notify()
+    if services.corpus_file is None:
+        schedule_warm_up(services)
+    if services.purger is not None and purge_keys:
+        spawn_background(services, purge_cdn(services, purge_keys))
+
+
+async def publish_ingested(services: Services, version: int, jobs: List[ingest.Job]):
+    """佇列模式下一個批次提交之後發佈變更。"""
+    services.data_versions.note(version)
+    await publish_changes(services, cdn.written_keys(
+        word_topics=[topic for job in jobs if job.kind == ingest.WORDS for topic in job.topics()],
+        entry_topics=[topic for job in jobs if job.kind == ingest.PRACTICES for topic in job.topics()]
+    ))
+
+
+async def current_manifest(services: Services) -> "bundles.Manifest":
+    """取得與目前資料版本一致的題庫包 manifest，落後時在執行緒中發佈新版本。"""
+    if services.bundles is None:
+        raise HTTPException(status_code=404, detail="Offline bundles are not enabled")
+    manifest = services.bundles.current(services.data_versions.current())
+    if manifest is None:
+        manifest = await services.flights.run(("bundles",), lambda: asyncio.to_thread(services.bundles.publish))
+    return manifest
 
-origins = [origin.strip() for origin in ALLOWED_ORIGINS.split(",") if origin.strip()]
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins if origins else ["*"],
-    allow_credentials=True,
-    allow_methods=["GET", "POST"],
-    allow_headers=["*"],
+def json_bytes_response(body: bytes, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def json_model_body(response: BaseModel, exclude_none: bool = False) -> bytes:
+    return response.model_dump_json(exclude_none=exclude_none).encode()
+
+
+def json_model_response(
+        response: BaseModel, exclude_none: bool = False, headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    以 Pydantic 的序列化器直接輸出 JSON 位元組。
+
+    回傳 Response 時 FastAPI 不會再以 `response_model` 驗證、序列化一次，
+    路由上的 `response_model` 仍保留，只用於 OpenAPI 文件。
+    """
+    return json_bytes_response(json_model_body(response, exclude_none), headers)
+
+
+def encoded_response(body: bytes, media_type: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    """內容依 `Accept` 而不同，加上 `Vary: Accept` 讓中間的 HTTP 快取分開保存。"""
+    return Response(content=body, media_type=media_type, headers={**(headers or {}), "Vary": "Accept"})
+
+
+def cache_headers(
+        services: Services,
+        request: Request,
+        media_type: str,
+        version: int,
+        surrogate_keys: List[str],
+        cache_control: Optional[str] = None
+) -> Dict[str, str]:
+    """
+    讀取端點的快取標頭。預設為 `public, max-age=CACHE_MAX_AGE, stale-while-revalidate=...`；
+    網址帶有與目前資料版本相同的 `v` 參數時內容永不改變，改為 immutable。
+    設定 `CDN_MAX_AGE` 時另以 `Surrogate-Control` 讓 CDN 保存較久 (寫入後由清除 hook 清除)。
+    `ETag` 由資料版本與編碼組成，`X-Data-Version` 讓用戶端組出帶版本的網址。
+    """
+    settings = services.settings
+    headers = {
+        "ETag": f'"{version}-{media_type.rsplit("/", 1)[-1]}"',
+        "Surrogate-Key": " ".join(surrogate_keys),
+        "X-Data-Version": str(version),
+    }
+    if cache_control is not None:
+        headers["Cache-Control"] = cache_control
+    elif request.query_params.get("v") == str(version):
+        headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    else:
+        headers["Cache-Control"] = "public, " + cdn.cache_control(
+            settings.cache_max_age, settings.cache_stale_while_revalidate
+        )
+        if settings.cdn_max_age:
+            headers["Surrogate-Control"] = cdn.cache_control(
+                settings.cdn_max_age, settings.cache_stale_while_revalidate
+            )
+    return headers
+
+
+async def negotiated_response(
+        services: Services,
+        request: Request,
+        media_type: str,
+        cache_key: Tuple[Hashable, ...],
+        version: int,
+        json_body: Callable[[], bytes],
+        surrogate_keys: List[str],
+        cache_json: bool = True,
+        cache_control: Optional[str] = None,
+        response_cache: Optional[cache.ResponseCache] = None
+) -> Response:
+    """
+    以協商出的編碼回應，附上 `cache_headers()` 的快取標頭；`If-None-Match` 符合時直接回傳 304。
+
+    JSON 本文由 `json_body()` 產生並以 `cache_key` 放入讀取快取 (本文直接取自語料檔時 `cache_json=False`，直接回應)；
+    MessagePack / CBOR 由 JSON 本文轉換，以 `cache_key + (media_type,)` 放入同一個快取，
+    同一資料版本只轉換一次。`response_cache` 指定時改用該快取 (預設為 `services.read_cache`)。
+    快取未命中時在執行緒中產生本文，同一 (key, 版本) 的並行請求以 `SingleFlight` 合併為一次計算。
+    """
+    headers = cache_headers(services, request, media_type, version, surrogate_keys, cache_control)
+    if headers["ETag"] in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={**headers, "Vary": "Accept"})
+    if media_type == negotiation.JSON and not cache_json:
+        return encoded_response(json_body(), media_type, headers)
+
+    response_cache = response_cache if response_cache is not None else services.read_cache
+    key = cache_key if media_type == negotiation.JSON else cache_key + (media_type,)
+    body = response_cache.get(key, version)
+    if body is None:
+        body = await services.flights.run(
+            (key, version),
+            lambda: asyncio.to_thread(
+                render_body, response_cache, media_type, cache_key, version, json_body, cache_json
+            )
+        )
+    return encoded_response(body, media_type, headers)
+
+
+def render_body(
+        response_cache: cache.ResponseCache,
+        media_type: str,
+        cache_key: Tuple[Hashable, ...],
+        version: int,
+        json_body: Callable[[], bytes],
+        cache_json: bool
+) -> bytes:
+    body = response_cache.get(cache_key, version) if cache_json else None
+    if body is None:
+        body = json_body()
+        if cache_json:
+            response_cache.put(cache_key, version, body)
+
+    if media_type != negotiation.JSON:
+        body = negotiation.transcode(body, media_type)
+        response_cache.put(cache_key + (media_type,), version, body)
+    return body
+
+
+async def current_read_model(services: Services) -> readmodel.ReadModel:
+    """取得與目前資料版本一致的唯讀模型，版本落後時在執行緒中重建。"""
+    version = services.data_versions.current()
+    model = services.read_model.get(version)
+    if model is None:
+        model = await services.flights.run(
+            ("read-model", version), lambda: asyncio.to_thread(services.read_model.refresh, version)
+        )
+    return model
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    services: Services = app.state.services
+    services.data_versions.current()
+    # 預熱在背景進行，/heartbeat 立即可用，/ready 在預熱完成後才回報就緒；
+    # 使用語料檔時不預先載入唯讀模型，讓各 worker 的私有記憶體不隨語料成長
+    schedule_warm_up(services)
+    flush_task = asyncio.create_task(flush_attempts_periodically(services.attempt_log))
+    events_task = await services.events.start()
+    ingest_task = None
+    if services.ingest is not None:
+        ingest_task = asyncio.create_task(
+            services.ingest.run(lambda version, jobs: publish_ingested(services, version, jobs))
+        )
+    maintenance_task = None
+    if services.maintenance is not None:
+        maintenance_task = asyncio.create_task(services.maintenance.run())
+    logger.info(f"worker 已就緒 (pid={os.getpid()})")
+    yield
+    if maintenance_task is not None:
+        # 進行中的 vacuum 在下一個步驟之前停止
+        services.maintenance.stop()
+        maintenance_task.cancel()
+    if ingest_task is not None:
+        services.ingest.stop()
+        await ingest_task
+        logger.info("已寫入佇列中剩餘的管理端寫入")
+    events_task.cancel()
+    flush_task.cancel()
+    services.attempt_log.flush()
+    logger.info("已寫入剩餘的作答紀錄")
+
+
+# 不受准入控制的路徑：健康檢測、指標、診斷端點、長連線的事件串流、靜態檔案下載與 API 文件
+ADMISSION_EXEMPT_PREFIXES = (
+    "/heartbeat", "/ready", "/metrics", "/admin/", "/events", "/bundles/files/", "/docs", "/redoc", "/openapi.json"
 )
 
 
-@app.exception_handler(StarletteHTTPException)
+def admission_group(method: str, path: str, query_string: bytes) -> Optional[str]:
+    """將請求歸入准入控制的路由群組；回傳 None 表示不受限制。"""
+    if path.startswith(ADMISSION_EXEMPT_PREFIXES):
+        return None
+    if (method == "POST" and path.startswith("/add-")) or (method == "PUT" and path.startswith("/topics/")):
+        return "admin"
+    if path == "/words":
+        query = parse_qs(query_string.decode("latin-1"))
+        # 與 get_words 相同：part 為 0 或未提供、topic 為空或未提供時即為未篩選
+        if query.get("part", ["0"])[0] in ("", "0") and not query.get("topic", [""])[0]:
+            return "words_all"
+    return "read"
+
+
+def scope_path(scope) -> str:
+    """去掉 root_path 前綴的請求路徑。"""
+    path = scope["path"]
+    root_path = scope.get("root_path", "")
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    return path
+
+
+def rate_limit_client(scope, header: bytes) -> str:
+    """
+    頻率限制的用戶端鍵。設定 `WORDS_RATE_CLIENT_HEADER` 時使用該標頭的最後一個值 (由最近一層受信任的代理附加，
+    例如前端伺服器轉送的 `X-Forwarded-For`)；未設定或請求沒有該標頭時使用連線的對端位址。
+    """
+    if header:
+        for name, value in scope.get("headers", ()):
+            if name == header:
+                client = value.decode("latin-1").rsplit(",", 1)[-1].strip()
+                if client:
+                    return client
+    return scope["client"][0] if scope.get("client") else "unknown"
+
+
+class AdmissionMiddleware:
+    """
+    依路由群組 (`read`、`admin`、未篩選的 `words_all`) 限制每個 worker 同時處理的請求數，
+    額滿時排隊，佇列已滿或排隊逾時則立即回傳 503 + `Retry-After`；
+    未篩選的 `/words` 可另以每個用戶端的 token bucket 限制頻率 (`WORDS_RATE_LIMIT`，預設停用)，超出時回傳 429。
+    並行上限設為 0 即停用該群組的限制。
+    """
+
+    def __init__(
+            self, app, settings: Settings, registry: metrics.Registry, on_request: Optional[Callable[[], None]] = None
+    ):
+        self.app = app
+        self.on_request = on_request
+        self.limiters = {
+            group: admission.ConcurrencyLimiter(limit, settings.admission_queue_size, settings.admission_queue_timeout)
+            for group, limit in (
+                ("read", settings.read_concurrency),
+                # 佇列模式下寫入請求只是排入佇列，改由寫入佇列的容量限制
+                ("admin", 0 if settings.ingest_queue else settings.admin_concurrency),
+                ("words_all", settings.words_concurrency),
+            )
+            if limit > 0
+        }
+        self.words_rate = (
+            admission.RateLimiter(settings.words_rate_limit, settings.words_rate_burst)
+            if settings.words_rate_limit > 0 else None
+        )
+        self.client_header = settings.words_rate_client_header.encode("latin-1")
+        self.retry_after = str(max(1, math.ceil(settings.admission_queue_timeout)))
+        self.requests = registry.counter("quiz_admission_requests_total", "准入控制的請求數 (依群組與結果)")
+        self.rate_limited = registry.counter("quiz_rate_limited_requests_total", "因頻率限制回傳 429 的請求數")
+        registry.callback("quiz_admission_in_flight", "各群組處理中的請求數", lambda: {
+            metrics.labels(group=group): limiter.active for group, limiter in self.limiters.items()
+        })
+        registry.callback("quiz_admission_queued", "各群組排隊中的請求數", lambda: {
+            metrics.labels(group=group): limiter.queued for group, limiter in self.limiters.items()
+        })
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        path = scope_path(scope)
+        group = admission_group(scope["method"], path, scope.get("query_string", b""))
+        if group is None:
+            return await self.app(scope, receive, send)
+        if self.on_request is not None:
+            self.on_request()
+
+        if group == "words_all" and self.words_rate is not None:
+            allowed, wait = self.words_rate.allow(rate_limit_client(scope, self.client_header))
+            if not allowed:
+                self.rate_limited.inc(group=group)
+                response = JSONResponse(
+                    {"detail": "Too many requests"}, status_code=429,
+                    headers={"Retry-After": str(max(1, math.ceil(wait)))}
+                )
+                return await response(scope, receive, send)
+
+        limiter = self.limiters.get(group)
+        if limiter is None:
+            return await self.app(scope, receive, send)
+        outcome = await limiter.acquire()
+        self.requests.inc(group=group, outcome=outcome)
+        if outcome not in (admission.ADMITTED, admission.QUEUED):
+            logger.warning(f"伺服器忙碌，拒絕請求: group={group}, path={path}, 原因={outcome}")
+            response = JSONResponse(
+                {"detail": "Server is busy, please retry later"}, status_code=503,
+                headers={"Retry-After": self.retry_after}
+            )
+            return await response(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+
+class ProfilingMiddleware:
+    """
+    `PROFILING=1` 時加入：把請求交給進行中的剖析 (cProfile) 與記憶體追蹤 (tracemalloc)；
+    兩者皆未進行時只檢查旗標後直接轉交。`/admin/*` 不計入。
+    """
+
+    def __init__(self, app, services: Services):
+        self.app = app
+        self.services = services
+
+    async def __call__(self, scope, receive, send):
+        profiler, allocations = self.services.profiler, self.services.allocations
+        if scope["type"] != "http" or not (profiler.active or allocations.active):
+            return await self.app(scope, receive, send)
+        path = scope_path(scope)
+        if path.startswith("/admin/"):
+            return await self.app(scope, receive, send)
+
+        profiled = profiler.active and profiler.begin(path)
+        traced_before = tracemalloc.get_traced_memory()[0] if allocations.active else None
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if profiled:
+                profiler.end()
+            if traced_before is not None and allocations.active:
+                # 路由比對後 scope 中帶有路由物件，以路徑樣板彙總 (如 /practice/{part}/{topic})
+                route = getattr(scope.get("route"), "path", path)
+                allocations.record(f"{scope['method']} {route}", tracemalloc.get_traced_memory()[0] - traced_before)
+
+
+def register_metrics(services: Services, engine: Engine):
+    """註冊由各元件自行維護的數值，以及長時間執行時用來觀察資源洩漏的程序數值。"""
+    registry = services.metrics
+    registry.callback("quiz_data_version", "目前的全域資料版本", services.data_versions.current)
+    registry.callback("quiz_read_cache_entries", "讀取快取的筆數", lambda: len(services.read_cache))
+    registry.callback("quiz_changes_cache_entries", "`/changes` 快取的筆數", lambda: len(services.changes_cache))
+    registry.callback("quiz_read_cache_hits_total", "讀取快取命中次數",
+                      lambda: services.read_cache.hits, kind="counter")
+    registry.callback("quiz_read_cache_misses_total", "讀取快取未命中次數",
+                      lambda: services.read_cache.misses, kind="counter")
+    registry.callback("quiz_single_flight_total", "合併計算的次數 (leader 實際計算，follower 等待共用結果)", lambda: {
+        metrics.labels(role="leader"): services.flights.leaders,
+        metrics.labels(role="follower"): services.flights.followers,
+    }, kind="counter")
+    registry.callback("quiz_read_model_rebuilds_total", "唯讀模型重建次數",
+                      lambda: services.read_model.rebuilds, kind="counter")
+    registry.callback("quiz_event_subscribers", "/events 連線數", lambda: services.events.subscribers)
+    registry.callback("quiz_sql_statements_total", "執行的 SQL 陳述式數",
+                      lambda: services.sql_stats.count, kind="counter")
+    registry.callback("quiz_sql_seconds_total", "SQL 陳述式的累計執行秒數",
+                      lambda: services.sql_stats.total, kind="counter")
+    registry.callback("quiz_sql_slow_statements_total", "超過 SLOW_QUERY_MS 的 SQL 陳述式數",
+                      lambda: services.sql_stats.slow, kind="counter")
+    registry.callback("quiz_process_resident_memory_bytes", "worker 的常駐記憶體 (RSS)", metrics.resident_memory_bytes)
+    registry.callback("quiz_process_open_fds", "worker 開啟的檔案描述子數", metrics.open_fds)
+    registry.callback("quiz_gc_objects", "GC 追蹤的物件數 (輸出時走訪所有物件)", lambda: len(gc.get_objects()))
+    registry.callback("quiz_gc_collections_total", "各世代的 GC 次數", metrics.gc_collections, kind="counter")
+    registry.callback("quiz_db_pool_connections", "SQLAlchemy 連線池的連線數 (依狀態)", lambda: {
+        metrics.labels(state="checked_out"): engine.pool.checkedout(),
+        metrics.labels(state="checked_in"): engine.pool.checkedin(),
+        metrics.labels(state="overflow"): max(0, engine.pool.overflow()),
+    })
+    if services.ingest is not None:
+        writer = services.ingest
+        registry.callback("quiz_ingest_queued", "寫入佇列中等待的工作數", lambda: writer.queued)
+        registry.callback("quiz_ingest_batches_total", "寫入佇列提交的批次數", lambda: writer.batches, kind="counter")
+        registry.callback("quiz_ingest_jobs_total", "寫入佇列完成的工作數 (依結果)", lambda: {
+            metrics.labels(status=status): count for status, count in writer.jobs_total.items()
+        }, kind="counter")
+    if services.maintenance is not None:
+        register_maintenance_metrics(registry, services.maintenance)
+
+
+def register_maintenance_metrics(registry: metrics.Registry, scheduler: maintenance.MaintenanceScheduler):
+    """最近一次資料庫維護 (任何 worker 執行的) 的狀態；尚未執行過時不輸出數值。"""
+
+    def last(read: Callable[[models.MaintenanceRun], Optional[float]]) -> Dict[Tuple, float]:
+        value = read(scheduler.last) if scheduler.last is not None else None
+        return {} if value is None else {(): value}
+
+    registry.callback("quiz_maintenance_runs_total", "本 worker 執行資料庫維護的次數 (依結果)", lambda: {
+        metrics.labels(status=status): count for status, count in scheduler.runs_total.items()
+    }, kind="counter")
+    registry.callback("quiz_maintenance_last_run_timestamp_seconds", "最近一次資料庫維護的開始時間",
+                      lambda: last(lambda run: run.started_at))
+    registry.callback("quiz_maintenance_last_run_success", "最近一次資料庫維護是否成功 (執行中為 0)",
+                      lambda: last(lambda run: float(run.status == maintenance.OK)))
+    registry.callback("quiz_maintenance_last_run_duration_seconds", "最近一次資料庫維護各步驟的耗時", lambda: {
+        metrics.labels(step=step): ms / 1000
+        for step, ms in (
+            ("total", scheduler.last.duration_ms),
+            ("analyze", scheduler.last.analyze_ms),
+            ("optimize", scheduler.last.optimize_ms),
+            ("vacuum", scheduler.last.vacuum_ms),
+            ("integrity", scheduler.last.integrity_ms),
+        ) if ms is not None
+    } if scheduler.last is not None else {})
+    registry.callback("quiz_maintenance_last_run_freed_pages", "最近一次資料庫維護以 incremental vacuum 釋放的頁數",
+                      lambda: last(lambda run: run.freed_pages))
+    registry.callback("quiz_maintenance_freelist_pages", "最近一次資料庫維護後剩餘的空頁數",
+                      lambda: last(lambda run: run.freelist_pages))
+    registry.callback("quiz_maintenance_integrity_ok", "最近一次完整性檢查是否通過",
+                      lambda: last(lambda run: None if run.integrity is None else float(run.integrity == "ok")))
+
+
 async def http_exception_handler(request, exc):
     logger.error(f"HTTP 錯誤: {exc.status_code} - {exc.detail}")
     return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail}, )
 
 
-@app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request, exc):
     logger.error(f"請求驗證錯誤: {exc.errors()}")
     return JSONResponse(status_code=400, content={"detail": exc.errors()}, )
 
 
-@app.exception_handler(Exception)
 async def generic_exception_handler(request, exc):
     logger.error(f"伺服器錯誤: {str(exc)}", exc_info=True)
     return JSONResponse(status_code=500, content={"detail": "Internal Server Error"}, )
 
 
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """
+    應用程式工廠。只建立物件，不連線資料庫也不建立表格；
+    表格需事先以 `python migrate.py` 建立，連線在第一次請求時才會建立。
+    """
+    settings = settings or Settings.from_env()
+    configure_logging(settings)
+
+    if not settings.bearer_token:
+        logger.warning("未設置 BEARER_TOKEN 環境變數，API 安全性受到影響")
+
+    logger.info(f"啟動 API 伺服器於 {settings.host}:{settings.port}")
+    logger.info(f"API 公開位址: {settings.remote_host}")
+    logger.info(f"根路徑: {settings.root_path}")
+    if negotiation.unavailable():
+        logger.info(
+            f"未安裝 {', '.join(negotiation.unavailable())}，讀取端點不提供對應的回應編碼 (一律回傳 JSON)；"
+            f"可以 `pip install -e \".[binary]\"` 安裝"
+        )
+
+    engine = init_engine(settings.database_url)
+    sql_stats = sqlstats.SqlStats(slow_ms=settings.slow_query_ms)
+    if settings.sql_stats:
+        sql_stats.install(engine)
+
+    app = FastAPI(
+        title="NTUST 英簡單後端",
+        description=(
+            "提供對題目、單字和習題提供增查功能。\n"
+            "可透過本 API 查詢各類 part 與 topic 對應的題目、單字，以及提交新的練習項目。"
+        ),
+        servers=[{"url": f"https://{settings.remote_host}", "description": "公開 API 位址"}],
+        version="1.0.0",
+        docs_url="/docs",
+        redoc_url="/redoc",
+        openapi_url="/openapi.json",
+        root_path=settings.root_path,
+        lifespan=lifespan
+    )
+    corpus_file = bundle_store = None
+    if settings.corpus_file:
+        import corpusfile
+        corpus_file = corpusfile.CorpusFileStore(settings.corpus_file, engine)
+    if settings.bundle_dir:
+        import bundles
+        bundle_store = bundles.BundleStore(settings.bundle_dir, engine)
+    app.state.services = Services(
+        settings=settings,
+        data_versions=versioning.VersionWatcher(
+            lambda: versioning.read(engine),
+            check_interval=settings.data_version_check_interval
+        ),
+        read_cache=cache.ResponseCache(max_entries=settings.read_cache_size),
+        changes_cache=cache.ResponseCache(max_entries=settings.changes_cache_size),
+        changes_versions=cache.RecentKeys(max_entries=settings.changes_cache_size),
+        read_model=readmodel.ReadModelStore(engine),
+        corpus_file=corpus_file,
+        bundles=bundle_store,
+        events=events.ChangeBroadcaster(engine, poll_interval=settings.events_poll_interval),
+        answer_maps=grading.AnswerMapCache(),
+        attempt_log=grading.AttemptLog(
+            SessionLocal,
+            batch_size=settings.attempt_batch_size,
+            flush_interval=settings.attempt_flush_interval
+        ),
+        metrics=metrics.Registry(),
+        purger=cdn.load_purger(settings.purge_url, settings.purge_token, settings.purge_hook),
+        sql_stats=sql_stats,
+        ingest=ingest.IngestWriter(
+            SessionLocal,
+            batch_interval=settings.ingest_batch_interval,
+            max_batch=settings.ingest_max_batch,
+            max_queue=settings.ingest_max_queue,
+            job_ttl=settings.ingest_job_ttl
+        ) if settings.ingest_queue else None,
+        maintenance=maintenance.MaintenanceScheduler(
+            engine,
+            interval=settings.maintenance_interval,
+            check_interval=settings.maintenance_check_interval,
+            idle_rps=settings.maintenance_idle_rps,
+            vacuum_pages=settings.maintenance_vacuum_pages,
+            analysis_limit=settings.maintenance_analysis_limit,
+            integrity=settings.maintenance_integrity
+        ) if settings.maintenance_interval > 0 else None
+    )
+    register_metrics(app.state.services, engine)
+
+    # 先加入的中介層在內側：准入控制的 503 / 429 回應仍會經過 CORS 加上標頭；剖析只涵蓋通過准入控制的請求
+    if settings.profiling:
+        app.add_middleware(ProfilingMiddleware, services=app.state.services)
+    app.add_middleware(
+        AdmissionMiddleware,
+        settings=settings,
+        registry=app.state.services.metrics,
+        on_request=app.state.services.maintenance.note_request if app.state.services.maintenance else None
+    )
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.allowed_origins or ["*"],
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT"],
+        allow_headers=["*"],
+        expose_headers=["X-Data-Version", "Retry-After"],
+    )
+    app.add_exception_handler(StarletteHTTPException, http_exception_handler)
+    app.add_exception_handler(RequestValidationError, validation_exception_handler)
+    app.add_exception_handler(Exception, generic_exception_handler)
+    app.include_router(router)
+    register_request_schemas(app, [AddWordsRequestSchema, AddPracticesRequestSchema, ReplaceTopicRequestSchema])
+    if settings.profiling:
+        app.include_router(profiling_router)
+    return app
+
+
+def __getattr__(name: str):
+    # 相容 `uvicorn app:app`：第一次存取 `app.app` 時才建立應用程式
+    if name == "app":
+        from dotenv import load_dotenv
+        load_dotenv(os.getenv("ENV_FILE", ".env"))
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -125,11 +838,223 @@ def get_db():
 
 bearer_scheme = HTTPBearer()
 
+# 內容定址的檔案永不改變，可由瀏覽器與 CDN 永久快取
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+NO_STORE = {"Cache-Control": "no-store"}  # 作答統計、複習排程等隨時變動或屬於個人的回應
+UNCACHED = cache.ResponseCache(max_entries=0)  # 放入後立即淘汰：本文照常產生 (並合併並行請求)，但不保留
+
+
+def word_to_schema(word: readmodel.WordRecord) -> WordSchema:
+    """將單字紀錄 (JSON 欄位) 轉換為 `WordSchema`。"""
+    pronunciations_data = json.loads(word.pronunciations) if word.pronunciations else []
+    definitions_data = json.loads(word.definitions) if word.definitions else []
+    verbs_data = json.loads(word.verbs) if word.verbs else []
+
+    pronunciations = [PronunciationSchema(**p) for p in pronunciations_data]
+
+    definitions = []
+    for d in definitions_data:
+        examples_data = d.get("examples", [])
+        examples = [ExampleSchema(**e) for e in examples_data]
+        definition = DefinitionSchema(
+            pos=d.get("pos"),
+            definition=d.get("definition"),
+            translation=d.get("translation"),
+            examples=examples
+        )
+        definitions.append(definition)
+
+    verbs = [VerbFormSchema(**v) for v in verbs_data]
+
+    return WordSchema(
+        word=word.word,
+        pos=word.pos,
+        meaning=word.meaning,
+        pronunciations=pronunciations,
+        definitions=definitions,
+        verbs=verbs
+    )
+
+
+def stats_to_schema(stats: grading.QuestionStats) -> QuestionStatsSchema:
+    """將 `grading.QuestionStats` 轉換為 `QuestionStatsSchema`。"""
+    return QuestionStatsSchema(
+        attempts=stats.attempts,
+        correct=stats.correct,
+        accuracy=stats.accuracy,
+        choices=[
+            ChoiceStatsSchema(
+                choice_order=choice_order,
+                choice_text=choice_text,
+                picks=picks
+            )
+            for choice_order, choice_text, picks in stats.choices
+        ]
+    )
+
+
+def entry_question_stats(
+        stats: Dict[int, grading.QuestionStats],
+        entry_pk: int,
+        entry: PracticeEntrySchema
+) -> grading.QuestionStats:
+    """
+    取出某題的統計。題目來自讀取模型 / 語料檔，最多落後資料庫一個檢查間隔：
+    期間由其他 worker 新增的題目在統計中還沒有對應列時，以該題的選項與零計數代替。
+    """
+    question_stats = stats.get(entry_pk)
+    if question_stats is None:
+        question_stats = grading.QuestionStats(0, 0, [
+            (choice.choice_order, choice.choice_text, 0) for choice in entry.choices
+        ])
+    return question_stats
+
+
+def entry_to_schema(entry: readmodel.EntryRecord) -> PracticeEntrySchema:
+    """將練習題紀錄與其已排序的選項轉換為 `PracticeEntrySchema`。"""
+    choice_schemas = [
+        ChoiceSchema(choice_order=choice.choice_order, choice_text=choice.choice_text)
+        for choice in entry.choices
+    ]
+    return PracticeEntrySchema(
+        entry_id=entry.entry_id,
+        question=entry.question,
+        question_hash=entry.question_hash,
+        answer=grading.display_answer(entry.answer),
+        choices=choice_schemas
+    )
+
+
+def words_body(words) -> bytes:
+    return json_model_body(PartResponse(words=[word_to_schema(word) for word in words]))
+
+
+def practice_body(entries) -> bytes:
+    return json_model_body(PracticeResponse(entries=[entry_to_schema(entry) for entry in entries]), exclude_none=True)
+
+
+def topics_body(topic_names) -> bytes:
+    return json_model_body(TopicsResponse(count=len(topic_names), topics=list(topic_names)))
+
+
+def parts_body(part_numbers) -> bytes:
+    return json_model_body(PartsResponse(count=len(part_numbers), parts=list(part_numbers)))
+
+
+async def practice_entries(services: Services, part: int, topic: str) -> List[Tuple[int, PracticeEntrySchema]]:
+    """回傳某主題的 [(entries.id, PracticeEntrySchema), ...]，優先由語料檔讀取。"""
+    corpus = await current_corpus_file(services)
+    if corpus is not None:
+        return [
+            (entry_pk, PracticeEntrySchema.model_validate_json(bytes(fragment)))
+            for entry_pk, fragment in corpus.entries(part, topic)
+        ]
+    model = await current_read_model(services)
+    return [(entry.id, entry_to_schema(entry)) for entry in model.entries(part, topic)]
+
+
+def find_word(
+        corpus: Optional["corpusfile.CorpusFile"],
+        model: Optional[readmodel.ReadModel],
+        word_id: int
+) -> Optional[WordSchema]:
+    if corpus is not None:
+        fragment = corpus.word(word_id)
+        return WordSchema.model_validate_json(bytes(fragment)) if fragment is not None else None
+    word = model.words_by_id.get(word_id)
+    return word_to_schema(word) if word is not None else None
+
+
+def find_entry(
+        corpus: Optional["corpusfile.CorpusFile"],
+        model: Optional[readmodel.ReadModel],
+        entry_pk: int
+) -> Optional[PracticeEntrySchema]:
+    if corpus is not None:
+        fragment = corpus.entry(entry_pk)
+        return PracticeEntrySchema.model_validate_json(bytes(fragment)) if fragment is not None else None
+    entry = model.entries_by_id.get(entry_pk)
+    return entry_to_schema(entry) if entry is not None else None
+
+
+def review_items(
+        corpus: Optional["corpusfile.CorpusFile"],
+        model: Optional[readmodel.ReadModel],
+        keys: List[Tuple[int, int, Optional[models.ReviewState], bool]],
+        now: int
+) -> List[ReviewItemSchema]:
+    """組合複習項目的內容，略過已不存在的項目。"""
+    items = []
+    for item_type, item_id, state, is_new in keys:
+        item = ReviewItemSchema(
+            item_type=srs.ITEM_TYPE_NAMES[item_type],
+            item_id=item_id,
+            due=state.due if state else now,
+            interval=state.interval if state else 0,
+            reps=state.reps if state else 0,
+            is_new=is_new
+        )
+        if item_type == srs.ITEM_TYPES["word"]:
+            item.word = find_word(corpus, model, item_id)
+            if item.word is None:
+                continue  # 項目已被刪除
+        else:
+            item.entry = find_entry(corpus, model, item_id)
+            if item.entry is None:
+                continue
+        items.append(item)
+    return items
+
+
+def job_to_schema(job: ingest.Job) -> IngestJobResponse:
+    return IngestJobResponse(
+        job_id=job.job_id,
+        kind=job.kind or None,
+        status=job.status,
+        version=job.version,
+        added=job.added,
+        status_code=job.status_code,
+        error=job.error,
+        submitted_at=int(job.submitted_at) if job.submitted_at else None,
+        finished_at=int(job.finished_at) if job.finished_at else None
+    )
+
+
+async def queued_write(
+        services: Services, request: Request, job: ingest.Job, respond: Callable[[ingest.Job], BaseModel]
+):
+    """
+    佇列模式的管理端寫入。請求帶有 `Prefer: respond-async` 時立即回傳 202 與工作狀態 (`Location` 指向查詢端點)；
+    否則等待工作所在的批次提交後，回傳與同步模式相同的回應 (或相同的錯誤)。
+    """
+    try:
+        services.ingest.submit(job)
+    except ingest.QueueFull:
+        logger.warning(f"寫入佇列已滿，拒絕請求: kind={job.kind}, 數量={job.size}")
+        return JSONResponse(
+            {"detail": "Ingestion queue is full, please retry later"}, status_code=503,
+            headers={"Retry-After": str(max(1, math.ceil(services.settings.ingest_batch_interval)))}
+        )
+    if "respond-async" in request.headers.get("prefer", ""):
+        return Response(
+            content=json_model_body(job_to_schema(job), exclude_none=True), status_code=202,
+            media_type="application/json", headers={
+                "Location": f"{request.scope.get('root_path', '')}/ingest/jobs/{job.job_id}",
+                "Preference-Applied": "respond-async",
+            }
+        )
+    await job.done.wait()
+    if job.status == ingest.FAILED:
+        raise HTTPException(status_code=job.status_code, detail=job.error)
+    return respond(job)
+
 
 async def verify_bearer_token(
+        request: Request,
         credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)
 ):
-    if credentials.scheme == "Bearer" and credentials.credentials == BEARER_TOKEN:
+    bearer_token = request.app.state.services.settings.bearer_token
+    if credentials.scheme == "Bearer" and bearer_token and credentials.credentials == bearer_token:
         return credentials.credentials
     else:
         raise HTTPException(
@@ -139,11 +1064,70 @@ async def verify_bearer_token(
         )
 
 
+REQUEST_SCHEMA_REF = "#/components/schemas/{model}"
+
+
+def validated_body(adapter: TypeAdapter) -> Callable:
+    """
+    以 `adapter.validate_json()` 驗證整個請求本文的相依函式，取代 FastAPI 的 json.loads() + 逐層驗證。
+    錯誤格式與 FastAPI 相同 (`loc` 以 `body` 開頭)，由 `validation_exception_handler` 回傳 400。
+    """
+
+    async def dependency(request: Request):
+        body = await request.body()
+        if not body:
+            raise RequestValidationError([{"type": "missing", "loc": ("body",), "msg": "Field required", "input": None}])
+        try:
+            return adapter.validate_json(body)
+        except ValidationError as e:
+            errors = e.errors(include_url=False)
+            if errors[0]["type"] == "json_invalid":
+                # 與 FastAPI 解析 JSON 失敗時相同，不回傳原始的請求本文
+                raise RequestValidationError([
+                    {"type": "json_invalid", "loc": ("body",), "msg": "JSON decode error", "input": {},
+                     "ctx": errors[0].get("ctx", {})}
+                ])
+            raise RequestValidationError([{**error, "loc": ("body", *error["loc"])} for error in errors])
+
+    return dependency
+
+
+def json_request_body(model: type) -> dict:
+    """`validated_body()` 的端點在 OpenAPI 中的 requestBody (巢狀模型由 `register_request_schemas()` 加入)。"""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": {"$ref": REQUEST_SCHEMA_REF.format(model=model.__name__)}}}
+        },
+        "responses": {"422": {
+            "description": "Validation Error",
+            "content": {"application/json": {"schema": {"$ref": REQUEST_SCHEMA_REF.format(model="HTTPValidationError")}}}
+        }}
+    }
+
+
+def register_request_schemas(app: FastAPI, request_models: List[type]):
+    """將 `json_request_body()` 引用的請求模型 (與其巢狀模型) 加入 OpenAPI 的 components。"""
+    generate = app.openapi
+
+    def openapi() -> dict:
+        if app.openapi_schema is None:
+            schemas = generate().setdefault("components", {}).setdefault("schemas", {})
+            for model in request_models:
+                schema = model.model_json_schema(ref_template=REQUEST_SCHEMA_REF)
+                for name, definition in schema.pop("$defs", {}).items():
+                    schemas.setdefault(name, definition)
+                schemas.setdefault(model.__name__, schema)
+        return app.openapi_schema
+
+    app.openapi = openapi
+
+
 # -----------------------------
 # 路由區塊
 # -----------------------------
 
-@app.get(
+@router.get(
     "/heartbeat",
     summary="心跳檢測",
     description="檢測後端伺服器狀態是否正常可訪問。",
@@ -153,54 +1137,349 @@ async def heartbeat():
     return JSONResponse({"status": "ok"})
 
 
-@app.get(
+@router.get(
+    "/ready",
+    summary="就緒檢測",
+    description=(
+            "啟動預熱 (唯讀模型 / 語料檔與讀取快取) 完成後回傳 200，之前回傳 503。\n"
+            "與 `/heartbeat` (程序存活即回傳 200) 不同，負載平衡器應以此端點決定是否轉送流量。"
+    ),
+    tags=["Health Check"]
+)
+async def ready(services: Services = Depends(get_services)):
+    if not services.ready.is_set():
+        return JSONResponse({"status": "warming"}, status_code=503, headers={"Retry-After": "1"})
+    return JSONResponse({"status": "ready"})
+
+
+@router.get(
+    "/metrics",
+    summary="執行期指標",
+    description=(
+            "以 Prometheus 文字格式輸出處理此請求的 worker 的指標 (准入控制、讀取快取、合併計算、事件連線等)，"
+            "每筆帶有 `pid` 標籤。"
+    ),
+    response_class=Response,
+    tags=["Health Check"]
+)
+async def get_metrics(services: Services = Depends(get_services)):
+    return Response(content=services.metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@router.get(
+    "/admin/sql-stats",
+    response_model=SqlStatsResponse,
+    summary="SQL 陳述式統計",
+    description=(
+            "列出處理此請求的 worker 自啟動 (或上次重設) 以來，依正規化 SQL 彙總的執行次數與時間，"
+            "依 `order_by` 排序取前 `limit` 名；超過 `SLOW_QUERY_MS` 的陳述式附上 `EXPLAIN QUERY PLAN`。\n"
+            "需要提供 `Bearer Token` 驗證。"
+    ),
+    tags=["Admin"]
+)
+async def get_sql_stats(
+        limit: int = Query(20, ge=1, le=200, description="最多回傳筆數"),
+        order_by: Literal["total", "max", "mean", "count"] = Query("total", description="排序依據"),
+        services: Services = Depends(get_services),
+        token: str = Depends(verify_bearer_token)
+):
+    sql_stats = services.sql_stats
+    return SqlStatsResponse(
+        pid=os.getpid(),
+        since=int(sql_stats.started_at),
+        statements=sql_stats.count,
+        total_ms=sql_stats.total * 1000,
+        slow_ms=sql_stats.slow_ms,
+        top=[SqlStatementSchema(**summary._asdict()) for summary in sql_stats.top(limit, order_by)]
+    )
+
+
+@router.post(
+    "/admin/sql-stats/reset",
+    summary="重設 SQL 陳述式統計",
+    description="清除處理此請求的 worker 的 SQL 統計。需要提供 `Bearer Token` 驗證。",
+    tags=["Admin"]
+)
+async def reset_sql_stats(
+        services: Services = Depends(get_services),
+        token: str = Depends(verify_bearer_token)
+):
+    services.sql_stats.reset()
+    return JSONResponse({"status": "ok", "pid": os.getpid()})
+
+
+@profiling_router.post(
+    "/admin/profile",
+    response_class=PlainTextResponse,
+    summary="剖析接下來的請求",
+    description=(
+            "以 cProfile 剖析處理此請求的 worker 接下來的 `requests` 個請求 (可用 `route` 限定路徑前綴)，"
+            "完成或等待 `timeout` 秒後回傳 pstats 文字報告。剖析期間同一 worker 處理的其他請求也會計入。\n"
+            "需設定 `PROFILING=1`，並提供 `Bearer Token` 驗證。"
+    ),
+    tags=["Admin"]
+)
+async def profile_requests(
+        requests: int = Query(20, ge=1, le=10000, description="剖析的請求數"),
+        route: Optional[str] = Query(None, description="只計入路徑以此開頭的請求，如 /words"),
+        timeout: float = Query(60, gt=0, le=600, description="最長等待秒數"),
+        sort: Literal[profiling.SORT_KEYS] = Query("cumulative", description="排序依據"),
+        limit: int = Query(50, ge=1, le=500, description="報告列出的函式數"),
+        services: Services = Depends(get_services),
+        token: str = Depends(verify_bearer_token)
+):
+    profiler = services.profiler
+    try:
+        profiler.arm(requests, route)
+    except profiling.ProfilerBusy as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    profiled = await profiler.wait(timeout)
+    report = await asyncio.to_thread(profiler.report, sort, limit)
+    return PlainTextResponse(f"# pid={os.getpid()} 剖析了 {profiled} / {requests} 個請求\n\n{report}")
+
+
+@profiling_router.post(
+    "/admin/tracemalloc/start",
+    summary="開始記憶體追蹤",
+    description=(
+            "在處理此請求的 worker 啟動 tracemalloc 並取得基準快照，之後依路由統計每個請求的配置增長。"
+            "追蹤期間記憶體與 CPU 負擔明顯增加，完成後應呼叫 `/admin/tracemalloc/stop`。\n"
+            "需設定 `PROFILING=1`，並提供 `Bearer Token` 驗證。"
+    ),
+    tags=["Admin"]
+)
+async def start_tracemalloc(
+        frames: int = Query(1, ge=1, le=50, description="每個配置保存的堆疊深度"),
+        services: Services = Depends(get_services),
+        token: str = Depends(verify_bearer_token)
+):
+    try:
+        await asyncio.to_thread(services.allocations.start, frames)
+    except profiling.ProfilerBusy as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    return JSONResponse({"status": "tracing", "pid": os.getpid()})
+
+
+@profiling_router.get(
+    "/admin/tracemalloc",
+    response_model=AllocationReportResponse,
+    summary="記憶體增長報告",
+    description=(
+            "取得新的快照並與基準快照比較，列出增長最多的程式位置，以及各路由請求的累計淨配置量。\n"
+            "需設定 `PROFILING=1`，並提供 `Bearer Token` 驗證。"
+    ),
+    tags=["Admin"]
+)
+async def get_tracemalloc_report(
+        limit: int = Query(20, ge=1, le=200, description="列出的程式位置數"),
+        group_by: Literal["lineno", "filename", "traceback"] = Query("lineno", description="彙總方式"),
+        services: Services = Depends(get_services),
+        token: str = Depends(verify_bearer_token)
+):
+    allocations = services.allocations
+    if not allocations.active:
+        raise HTTPException(status_code=409, detail="記憶體追蹤未啟動")
+    top = await asyncio.to_thread(allocations.compare, group_by, limit)
+    traced, peak = tracemalloc.get_traced_memory()
+    return AllocationReportResponse(
+        pid=os.getpid(),
+        since=int(allocations.started_at),
+        traced_bytes=traced,
+        peak_bytes=peak,
+        top=[AllocationStatSchema(**stat._asdict()) for stat in top],
+        routes=[RouteAllocationSchema(**route._asdict()) for route in allocations.routes()]
+    )
+
+
+@profiling_router.post(
+    "/admin/tracemalloc/stop",
+    summary="停止記憶體追蹤",
+    description="停止 tracemalloc 並釋放快照。需設定 `PROFILING=1`，並提供 `Bearer Token` 驗證。",
+    tags=["Admin"]
+)
+async def stop_tracemalloc(
+        services: Services = Depends(get_services),
+        token: str = Depends(verify_bearer_token)
+):
+    if services.allocations.active:
+        services.allocations.stop()
+    return JSONResponse({"status": "stopped", "pid": os.getpid()})
+
+
+@router.get(
     "/practice/{part}/{topic}",
     response_model=PracticeResponse,
+    responses=negotiation.OPENAPI_RESPONSES,
+    response_model_exclude_none=True,
     summary="取得練習題目",
-    description="根據指定的 `part` 與 `topic`，回傳對應的練習題及選項內容。",
+    description=(
+            "根據指定的 `part` 與 `topic`，回傳對應的練習題及選項內容。\n"
+            "傳入 `include_stats=true` 時，每題會附上作答統計。"
+    ),
     tags=["Metadata"]
 )
-async def get_practice(part: int, topic: str, db: Session = Depends(get_db)):
+async def get_practice(
+        request: Request,
+        part: int,
+        topic: str,
+        include_stats: bool = Query(False, description="是否附上每題的作答統計"),
+        db: Session = Depends(get_db),
+        services: Services = Depends(get_services)
+):
     logger.info(f"查詢練習題: part={part}, topic={topic}")
-    entries = db.query(models.Entry).filter(
-        models.Entry.part == part,
-        models.Entry.topic == topic
-    ).all()
+    media_type = negotiation.negotiate(request.headers.get("accept"))
+    corpus = await current_corpus_file(services)
+    cache_key = ("practice", part, topic)
+    surrogate_keys = cdn.practice_keys(part, topic)
 
-    # No such practice
-    if not entries:
+    def not_found():
         logger.warning(f"未找到練習題: part={part}, topic={topic}")
         raise HTTPException(status_code=404, detail="No entries found for the specified part and topic")
 
-    practice_entries = []
-    for entry in entries:
-        choices = db.query(models.Choice).filter(
-            models.Choice.entry_id == entry.id
-        ).order_by(models.Choice.choice_order).all()
-        choice_schemas = [
-            ChoiceSchema(choice_order=choice.choice_order, choice_text=choice.choice_text)
-            for choice in choices
-        ]
-        answer = entry.answer
-        if '. ' in answer:
-            answer = answer[3:]
+    if corpus is not None and not include_stats:
+        def corpus_body() -> bytes:
+            body = corpus.practice_body(part, topic)
+            if body is None:
+                not_found()
+            return body
+
+        return await negotiated_response(
+            services, request, media_type, cache_key, corpus.version, corpus_body, surrogate_keys, cache_json=False
+        )
 
-        practice_entry = PracticeEntrySchema(
+    if include_stats:
+        # 統計隨作答持續變動，不放入快取
+        entries = await practice_entries(services, part, topic)
+        if not entries:
+            not_found()
+        stats = grading.topic_stats(db, part, topic)
+        for entry_pk, practice_entry in entries:
+            practice_entry.stats = stats_to_schema(entry_question_stats(stats, entry_pk, practice_entry))
+        logger.info(f"找到 {len(entries)} 個練習題")
+        # 每題都有 stats，不排除 None：統計的格式與 `/stats` 相同 (尚無作答時 `accuracy` 為 null)
+        body = json_model_body(PracticeResponse(entries=[e for _, e in entries]))
+        return encoded_response(negotiation.transcode(body, media_type), media_type, NO_STORE)
+
+    model = await current_read_model(services)
+
+    def model_body() -> bytes:
+        entries = model.entries(part, topic)
+        if not entries:
+            not_found()
+        logger.info(f"找到 {len(entries)} 個練習題")
+        return practice_body(entries)
+
+    return await negotiated_response(services, request, media_type, cache_key, model.version, model_body, surrogate_keys)
+
+
+@router.get(
+    "/practice/{part}/{topic}/stats",
+    response_model=PracticeStatsResponse,
+    summary="取得練習題作答統計",
+    description=(
+            "回傳指定 `part` 與 `topic` 每題的作答次數、答對率與各選項被選次數，"
+            "依答對率由低到高 (最難的題目在前) 排序，尚無作答紀錄的題目排在最後。\n"
+            "統計為批次寫入作答紀錄時遞增維護的計數，讀取時不會掃描作答紀錄。"
+    ),
+    tags=["Practice"]
+)
+async def get_practice_stats(
+        part: int,
+        topic: str,
+        db: Session = Depends(get_db),
+        services: Services = Depends(get_services)
+):
+    entries = await practice_entries(services, part, topic)
+    if not entries:
+        logger.warning(f"未找到練習題: part={part}, topic={topic}")
+        raise HTTPException(status_code=404, detail="No entries found for the specified part and topic")
+
+    stats = grading.topic_stats(db, part, topic)
+    entry_stats = [
+        EntryStatsSchema(
             entry_id=entry.entry_id,
             question=entry.question,
-            question_hash=entry.question_hash,
-            answer=answer,
-            choices=choice_schemas
+            **stats_to_schema(entry_question_stats(stats, entry_pk, entry)).model_dump()
+        )
+        for entry_pk, entry in entries
+    ]
+    entry_stats.sort(key=lambda e: (e.accuracy is None, e.accuracy or 0.0, -e.attempts))
+
+    logger.info(f"查詢練習題統計: part={part}, topic={topic}, 題數={len(entry_stats)}")
+    return json_model_response(PracticeStatsResponse(
+        part=part,
+        topic=topic,
+        attempts=sum(e.attempts for e in entry_stats),
+        entries=entry_stats
+    ), headers=NO_STORE)
+
+
+@router.post(
+    "/practice/grade",
+    response_model=GradeResponseSchema,
+    summary="批改練習題",
+    description=(
+            "一次提交整個練習的作答 (以 `choice_order` 或 `choice_text` 表示)，"
+            "於伺服器端對照正確答案批改並記錄作答結果。\n"
+            "作答紀錄會先暫存於記憶體，再批次寫入資料庫。"
+    ),
+    tags=["Practice"]
+)
+async def grade_practice(
+        request_data: GradeRequestSchema = Body(...),
+        db: Session = Depends(get_db),
+        services: Services = Depends(get_services)
+):
+    part, topic = request_data.part, request_data.topic
+    answer_map = services.answer_maps.get(db, part, topic, services.data_versions.current())
+    if not answer_map:
+        logger.warning(f"未找到練習題: part={part}, topic={topic}")
+        raise HTTPException(status_code=404, detail="No entries found for the specified part and topic")
+
+    unknown = [a.entry_id for a in request_data.answers if a.entry_id not in answer_map]
+    if unknown:
+        logger.warning(f"批改請求含未知題目: part={part}, topic={topic}, entry_ids={unknown}")
+        raise HTTPException(
+            status_code=404,
+            detail=f"entry_id {unknown} not found in part {part} and topic '{topic}'"
         )
-        practice_entries.append(practice_entry)
 
-    logger.info(f"找到 {len(practice_entries)} 個練習題")
-    return PracticeResponse(entries=practice_entries)
+    now = int(time.time())
+    results = []
+    rows = []
+    for submitted in request_data.answers:
+        key = answer_map[submitted.entry_id]
+        choice_order = submitted.choice_order
+        if choice_order is None and submitted.choice_text is not None:
+            choice_order = key.orders.get(submitted.choice_text)
+
+        correct = choice_order is not None and choice_order == key.correct_order
+        results.append(GradeResultSchema(
+            entry_id=submitted.entry_id,
+            correct=correct,
+            choice_order=choice_order,
+            correct_choice_order=key.correct_order,
+            answer=key.answer
+        ))
+        rows.append((key.entry_pk, request_data.learner_id, choice_order, correct, now))
+
+    if services.attempt_log.append(rows):
+        await asyncio.to_thread(services.attempt_log.flush)
+
+    correct_count = sum(1 for r in results if r.correct)
+    logger.info(f"批改練習題: part={part}, topic={topic}, 答對 {correct_count}/{len(results)}")
+    return GradeResponseSchema(
+        total=len(results),
+        correct=correct_count,
+        score=round(correct_count / len(results) * 100, 1),
+        results=results
+    )
 
 
-@app.get(
+@router.get(
     "/topics",
     response_model=TopicsResponse,
+    responses=negotiation.OPENAPI_RESPONSES,
     summary="取得可用的主題",
     description=(
             "選擇指定 `part` 來篩選符合的主題清單。\n"
@@ -210,31 +1489,32 @@ async def get_practice(part: int, topic: str, db: Session = Depends(get_db)):
     tags=["Metadata"]
 )
 async def get_topics(
+        request: Request,
         part: Optional[int] = Query(None, description="Part number"),
-        db: Session = Depends(get_db)
+        services: Services = Depends(get_services)
 ):
     logger.info(f"查詢主題: part={part if part else 'all'}")
-    filters = []
-    if part:
-        filters.append(models.Word.part == part)
-
-    query = db.query(models.Word.topic).distinct()
-    if filters:
-        query = query.filter(*filters)
-    topics = query.all()
-
-    topic_names = [topic[0] for topic in topics]
-    if not topic_names:
-        logger.warning(f"未找到主題: part={part if part else 'all'}")
-        raise HTTPException(status_code=404, detail="No topics found for the specified part")
-
-    logger.info(f"找到 {len(topic_names)} 個主題")
-    return TopicsResponse(count=len(topic_names), topics=topic_names)
+    # 語料檔與唯讀模型提供相同的 topics() / parts() 與 version
+    source = await current_corpus_file(services) or await current_read_model(services)
+
+    def json_body() -> bytes:
+        topic_names = source.topics(part)
+        if not topic_names:
+            logger.warning(f"未找到主題: part={part if part else 'all'}")
+            raise HTTPException(status_code=404, detail="No topics found for the specified part")
+        logger.info(f"找到 {len(topic_names)} 個主題")
+        return topics_body(topic_names)
+
+    media_type = negotiation.negotiate(request.headers.get("accept"))
+    return await negotiated_response(
+        services, request, media_type, ("topics", part), source.version, json_body, cdn.topics_keys(part)
+    )
 
 
-@app.get(
+@router.get(
     "/parts",
     response_model=PartsResponse,
+    responses=negotiation.OPENAPI_RESPONSES,
     summary="取得可用的 part",
     description=(
             "選擇指定 `topic` 來篩選符合的 `part` 清單。\n"
@@ -244,31 +1524,32 @@ async def get_topics(
     tags=["Metadata"]
 )
 async def get_parts(
+        request: Request,
         topic: Optional[str] = Query(None, description="Topic name"),
-        db: Session = Depends(get_db)
+        services: Services = Depends(get_services)
 ):
     logger.info(f"查詢 parts: topic={topic if topic else 'all'}")
-    filters = []
-    if topic:
-        filters.append(models.Word.topic == topic)
-
-    query = db.query(models.Word.part).distinct()
-    if filters:
-        query = query.filter(*filters)
-    parts = query.all()
-
-    part_numbers = [part[0] for part in parts]
-    if not part_numbers:
-        logger.warning(f"未找到 parts: topic={topic if topic else 'all'}")
-        raise HTTPException(status_code=404, detail="No parts found for the specified topic")
-
-    logger.info(f"找到 {len(part_numbers)} 個 parts")
-    return PartsResponse(count=len(part_numbers), parts=part_numbers)
+    # 語料檔與唯讀模型提供相同的 topics() / parts() 與 version
+    source = await current_corpus_file(services) or await current_read_model(services)
+
+    def json_body() -> bytes:
+        part_numbers = source.parts(topic)
+        if not part_numbers:
+            logger.warning(f"未找到 parts: topic={topic if topic else 'all'}")
+            raise HTTPException(status_code=404, detail="No parts found for the specified topic")
+        logger.info(f"找到 {len(part_numbers)} 個 parts")
+        return parts_body(part_numbers)
+
+    media_type = negotiation.negotiate(request.headers.get("accept"))
+    return await negotiated_response(
+        services, request, media_type, ("parts", topic), source.version, json_body, cdn.parts_keys(topic)
+    )
 
 
-@app.get(
+@router.get(
     "/words",
     response_model=PartResponse,
+    responses=negotiation.OPENAPI_RESPONSES,
     summary="取得單字資料",
     description=(
             "可透過 `part` 和 `topic` 兩種 Query 參數來篩選單字。\n"
@@ -277,81 +1558,211 @@ async def get_parts(
     tags=["Metadata"]
 )
 async def get_words(
+        request: Request,
         part: Optional[int] = Query(None, description="Part number"),
         topic: Optional[str] = Query(None, description="Topic name"),
-        db: Session = Depends(get_db)
+        services: Services = Depends(get_services)
 ):
     logger.info(f"查詢單字: part={part if part else 'all'}, topic={topic if topic else 'all'}")
-    # 動態構建過濾條件
-    filters = []
-    if part:
-        filters.append(models.Word.part == part)
-    if topic:
-        filters.append(models.Word.topic == topic)
-
-    # 查詢數據庫
-    query = db.query(models.Word)
-    if filters:
-        query = query.filter(*filters)
-    words = query.all()
-
-    if not words:
+    media_type = negotiation.negotiate(request.headers.get("accept"))
+    corpus = await current_corpus_file(services)
+    cache_key = ("words", part, topic)
+    surrogate_keys = cdn.words_keys(part, topic)
+
+    def not_found():
         logger.warning(f"未找到單字: part={part if part else 'all'}, topic={topic if topic else 'all'}")
         raise HTTPException(status_code=404, detail="No words found for the specified part and topic")
 
-    word_schemas = []
-    for word in words:
-        pronunciations_data = json.loads(word.pronunciations) if word.pronunciations else []
-        definitions_data = json.loads(word.definitions) if word.definitions else []
-        verbs_data = json.loads(word.verbs) if word.verbs else []
-
-        pronunciations = [PronunciationSchema(**p) for p in pronunciations_data]
-
-        definitions = []
-        for d in definitions_data:
-            examples_data = d.get("examples", [])
-            examples = [ExampleSchema(**e) for e in examples_data]
-            definition = DefinitionSchema(
-                pos=d.get("pos"),
-                definition=d.get("definition"),
-                translation=d.get("translation"),
-                examples=examples
-            )
-            definitions.append(definition)
+    if corpus is not None:
+        def corpus_body() -> bytes:
+            body = corpus.words_body(part, topic)
+            if body is None:
+                not_found()
+            return body
+
+        return await negotiated_response(
+            services, request, media_type, cache_key, corpus.version, corpus_body, surrogate_keys, cache_json=False
+        )
+
+    model = await current_read_model(services)
 
-        verbs = [VerbFormSchema(**v) for v in verbs_data]
+    def model_body() -> bytes:
+        words = model.words(part, topic)
+        if not words:
+            not_found()
+        logger.info(f"找到 {len(words)} 個單字")
+        return words_body(words)
 
-        word_schema = WordSchema(
-            word=word.word,
-            pos=word.pos,
-            meaning=word.meaning,
-            pronunciations=pronunciations,
-            definitions=definitions,
-            verbs=verbs
+    return await negotiated_response(services, request, media_type, cache_key, model.version, model_body, surrogate_keys)
+
+
+@router.get(
+    "/changes",
+    response_model=ChangesResponse,
+    responses=negotiation.OPENAPI_RESPONSES,
+    summary="取得增量變更",
+    description=(
+            "回傳全域資料版本 `since` 之後新增、更新 (`words`、`entries`) 或刪除 (`deleted`) 的單字與練習題。\n"
+            "用戶端保存回應中的 `version`，下次以 `since=<version>` 取得之後的變更；首次同步不傳 `since`，取得全部資料。\n"
+            "應先套用 `deleted` 再以 id 套用 `words` / `entries`。"
+            "若 `since` 大於伺服器目前的版本 (例如資料庫已重建)，`reset` 為 true，用戶端應捨棄本地資料並重新進行首次同步。"
+    ),
+    tags=["Metadata"]
+)
+async def get_changes(
+        request: Request,
+        since: Optional[int] = Query(None, ge=0, description="上次同步取得的資料版本，首次同步時省略"),
+        db: Session = Depends(get_db),
+        services: Services = Depends(get_services)
+):
+    def json_body() -> bytes:
+        change_set = changes.fetch(db, since)
+        if since is not None and since > change_set.version:
+            return json_model_body(ChangesResponse(
+                since=since, version=change_set.version, reset=True, words=[], entries=[], deleted=[]
+            ))
+        services.changes_versions.add(change_set.version)
+        logger.info(
+            f"查詢增量變更: since={since}, version={change_set.version}, 單字={len(change_set.words)}, "
+            f"練習題={len(change_set.entries)}, 刪除={len(change_set.deleted)}"
         )
-        word_schemas.append(word_schema)
+        return json_model_body(ChangesResponse(
+            since=since,
+            version=change_set.version,
+            words=[
+                WordChangeSchema(id=word.id, part=word.part, topic=word.topic, version=version,
+                                 **dict(word_to_schema(word)))
+                for version, word in change_set.words
+            ],
+            entries=[
+                EntryChangeSchema(id=entry.id, part=entry.part, topic=entry.topic, version=version,
+                                  **dict(entry_to_schema(entry)))
+                for version, entry in change_set.entries
+            ],
+            deleted=[
+                DeletedItemSchema(item_type=srs.ITEM_TYPE_NAMES[d.item_type], item_id=d.item_id, part=d.part,
+                                  topic=d.topic, version=d.version)
+                for d in change_set.deleted
+            ]
+        ))
+
+    media_type = negotiation.negotiate(request.headers.get("accept"))
+    # `since` 由用戶端決定：只快取首次同步與本 worker 回應過的版本，其餘 (任意值) 每次重新查詢、不放入快取
+    cacheable = since is None or since in services.changes_versions
+    return await negotiated_response(
+        services, request, media_type, ("changes", since), services.data_versions.current(), json_body,
+        [cdn.CHANGES], cache_control="no-cache",
+        response_cache=services.changes_cache if cacheable else UNCACHED
+    )
+
 
-    logger.info(f"找到 {len(word_schemas)} 個單字")
-    return PartResponse(words=word_schemas)
+@router.get(
+    "/events",
+    summary="訂閱資料變更事件",
+    description=(
+            "Server-Sent Events 串流 (`text/event-stream`)。連線後先收到 `version` 事件 (目前的資料版本)，"
+            "之後每次新增或刪除單字 / 練習題都會收到 `change` 事件，列出變更的 `part`、`topic` 與其 `version`，"
+            "用戶端據此只重新讀取受影響的主題，不必定時輪詢。\n"
+            "重新連線時以 `Last-Event-ID` 標頭 (EventSource 會自動帶上) 或 `since` 參數指定上次收到的版本，"
+            "錯過的變更會合併補送；資料庫重建時收到 `reset` 事件，應重新讀取所有資料。"
+    ),
+    response_class=StreamingResponse,
+    tags=["Metadata"]
+)
+async def get_events(
+        since: Optional[int] = Query(None, ge=0, description="上次收到的資料版本"),
+        last_event_id: Optional[int] = Header(None, alias="Last-Event-ID", ge=0),
+        services: Services = Depends(get_services)
+):
+    return StreamingResponse(
+        services.events.stream(last_event_id if last_event_id is not None else since),
+        media_type=events.MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get(
+    "/bundles/manifest",
+    response_model=BundleManifestResponse,
+    summary="取得離線題庫包清單",
+    description=(
+            "列出目前的資料版本、整個題庫的 SQLite 快照，以及每個 (part, topic) 題庫包的版本、SHA-256 與檔名。\n"
+            "題庫包內容為該主題的 `words` 與 `entries` (格式與 `/words`、`/practice` 相同)。\n"
+            "檔案以內容雜湊命名且永不改變，用戶端只需在 manifest 中的雜湊改變時重新下載。\n"
+            "回應帶有 `ETag`，可用 `If-None-Match` 取得 304。需設定 `BUNDLE_DIR` 才會啟用。"
+    ),
+    tags=["Offline"]
+)
+async def get_bundle_manifest(
+        request: Request,
+        services: Services = Depends(get_services)
+):
+    manifest = await current_manifest(services)
+    headers = {"ETag": manifest.etag, "Cache-Control": "no-cache"}
+    if manifest.etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=manifest.body, media_type="application/json", headers=headers)
 
 
-@app.post(
+@router.get(
+    "/bundles/files/{name}",
+    summary="下載題庫包或快照",
+    description=(
+            "下載 manifest 中列出的檔案，回應帶有 `Cache-Control: immutable`。\n"
+            "`*.json.gz` 為主題題庫包，以 `Content-Encoding: gzip` 傳送 (用戶端不接受 gzip 時回傳解壓後的 JSON)；"
+            "`*.sqlite.gz` 為 gzip 壓縮的唯讀 SQLite 快照 (不含學習者資料)。"
+    ),
+    response_class=Response,
+    tags=["Offline"]
+)
+async def get_bundle_file(
+        request: Request,
+        name: str = Path(..., description="manifest 中的檔名"),
+        services: Services = Depends(get_services)
+):
+    path = services.bundles.path(name) if services.bundles is not None else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Bundle file not found")
+
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if name.endswith(".sqlite.gz"):
+        return FileResponse(path, media_type="application/gzip", filename=f"corpus-{name[:12]}.sqlite.gz",
+                            headers=headers)
+    headers["Vary"] = "Accept-Encoding"
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return FileResponse(path, media_type="application/json", headers=headers)
+    with open(path, "rb") as f:
+        return Response(content=gzip.decompress(f.read()), media_type="application/json", headers=headers)
+
+
+@router.post(
     "/add-practices",
     response_model=AddPracticesResponseSchema,
+    openapi_extra=json_request_body(AddPracticesRequestSchema),
     summary="新增練習題目",
     description=(
             "批次新增練習題目以及對應的選項。\n"
-            "需要提供 `Bearer Token` 驗證。"
+            "需要提供 `Bearer Token` 驗證。\n"
+            "佇列模式 (`INGEST_QUEUE=1`) 下帶有 `Prefer: respond-async` 時立即回傳 202 與工作 id。"
     ),
     tags=["Admin"]
 )
 async def add_practices(
-        add_request: AddPracticesRequestSchema = Body(...),
+        request: Request,
+        add_request: AddPracticesRequestSchema = Depends(validated_body(ADD_PRACTICES_ADAPTER)),
         part: int = Query(..., description="Part number"),
         topic: str = Query(..., description="Topic name"),
         db: Session = Depends(get_db),
+        services: Services = Depends(get_services),
         token: str = Depends(verify_bearer_token)
 ):
+    if services.ingest is not None:
+        return await queued_write(
+            services, request, ingest.Job(ingest.PRACTICES, part=part, topic=topic, entries=add_request.root),
+            lambda job: AddPracticesResponseSchema(message="Entries added successfully", added_entries=job.added)
+        )
+
     added_entries = []
     for entry_id, entry_data in add_request.root.items():
         existing_entry = db.query(models.Entry).filter(
@@ -361,42 +1772,21 @@ async def add_practices(
         ).first()
         if existing_entry:
             logger.warning(f"練習題已存在: entry_id={entry_id}, part={part}, topic={topic}")
-            raise HTTPException(
-                status_code=409,
-                detail=f"entry_id '{entry_id}' already exists in part {part} and topic '{topic}'"
-            )
-
-        question_hash = int(hashlib.sha256(entry_data.question.encode()).hexdigest()[:8], 16)
-
-        new_entry = models.Entry(
-            entry_id=entry_id,
-            question=entry_data.question,
-            question_hash=question_hash,
-            answer=entry_data.answer,
-            topic=topic,
-            part=part
-        )
-        db.add(new_entry)
-        db.commit()
-        db.refresh(new_entry)
-
-        choices = entry_data.choices
-        for idx, choice in enumerate(choices, start=1):
-            if ": " in choice:
-                _, choice_text = choice.split(": ", 1)
-            else:
-                choice_text = choice
-            new_choice = models.Choice(
-                entry_id=new_entry.id,
-                choice_text=choice_text,
-                choice_order=idx
-            )
-            db.add(new_choice)
+            if added_entries:
+                # 衝突之前的練習題已各自提交
+                await publish_changes(services, cdn.written_keys(entry_topics=[(part, topic)]))
+            raise HTTPException(status_code=409, detail=ingest.entry_conflict(part, topic, entry_id))
+
+        version = versioning.bump(db)
+        db.add(ingest.build_entry(part, topic, entry_id, entry_data, version))
+        services.data_versions.note(version)
         db.commit()
 
         added_entries.append(entry_id)
         logger.info(f"已新增練習題: entry_id={entry_id}")
 
+    if added_entries:
+        await publish_changes(services, cdn.written_keys(entry_topics=[(part, topic)]))
     logger.info(f"成功新增 {len(added_entries)} 個練習題")
     return AddPracticesResponseSchema(
         message="Entries added successfully",
@@ -404,19 +1794,23 @@ async def add_practices(
     )
 
 
-@app.post(
+@router.post(
     "/add-words",
     response_model=AddWordsResponseSchema,
+    openapi_extra=json_request_body(AddWordsRequestSchema),
     summary="新增單字",
     description=(
             "批次新增單字內容。\n"
-            "需要提供 `Bearer Token` 驗證。"
+            "需要提供 `Bearer Token` 驗證。\n"
+            "佇列模式 (`INGEST_QUEUE=1`) 下帶有 `Prefer: respond-async` 時立即回傳 202 與工作 id。"
     ),
     tags=["Admin"]
 )
 async def add_words(
-        request_data: AddWordsRequestSchema = Body(...),
+        request: Request,
+        request_data: AddWordsRequestSchema = Depends(validated_body(ADD_WORDS_ADAPTER)),
         db: Session = Depends(get_db),
+        services: Services = Depends(get_services),
         token: str = Depends(verify_bearer_token)
 ):
     """
@@ -425,7 +1819,14 @@ async def add_words(
     若資料庫已有相同 (part, topic, word)，則回傳 409 Conflict。
     """
     logger.info(f"新增單字: 數量={len(request_data.words)}")
+    if services.ingest is not None:
+        return await queued_write(
+            services, request, ingest.Job(ingest.WORDS, words=request_data.words),
+            lambda job: AddWordsResponseSchema(message="Words added successfully", added_words=job.added)
+        )
+
     added_words = []
+    written_topics = []
 
     for word_item in request_data.words:
         # 檢查 (part, topic, word) 是否已存在
@@ -437,34 +1838,23 @@ async def add_words(
 
         if existing_word:
             logger.warning(f"單字已存在: word={word_item.word}, part={word_item.part}, topic={word_item.topic}")
-            raise HTTPException(
-                status_code=409,
-                detail=f"Word '{word_item.word}' already exists under part {word_item.part} "
-                       f"and topic '{word_item.topic}'"
-            )
-
-        # 轉換成 JSON 字串存入 DB
-        pronunciations_json = json.dumps([p.model_dump() for p in word_item.pronunciations], ensure_ascii=False)
-        definitions_json = json.dumps([d.model_dump() for d in word_item.definitions], ensure_ascii=False)
-        verbs_json = json.dumps([v.model_dump() for v in word_item.verbs], ensure_ascii=False)
-
-        new_word = models.Word(
-            part=word_item.part,
-            topic=word_item.topic,
-            word=word_item.word,
-            pos=word_item.pos,
-            meaning=word_item.meaning,
-            pronunciations=pronunciations_json,
-            definitions=definitions_json,
-            verbs=verbs_json
-        )
-        db.add(new_word)
+            if added_words:
+                # 衝突之前的單字已各自提交
+                await publish_changes(services, cdn.written_keys(word_topics=written_topics))
+            raise HTTPException(status_code=409, detail=ingest.word_conflict(word_item))
+
+        version = versioning.bump(db)
+        db.add(ingest.build_word(word_item, version))
+        services.data_versions.note(version)
         db.commit()
-        db.refresh(new_word)
 
         added_words.append(word_item.word)
+        if (word_item.part, word_item.topic) not in written_topics:
+            written_topics.append((word_item.part, word_item.topic))
         logger.info(f"已新增單字: word={word_item.word}")
 
+    if added_words:
+        await publish_changes(services, cdn.written_keys(word_topics=written_topics))
     logger.info(f"成功新增 {len(added_words)} 個單字")
     return AddWordsResponseSchema(
         message="Words added successfully",
@@ -472,5 +1862,228 @@ async def add_words(
     )
 
 
+@router.put(
+    "/topics/{part}/{topic}",
+    response_model=ReplaceTopicResponseSchema,
+    openapi_extra=json_request_body(ReplaceTopicRequestSchema),
+    summary="替換整個主題",
+    description=(
+            "以請求中的單字與練習題替換該主題的全部內容：不在請求中的項目會被刪除 (記錄於 `/changes` 的 `deleted`)，"
+            "內容改變的項目就地更新 (保留 id 與作答統計)，其餘新增。\n"
+            "新內容先寫入暫存表，再以單一短交易換入，讀取端只會看到替換前或替換後的主題。\n"
+            "需要提供 `Bearer Token` 驗證。"
+    ),
+    tags=["Admin"]
+)
+async def replace_topic(
+        replace_request: ReplaceTopicRequestSchema = Depends(validated_body(REPLACE_TOPIC_ADAPTER)),
+        part: int = Path(..., description="Part number"),
+        topic: str = Path(..., description="Topic name"),
+        services: Services = Depends(get_services),
+        token: str = Depends(verify_bearer_token)
+):
+    duplicates = staging.duplicate_words(replace_request.words)
+    if duplicates:
+        raise HTTPException(status_code=400, detail=f"Duplicate words in request: {', '.join(duplicates)}")
+
+    result = await asyncio.to_thread(
+        staging.replace_topic, get_engine(), part, topic, replace_request.words, replace_request.entries
+    )
+    if result.changed:
+        services.data_versions.note(result.version)
+        await publish_changes(services, cdn.written_keys(word_topics=[(part, topic)], entry_topics=[(part, topic)]))
+    logger.info(
+        f"替換主題: part={part}, topic={topic}, 版本={result.version}, "
+        f"單字 +{len(result.added_words)} ~{len(result.updated_words)} -{len(result.deleted_words)}, "
+        f"練習題 +{len(result.added_entries)} ~{len(result.updated_entries)} -{len(result.deleted_entries)}, "
+        f"換入 {result.swap_ms:.1f}ms"
+    )
+    return ReplaceTopicResponseSchema(
+        message="Topic replaced successfully" if result.changed else "Topic unchanged",
+        version=result.version or services.data_versions.current(),
+        added_words=result.added_words,
+        updated_words=result.updated_words,
+        deleted_words=result.deleted_words,
+        added_entries=result.added_entries,
+        updated_entries=result.updated_entries,
+        deleted_entries=result.deleted_entries
+    )
+
+
+@router.get(
+    "/ingest/jobs/{job_id}",
+    response_model=IngestJobResponse,
+    response_model_exclude_none=True,
+    summary="查詢寫入工作",
+    description=(
+            "查詢佇列模式下 `/add-words`、`/add-practices` 的工作狀態 (`queued` / `done` / `failed`)。\n"
+            "失敗時 `status_code`、`error` 與同步模式的錯誤回應相同。完成的工作保留 `INGEST_JOB_TTL` 秒。\n"
+            "需要提供 `Bearer Token` 驗證。"
+    ),
+    tags=["Admin"]
+)
+async def get_ingest_job(
+        job_id: str = Path(..., max_length=64, description="新增請求回傳的工作 id"),
+        services: Services = Depends(get_services),
+        token: str = Depends(verify_bearer_token)
+):
+    if services.ingest is None:
+        raise HTTPException(status_code=404, detail="Ingestion queue is disabled")
+    job = await asyncio.to_thread(services.ingest.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return json_model_response(job_to_schema(job), exclude_none=True)
+
+
+@router.get(
+    "/review/{learner_id}/due",
+    response_model=ReviewBatchResponse,
+    summary="取得待複習項目",
+    description=(
+            "依 SM-2 排程回傳學習者最早到期的項目 (含單字或練習題內容)。\n"
+            "若提供 `part` 與 `topic`，到期項目不足 `limit` 時會以該主題中尚未學過的項目補足，"
+            "最多 `new_limit` 筆。"
+    ),
+    tags=["Review"]
+)
+async def get_review_due(
+        learner_id: str = Path(..., pattern=LEARNER_ID_PATTERN, description="匿名學習者 id"),
+        limit: int = Query(20, ge=1, le=100, description="最多回傳筆數"),
+        part: Optional[int] = Query(None, description="Part number，用於補充新項目"),
+        topic: Optional[str] = Query(None, description="Topic name，用於補充新項目"),
+        kind: Literal["word", "entry"] = Query("word", description="補充新項目的類型"),
+        new_limit: int = Query(10, ge=0, le=100, description="最多補充的新項目數"),
+        db: Session = Depends(get_db),
+        services: Services = Depends(get_services)
+):
+    now = int(time.time())
+    states = srs.fetch_due(db, learner_id, now, limit)
+
+    corpus = await current_corpus_file(services)
+    model = await current_read_model(services) if corpus is None else None
+    items = review_items(corpus, model, [(s.item_type, s.item_id, s, False) for s in states], now)
+
+    # 只以實際回傳的到期項目計算補充的名額
+    remaining = min(limit - len(items), new_limit)
+    if remaining > 0 and part is not None and topic:
+        item_type = srs.ITEM_TYPES[kind]
+        new_ids = srs.fetch_new(db, learner_id, item_type, part, topic, remaining)
+        items.extend(review_items(corpus, model, [(item_type, item_id, None, True) for item_id in new_ids], now))
+
+    logger.info(f"查詢待複習項目: learner={learner_id}, 到期={len(states)}, 回傳={len(items)}")
+    return json_model_response(ReviewBatchResponse(learner_id=learner_id, now=now, items=items), headers=NO_STORE)
+
+
+@router.post(
+    "/review/{learner_id}/grades",
+    response_model=ReviewGradeResponseSchema,
+    summary="批次提交複習結果",
+    description=(
+            "一次提交多筆複習結果 (grade 0~5)，依 SM-2 更新排程並以單一交易寫入。\n"
+            "同一批次中重複出現的項目會依順序連續套用。"
+    ),
+    tags=["Review"]
+)
+async def post_review_grades(
+        learner_id: str = Path(..., pattern=LEARNER_ID_PATTERN, description="匿名學習者 id"),
+        request_data: ReviewGradeRequestSchema = Body(...),
+        db: Session = Depends(get_db)
+):
+    now = int(time.time())
+    results = [
+        (srs.ITEM_TYPES[r.item_type], r.item_id, r.grade, min(r.reviewed_at or now, now))
+        for r in request_data.results
+    ]
+
+    missing = srs.missing_items(db, [(t, i) for t, i, _, _ in results])
+    if missing:
+        logger.warning(f"複習項目不存在: learner={learner_id}, missing={missing}")
+        raise HTTPException(
+            status_code=404,
+            detail=[{"item_type": srs.ITEM_TYPE_NAMES[t], "item_id": i} for t, i in missing]
+        )
+
+    rows = srs.apply_grades(db, learner_id, results)
+    db.commit()
+
+    logger.info(f"已更新複習狀態: learner={learner_id}, 數量={len(rows)}")
+    return ReviewGradeResponseSchema(
+        updated=len(rows),
+        states=[
+            ReviewStateSchema(
+                item_type=srs.ITEM_TYPE_NAMES[row["item_type"]],
+                item_id=row["item_id"],
+                due=row["due"],
+                interval=row["interval"],
+                ease=row["ease"],
+                reps=row["reps"],
+                lapses=row["lapses"]
+            )
+            for row in rows
+        ]
+    )
+
+
+def run_workers(settings: Settings):
+    """
+    多 worker 模式：主進程綁定監聽 socket 後交給各 worker 進程共用，
+    每個 worker 以 `create_app()` 建立自己的應用程式，各自擁有連線池與讀取快取。
+    """
+    import uvicorn
+    from uvicorn.supervisors import Multiprocess
+
+    config = uvicorn.Config(
+        "app:create_app", factory=True, host=settings.host, port=settings.port, workers=settings.workers
+    )
+    sock = config.bind_socket()
+    # uvicorn 建立的 socket proto 為 0，asyncio 因此不會替接受的連線設定 TCP_NODELAY，
+    # keep-alive 連線會卡在 Nagle 與 delayed ACK (每個請求約 40ms)；
+    # 在監聽 socket 上設定後，Linux 會讓接受的連線繼承此選項
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    Multiprocess(config, sockets=[sock]).run()
+
+
+def main():
+    import uvicorn
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="英簡單後端 API 服務")
+    parser.add_argument('--env', type=str, default='.env', help='環境變數設定檔路徑')
+    parser.add_argument('--log-file', type=str, default='api.log', help='日誌檔案路徑')
+    parser.add_argument('--debug', action='store_true', help='啟用偵錯模式')
+    parser.add_argument('--workers', type=int, default=None, help='worker 進程數 (預設讀取 WORKERS 環境變數，否則為 1)')
+    parser.add_argument('--migrate', action='store_true', help='啟動前先執行資料庫結構遷移')
+    args = parser.parse_args()
+
+    # 命令列參數寫回環境變數，讓 worker 子進程的 `Settings.from_env()` 取得相同設定
+    load_dotenv(args.env)
+    os.environ["LOG_FILE"] = args.log_file
+    if args.debug:
+        os.environ["DEBUG"] = "1"
+    if args.workers:
+        os.environ["WORKERS"] = str(args.workers)
+
+    settings = Settings.from_env()
+    configure_logging(settings)
+
+    if args.migrate:
+        from migrate import migrate
+        migrate(init_engine(settings.database_url))
+
+    if settings.corpus_file:
+        # 在啟動 worker 前先發佈語料檔，worker 啟動後只需 mmap
+        import corpusfile
+        corpusfile.CorpusFileStore(settings.corpus_file, init_engine(settings.database_url)).publish()
+    if settings.bundle_dir:
+        import bundles
+        bundles.publish(init_engine(settings.database_url), settings.bundle_dir)
+
+    if settings.workers > 1:
+        logger.info(f"以 {settings.workers} 個 worker 啟動")
+        run_workers(settings)
+    else:
+        uvicorn.run(create_app(settings), host=settings.host, port=settings.port)
+
+
 if __name__ == "__main__":
-    uvicorn.run(app, host=HOST, port=PORT)
+    main()
@@ -0,0 +1,127 @@
+"""
+批次回填 (backfill)：以許多個短交易改寫既有的資料列，讓大型 `data.db` 的遷移不會長時間持有寫入鎖。
+
+- 來源表依整數主鍵 `id` 遞增掃描；遷移建立回填時記錄當下的最大 id (`end`)，
+  之後新增的資料列已由應用程式以新的方式寫入，不需回填
+- 每個批次處理 `cursor < id <= hi` 的資料列，並在同一交易中將檢查點 (`schema_backfills.cursor`) 推進到 `hi`：
+  批次不是全部提交就是全部不提交，中斷 (Ctrl+C、部署重啟) 後重新執行會由檢查點繼續，不會重複處理
+- 批次大小依實際耗時調整，使每個交易約 `target_ms` 毫秒；批次之間暫停 `pause` 秒讓 API 的寫入取得鎖，
+  因此回填可以在 API 運作中執行
+"""
+import logging
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import func, select, Table
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger("quiz-migrate")
+
+MIN_BATCH = 10
+MAX_BATCH = 20000
+
+
+class Backfill(NamedTuple):
+    name: str
+    table: Table  # 來源表，需有整數主鍵 id
+    apply: Callable[[Session, int, int], int]  # 處理 lo < id <= hi 的資料列，回傳改寫的筆數
+
+
+class BackfillResult(NamedTuple):
+    name: str
+    rows: int
+    batches: int
+    max_batch_ms: float  # 單一批次交易的最長耗時 (持有寫入鎖的上限)
+    elapsed: float
+
+
+def enqueue(conn: Connection, backfill: Backfill):
+    """
+    建立回填的檢查點，需在建立 / 修改結構的遷移交易中呼叫；已存在時不變。
+    來源表沒有資料時直接標記為完成。
+    """
+    start, end = conn.execute(select(func.min(backfill.table.c.id), func.max(backfill.table.c.id))).one()
+    now = int(time.time())
+    conn.execute(
+        sqlite_insert(models.SchemaBackfill)
+        .values(name=backfill.name, cursor=(start or 1) - 1, end=end or 0, rows=0, batches=0,
+                started_at=now, updated_at=now, finished_at=None if end else now)
+        .on_conflict_do_nothing(index_elements=["name"])
+    )
+
+
+def pending(engine: Engine) -> List[str]:
+    with engine.connect() as conn:
+        return list(conn.execute(
+            select(models.SchemaBackfill.name)
+            .where(models.SchemaBackfill.finished_at.is_(None))
+            .order_by(models.SchemaBackfill.started_at, models.SchemaBackfill.name)
+        ).scalars())
+
+
+def status(engine: Engine) -> Dict[str, models.SchemaBackfill]:
+    with Session(engine) as db:
+        return {row.name: row for row in db.query(models.SchemaBackfill).all()}
+
+
+def run(
+        engine: Engine,
+        backfill: Backfill,
+        target_ms: float = 5.0,
+        pause: float = 0.01,
+        batch_size: int = 500,
+        progress_interval: float = 5.0
+) -> Optional[BackfillResult]:
+    """
+    由檢查點繼續執行回填直到完成，回傳本次執行的統計；回填不存在或已完成時回傳 None。
+    """
+    id_column = backfill.table.c.id
+    started = last_report = time.perf_counter()
+    rows = batches = 0
+    max_batch_ms = 0.0
+    while True:
+        with Session(engine) as db:
+            state = db.get(models.SchemaBackfill, backfill.name)
+            if state is None or state.finished_at is not None:
+                break
+            # 先以唯讀查詢決定批次上界；寫入鎖從第一個寫入陳述式開始持有到提交為止
+            hi = db.execute(
+                select(id_column).where(id_column > state.cursor, id_column <= state.end)
+                .order_by(id_column).offset(batch_size - 1).limit(1)
+            ).scalar() or state.end
+            batch_started = time.perf_counter()
+            count = backfill.apply(db, state.cursor, hi)
+            now = int(time.time())
+            state.cursor = hi
+            state.rows += count
+            state.batches += 1
+            state.updated_at = now
+            if hi >= state.end:
+                state.finished_at = now
+            db.commit()
+            batch_ms = (time.perf_counter() - batch_started) * 1000
+            done, end = hi, state.end
+            finished = state.finished_at is not None
+
+        rows += count
+        batches += 1
+        max_batch_ms = max(max_batch_ms, batch_ms)
+        # 依本批耗時調整下一批的大小，每次最多放大兩倍
+        batch_size = max(MIN_BATCH, min(MAX_BATCH, int(batch_size * min(2.0, target_ms / max(batch_ms, 0.1)))))
+        if finished:
+            break
+        if time.perf_counter() - last_report >= progress_interval:
+            last_report = time.perf_counter()
+            logger.info(f"回填 {backfill.name}: id {done}/{end}，已改寫 {rows} 筆，批次大小 {batch_size}")
+        time.sleep(pause)
+
+    if not batches:
+        return None
+    result = BackfillResult(backfill.name, rows, batches, max_batch_ms, time.perf_counter() - started)
+    logger.info(f"回填 {backfill.name} 完成: {result.rows} 筆，{result.batches} 個批次，"
+                f"單批最長 {result.max_batch_ms:.1f} ms，耗時 {result.elapsed:.1f} 秒")
+    return result
@@ -0,0 +1,330 @@
+"""
+離線使用的版本化題庫包 (bundle) 與整個題庫的唯讀 SQLite 快照。
+
+發佈流程 (`publish()`)：
+
+1. 以 SQLite online backup API 取得資料庫的一致快照，刪除學習者相關的表格 (作答紀錄、統計、複習狀態)
+2. 由快照 (而非線上資料庫) 逐一產生每個 (part, topic) 的題庫包：單字與練習題的格式與 `/words`、`/practice` 相同，
+   以 gzip 壓縮
+3. 快照改回 rollback journal 並 VACUUM 後以 gzip 壓縮；所有檔案以內容的 SHA-256 命名 (內容定址)，
+   檔名相同即內容相同，因此可以 immutable 快取
+4. 最後以 rename 原子替換 `manifest.json`，列出資料版本、快照與各主題題庫包的版本、雜湊與檔名
+
+主題的版本為其單字、練習題與刪除紀錄的最大 `version`；只有版本改變的主題會重新產生題庫包，
+用戶端保留的其他題庫包在新的 manifest 中仍是同一個檔案。
+發佈以 `<目錄>/.lock` 檔案鎖序列化，舊檔案保留到下一次發佈之後 (正在下載的用戶端不受影響)。
+
+也可手動發佈：
+
+    python bundles.py [--env .env] [--output bundles/]
+"""
+import argparse
+import fcntl
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import create_engine, func, select, union_all
+from sqlalchemy.engine import Connection, Engine
+
+import corpusfile
+import models
+import readmodel
+import versioning
+
+logger = logging.getLogger("quiz-api")
+
+MANIFEST = "manifest.json"
+FILE_NAME_PATTERN = re.compile(r"^[0-9a-f]{64}\.(json|sqlite)\.gz$")
+
+# 快照中不包含的學習者資料
+PRIVATE_TABLES = (
+    models.PracticeAttempt.__tablename__,
+    models.EntryStat.__tablename__,
+    models.ChoiceStat.__tablename__,
+    models.ReviewState.__tablename__,
+)
+
+
+def snapshot(engine: Engine, path: str) -> int:
+    """以 online backup API 將資料庫複製到 `path`，移除學習者資料，回傳快照中的資料版本。"""
+    raw = engine.raw_connection()
+    target = sqlite3.connect(path)
+    try:
+        raw.driver_connection.backup(target)
+        for table in PRIVATE_TABLES:
+            target.execute(f"DROP TABLE IF EXISTS {table}")
+        target.commit()
+        row = target.execute("SELECT version FROM data_version WHERE id = 1").fetchone()
+    finally:
+        target.close()
+        raw.close()
+    return row[0] if row else 0
+
+
+@contextmanager
+def temporary_snapshot(engine: Engine, directory: str) -> Iterator[Tuple[int, str]]:
+    """在 `directory` 中建立暫時的快照，回傳 (資料版本, 路徑)，離開時刪除 (含 -wal / -shm)。"""
+    fd, path = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+    os.close(fd)
+    try:
+        yield snapshot(engine, path), path
+    finally:
+        for leftover in (path, f"{path}-wal", f"{path}-shm"):
+            if os.path.exists(leftover):
+                os.unlink(leftover)
+
+
+@contextmanager
+def connect_snapshot(path: str) -> Iterator[Connection]:
+    snapshot_engine = create_engine(f"sqlite:///{path}")
+    try:
+        with snapshot_engine.connect() as conn:
+            yield conn
+    finally:
+        snapshot_engine.dispose()
+
+
+def finalize_snapshot(path: str):
+    """
+    改回 rollback journal 並 VACUUM，下載後單一檔案即可開啟。
+    (`database.py` 會把所有以 SQLAlchemy 開啟的 SQLite 連線設為 WAL，因此在產生題庫包之後才執行。)
+    """
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def topic_versions(conn: Connection) -> Dict[readmodel.TopicKey, int]:
+    """仍有單字或練習題的主題及其版本 (包含刪除紀錄)。"""
+    live = union_all(
+        select(models.Word.part, models.Word.topic, models.Word.version),
+        select(models.Entry.part, models.Entry.topic, models.Entry.version),
+    ).subquery()
+    versions = {
+        (part, topic): version
+        for part, topic, version in conn.execute(
+            select(live.c.part, live.c.topic, func.max(live.c.version)).group_by(live.c.part, live.c.topic)
+        )
+    }
+    for part, topic, version in conn.execute(
+            select(models.Tombstone.part, models.Tombstone.topic, func.max(models.Tombstone.version))
+            .group_by(models.Tombstone.part, models.Tombstone.topic)
+    ):
+        if (part, topic) in versions:
+            versions[(part, topic)] = max(versions[(part, topic)], version)
+    return versions
+
+
+def topic_records(
+        conn: Connection, part: int, topic: str
+) -> Tuple[List[readmodel.WordRecord], List[readmodel.EntryRecord]]:
+    """讀取單一主題的單字 (依 word 排序) 與練習題 (依 entry_id 排序)，排序與 API 相同。"""
+    words = [
+        readmodel.WordRecord(*row)
+        for row in conn.execute(
+            select(models.Word.id, models.Word.part, models.Word.topic, models.Word.word, models.Word.pos,
+                   models.Word.meaning, models.Word.pronunciations, models.Word.definitions, models.Word.verbs)
+            .where(models.Word.part == part, models.Word.topic == topic)
+            .order_by(models.Word.word)
+        )
+    ]
+    choices: Dict[int, List[readmodel.ChoiceRecord]] = {}
+    for entry_pk, choice_order, choice_text in conn.execute(
+            select(models.Choice.entry_id, models.Choice.choice_order, models.Choice.choice_text)
+            .join(models.Entry, models.Entry.id == models.Choice.entry_id)
+            .where(models.Entry.part == part, models.Entry.topic == topic)
+            .order_by(models.Choice.entry_id, models.Choice.choice_order)
+    ):
+        choices.setdefault(entry_pk, []).append(readmodel.ChoiceRecord(choice_order, choice_text))
+    entries = [
+        readmodel.EntryRecord(row.id, row.part, row.topic, row.entry_id, row.question, row.question_hash,
+                              row.answer, tuple(choices.get(row.id, ())))
+        for row in conn.execute(
+            select(models.Entry.id, models.Entry.part, models.Entry.topic, models.Entry.entry_id,
+                   models.Entry.question, models.Entry.question_hash, models.Entry.answer)
+            .where(models.Entry.part == part, models.Entry.topic == topic)
+            .order_by(models.Entry.entry_id)
+        )
+    ]
+    return words, entries
+
+
+def encode_bundle(part: int, topic: str, version: int, words, entries) -> bytes:
+    return b"".join((
+        b'{"part":', str(part).encode(),
+        b',"topic":', json.dumps(topic, ensure_ascii=False).encode(),
+        b',"version":', str(version).encode(),
+        b',"words":[', b",".join(map(corpusfile.encode_word, words)),
+        b'],"entries":[', b",".join(map(corpusfile.encode_entry, entries)),
+        b"]}",
+    ))
+
+
+def write_content_addressed(directory: str, data: bytes, extension: str) -> dict:
+    """以 SHA-256 命名寫入檔案 (已存在則略過)，回傳 manifest 中的檔案描述。"""
+    digest = hashlib.sha256(data).hexdigest()
+    name = f"{digest}{extension}"
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        fd, tmp_path = tempfile.mkstemp(prefix=".bundle-", dir=directory)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return {"file": name, "sha256": digest, "size": len(data)}
+
+
+def read_manifest(directory: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(directory, MANIFEST), "rb") as f:
+            return json.loads(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def referenced_files(manifest: Optional[dict]) -> Iterator[str]:
+    if manifest:
+        yield manifest["snapshot"]["file"]
+        for bundle in manifest["topics"]:
+            yield bundle["file"]
+
+
+def build(engine: Engine, directory: str, previous: Optional[dict]) -> dict:
+    """產生快照與各主題的題庫包，寫入新的 manifest，回傳 manifest。"""
+    reusable = {
+        (bundle["part"], bundle["topic"]): bundle
+        for bundle in (previous or {}).get("topics", ())
+        if os.path.exists(os.path.join(directory, bundle["file"]))
+    }
+    topics = []
+    rebuilt = 0
+    with temporary_snapshot(engine, directory) as (version, snapshot_path):
+        with connect_snapshot(snapshot_path) as conn:
+            for (part, topic), topic_version in sorted(topic_versions(conn).items()):
+                bundle = reusable.get((part, topic))
+                if bundle is None or bundle["version"] != topic_version:
+                    words, entries = topic_records(conn, part, topic)
+                    data = gzip.compress(encode_bundle(part, topic, topic_version, words, entries), mtime=0)
+                    bundle = {"part": part, "topic": topic, "version": topic_version,
+                              "words": len(words), "entries": len(entries),
+                              **write_content_addressed(directory, data, ".json.gz")}
+                    rebuilt += 1
+                topics.append(bundle)
+
+        finalize_snapshot(snapshot_path)
+        with open(snapshot_path, "rb") as f:
+            snapshot_info = {"version": version, **write_content_addressed(
+                directory, gzip.compress(f.read(), mtime=0), ".sqlite.gz"
+            )}
+
+    manifest = {"version": version, "generated_at": int(time.time()), "snapshot": snapshot_info, "topics": topics}
+    fd, tmp_path = tempfile.mkstemp(prefix=".manifest-", dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, os.path.join(directory, MANIFEST))
+    logger.info(f"已發佈題庫包: 版本={version}, 主題={len(topics)} (重新產生 {rebuilt} 個)")
+    return manifest
+
+
+def remove_unreferenced(directory: str, keep: set):
+    for name in os.listdir(directory):
+        if FILE_NAME_PATTERN.match(name) and name not in keep:
+            os.unlink(os.path.join(directory, name))
+
+
+def publish(engine: Engine, directory: str, force: bool = False) -> dict:
+    """
+    若 manifest 不存在或版本落後資料庫，則重新發佈，回傳目前的 manifest。
+    只保留新舊兩份 manifest 引用的檔案。
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, ".lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            previous = read_manifest(directory)
+            if not force and previous is not None and previous["version"] >= versioning.read(engine):
+                return previous
+            manifest = build(engine, directory, previous)
+            remove_unreferenced(directory, set(referenced_files(previous)) | set(referenced_files(manifest)))
+            return manifest
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class Manifest:
+    """已載入的 manifest 與其回應本文 / ETag。"""
+
+    def __init__(self, data: dict):
+        self.data = data
+        self.version: int = data["version"]
+        self.body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+
+
+class BundleStore:
+    """每個 worker 持有一份，記住目前的 manifest；落後時重新讀取，必要時發佈新版本。"""
+
+    def __init__(self, directory: str, engine: Engine):
+        self.directory = directory
+        self.engine = engine
+        self._manifest: Optional[Manifest] = None
+        self._lock = threading.Lock()
+
+    def current(self, version: int) -> Optional[Manifest]:
+        manifest = self._manifest
+        if manifest is not None and manifest.version >= version:
+            return manifest
+        data = read_manifest(self.directory)
+        if data is not None and data["version"] >= version:
+            self._manifest = Manifest(data)
+            return self._manifest
+        return None
+
+    def publish(self) -> Manifest:
+        with self._lock:
+            self._manifest = Manifest(publish(self.engine, self.directory))
+            return self._manifest
+
+    def path(self, name: str) -> Optional[str]:
+        """檔名符合格式且存在時回傳完整路徑。"""
+        if not FILE_NAME_PATTERN.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.exists(path) else None
+
+
+def main():
+    from dotenv import load_dotenv
+
+    from config import Settings
+    from database import init_engine
+
+    parser = argparse.ArgumentParser(description="發佈離線題庫包與 SQLite 快照")
+    parser.add_argument('--env', type=str, default='.env', help='環境變數設定檔路徑')
+    parser.add_argument('--output', type=str, default=None, help='輸出目錄 (預設讀取 BUNDLE_DIR 環境變數)')
+    parser.add_argument('--force', action='store_true', help='即使版本未變也重新發佈')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    load_dotenv(args.env)
+    settings = Settings.from_env()
+    output = args.output or settings.bundle_dir
+    if not output:
+        parser.error("請以 --output 或 BUNDLE_DIR 指定輸出目錄")
+    publish(init_engine(settings.database_url), output, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+各 worker 自有的讀取快取 (shared-nothing)。
+
+每筆快取都記錄建立時的全域資料版本，查詢時版本不符即視為未命中，
+因此管理端寫入遞增版本後，所有 worker 的舊快取都會自動失效。
+
+快取失效後同時到達的請求由 `SingleFlight` 合併，每個 key 只計算一次。
+"""
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class ResponseCache:
+    """以 LRU 淘汰、以資料版本判斷有效性的回應快取。"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, version: int) -> Optional[Any]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: Hashable, version: int, value: Any):
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RecentKeys:
+    """最近加入的 key (以 LRU 淘汰，最多 `max_entries` 個)，例如本 worker 回應過的資料版本。"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._keys: "OrderedDict[Hashable, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key: Hashable):
+        with self._lock:
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+            while len(self._keys) > self.max_entries:
+                self._keys.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._keys
+
+
+class SingleFlight:
+    """
+    於事件迴圈中合併同一 key 的並行計算：第一個呼叫者啟動計算，其餘呼叫者等待同一個結果 (或例外)。
+
+    計算以 `asyncio.shield()` 保護，發起的請求中斷 (用戶端斷線) 時不會取消其他請求正在等待的計算。
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        future = self._flights.get(key)
+        if future is None:
+            self.leaders += 1
+            future = asyncio.ensure_future(factory())
+            self._flights[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.followers += 1
+        return await asyncio.shield(future)
+
+    def _finish(self, key: Hashable, future: asyncio.Future):
+        if self._flights.get(key) is future:
+            del self._flights[key]
+        if not future.cancelled():
+            future.exception()  # 所有等待者都已離開時，避免 "exception was never retrieved" 警告
+
+    def __len__(self) -> int:
+        return len(self._flights)
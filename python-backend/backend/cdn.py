@@ -0,0 +1,122 @@
+"""
+讓瀏覽器與 CDN / 反向代理快取讀取端點：快取策略、Surrogate-Key 與寫入後的清除 (purge) hook。
+
+每個讀取回應帶有 `Surrogate-Key`，列出內容所依賴的資料 (以空白分隔)：
+
+    pt:{part}:{topic}    /words?part=&topic=、/practice/{part}/{topic}
+    part:{part}          /words?part=、/topics?part=
+    topic:{topic}        /words?topic=、/parts?topic=
+    all                  未篩選的 /words、/topics、/parts
+    changes              /changes
+
+topic 以 URL 編碼 (`quote(topic, safe="")`)，因此鍵中不含空白。
+`/add-words` 寫入 (part, topic) 後清除 `pt`、`part`、`topic`、`all` 與 `changes`；
+`/add-practices` 只影響 `/practice`，清除 `pt` 與 `changes`。
+
+清除 hook 可設定為：
+
+- `PURGE_URL`：以 POST 呼叫該網址，`Surrogate-Key` 標頭與 JSON 本文 `{"keys": [...]}` 皆列出要清除的鍵
+  (有設定 `PURGE_TOKEN` 時附上 `Authorization: Bearer`)
+- `PURGE_HOOK`：`module:function` 形式的匯入路徑，以要清除的鍵 (list) 呼叫該函式
+
+hook 在執行緒中呼叫，失敗只記錄錯誤，不影響寫入請求。
+"""
+import importlib
+import logging
+from typing import Callable, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+logger = logging.getLogger("quiz-api")
+
+ALL = "all"
+CHANGES = "changes"
+
+Purger = Callable[[List[str]], None]
+
+
+def topic_key(part: int, topic: str) -> str:
+    return f"pt:{part}:{quote(topic, safe='')}"
+
+
+def part_key(part: int) -> str:
+    return f"part:{part}"
+
+
+def topic_name_key(topic: str) -> str:
+    return f"topic:{quote(topic, safe='')}"
+
+
+def words_keys(part: Optional[int], topic: Optional[str]) -> List[str]:
+    if part and topic:
+        return [topic_key(part, topic)]
+    if part:
+        return [part_key(part)]
+    if topic:
+        return [topic_name_key(topic)]
+    return [ALL]
+
+
+def practice_keys(part: int, topic: str) -> List[str]:
+    return [topic_key(part, topic)]
+
+
+def topics_keys(part: Optional[int]) -> List[str]:
+    return [part_key(part)] if part else [ALL]
+
+
+def parts_keys(topic: Optional[str]) -> List[str]:
+    return [topic_name_key(topic)] if topic else [ALL]
+
+
+def written_keys(
+        word_topics: Sequence[Tuple[int, str]] = (), entry_topics: Sequence[Tuple[int, str]] = ()
+) -> List[str]:
+    """寫入單字 / 練習題的 (part, topic) 之後需要清除的鍵 (依序、不重複)。"""
+    keys = {}
+    for part, topic in word_topics:
+        for key in (topic_key(part, topic), part_key(part), topic_name_key(topic)):
+            keys.setdefault(key)
+    for part, topic in entry_topics:
+        keys.setdefault(topic_key(part, topic))
+    if word_topics:
+        keys.setdefault(ALL)
+    if keys:
+        keys.setdefault(CHANGES)
+    return list(keys)
+
+
+def cache_control(max_age: int, stale_while_revalidate: int) -> str:
+    directives = [f"max-age={max_age}"]
+    if stale_while_revalidate:
+        directives.append(f"stale-while-revalidate={stale_while_revalidate}")
+    return ", ".join(directives)
+
+
+class HttpPurger:
+    """以 HTTP POST 通知 CDN / 反向代理清除指定的 Surrogate-Key。"""
+
+    def __init__(self, url: str, token: str = "", timeout: float = 5.0):
+        self.url = url
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.timeout = timeout
+
+    def __call__(self, keys: List[str]):
+        # 只在設定 PURGE_URL 時才用到，延後匯入以免增加冷啟動時間
+        import httpx
+        response = httpx.post(
+            self.url, json={"keys": keys}, headers={**self.headers, "Surrogate-Key": " ".join(keys)},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+
+
+def load_purger(purge_url: str, purge_token: str, purge_hook: str) -> Optional[Purger]:
+    """依設定建立清除 hook，都未設定時回傳 None。"""
+    if purge_hook:
+        module_name, _, attribute = purge_hook.partition(":")
+        if not attribute:
+            raise ValueError(f"PURGE_HOOK 格式應為 module:function，收到 {purge_hook!r}")
+        return getattr(importlib.import_module(module_name), attribute)
+    if purge_url:
+        return HttpPurger(purge_url, purge_token)
+    return None
@@ -0,0 +1,107 @@
+"""
+增量同步：回傳某個全域資料版本之後新增、更新或刪除的單字與練習題。
+
+`/add-words`、`/add-practices` 寫入時將資料列的 `version` 設為該次遞增後的全域版本，
+刪除時以 `record_deletion()` 寫入 `tombstones`；查詢走各表 `version` 欄位上的索引，
+成本與變更量成正比，與語料大小無關。
+"""
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+import models
+import readmodel
+import srs
+
+
+class Deletion(NamedTuple):
+    item_type: int  # srs.ITEM_TYPES
+    item_id: int
+    part: int
+    topic: str
+    version: int
+
+
+class ChangeSet(NamedTuple):
+    version: int  # 查詢時的全域資料版本，用戶端下一次以此作為 since
+    words: List[Tuple[int, readmodel.WordRecord]]  # [(version, 單字), ...]
+    entries: List[Tuple[int, readmodel.EntryRecord]]  # [(version, 練習題), ...]
+    deleted: List[Deletion]
+
+
+def record_deletion(db: Session, item_type: int, item_id: int, part: int, topic: str, version: int):
+    """記錄一筆刪除，需與刪除在同一交易中呼叫。"""
+    db.execute(
+        sqlite_insert(models.Tombstone)
+        .values(item_type=item_type, item_id=item_id, part=part, topic=topic, version=version)
+        .on_conflict_do_update(
+            index_elements=[models.Tombstone.item_type, models.Tombstone.item_id],
+            set_={"part": part, "topic": topic, "version": version}
+        )
+    )
+
+
+def fetch(db: Session, since: Optional[int]) -> ChangeSet:
+    """
+    取得 `version > since` 的單字、練習題與刪除紀錄，依版本排序。
+    `since` 為 None 時回傳所有單字與練習題 (首次同步，不含刪除紀錄)；
+    加入版本欄位之前既有的資料列版本為 0，只會出現在首次同步中。
+
+    先讀取全域版本再讀取資料列：資料列與其版本的遞增在同一交易中提交，
+    因此所有版本不大於回傳 `version` 的變更都已提交、必定會被讀到；
+    讀取期間才提交的變更也可能一併回傳，下一次同步會再出現一次 (以 id 覆寫，結果相同)。
+    同一 id 若先被刪除、之後又被重新使用，只回傳目前的資料列；用戶端應先套用刪除再套用新增 / 更新。
+    """
+    version = db.execute(
+        select(models.DataVersion.version).where(models.DataVersion.id == 1)
+    ).scalar() or 0
+    after = -1 if since is None else since
+
+    words = [
+        (row.version, readmodel.WordRecord(row.id, row.part, row.topic, row.word, row.pos, row.meaning,
+                                           row.pronunciations, row.definitions, row.verbs))
+        for row in db.execute(
+            select(models.Word.id, models.Word.part, models.Word.topic, models.Word.word, models.Word.pos,
+                   models.Word.meaning, models.Word.pronunciations, models.Word.definitions, models.Word.verbs,
+                   models.Word.version)
+            .where(models.Word.version > after)
+            .order_by(models.Word.version, models.Word.id)
+        )
+    ]
+
+    entry_rows = db.execute(
+        select(models.Entry.id, models.Entry.part, models.Entry.topic, models.Entry.entry_id,
+               models.Entry.question, models.Entry.question_hash, models.Entry.answer, models.Entry.version)
+        .where(models.Entry.version > after)
+        .order_by(models.Entry.version, models.Entry.id)
+    ).all()
+    choices = {}
+    if entry_rows:
+        for entry_pk, choice_order, choice_text in db.execute(
+                select(models.Choice.entry_id, models.Choice.choice_order, models.Choice.choice_text)
+                .join(models.Entry, models.Entry.id == models.Choice.entry_id)
+                .where(models.Entry.version > after)
+                .order_by(models.Choice.entry_id, models.Choice.choice_order)
+        ):
+            choices.setdefault(entry_pk, []).append(readmodel.ChoiceRecord(choice_order, choice_text))
+    entries = [
+        (row.version, readmodel.EntryRecord(row.id, row.part, row.topic, row.entry_id, row.question,
+                                            row.question_hash, row.answer, tuple(choices.get(row.id, ()))))
+        for row in entry_rows
+    ]
+
+    live = {(srs.ITEM_TYPES["word"], word.id) for _, word in words}
+    live.update((srs.ITEM_TYPES["entry"], entry.id) for _, entry in entries)
+    deleted = [] if since is None else [
+        Deletion(*row)
+        for row in db.execute(
+            select(models.Tombstone.item_type, models.Tombstone.item_id, models.Tombstone.part,
+                   models.Tombstone.topic, models.Tombstone.version)
+            .where(models.Tombstone.version > after)
+            .order_by(models.Tombstone.version)
+        )
+        if (row.item_type, row.item_id) not in live
+    ]
+    return ChangeSet(version, words, entries, deleted)
@@ -0,0 +1,114 @@
+"""
+API 服務設定，全部由環境變數讀取。
+
+`Settings.from_env()` 不會載入 `.env`，由啟動入口 (`app.main()` / `migrate.main()`)
+先呼叫 `load_dotenv()`；多 worker 模式下子進程會繼承主進程的環境變數。
+"""
+import os
+from dataclasses import dataclass, field
+from typing import List
+
+
+@dataclass
+class Settings:
+    host: str = "0.0.0.0"
+    port: int = 8000
+    remote_host: str = "api.example.com"
+    remote_port: int = 443
+    bearer_token: str = ""
+    allowed_origins: List[str] = field(default_factory=list)
+    root_path: str = "/api/v1"
+    database_url: str = "sqlite:///./data.db"
+    log_file: str = "api.log"
+    debug: bool = False
+    workers: int = 1
+    read_cache_size: int = 1024
+    changes_cache_size: int = 64
+    data_version_check_interval: float = 1.0
+    attempt_batch_size: int = 500
+    attempt_flush_interval: float = 2.0
+    corpus_file: str = ""
+    bundle_dir: str = ""
+    events_poll_interval: float = 1.0
+    read_concurrency: int = 64
+    admin_concurrency: int = 2
+    words_concurrency: int = 4
+    admission_queue_size: int = 128
+    admission_queue_timeout: float = 2.0
+    words_rate_limit: float = 0.0
+    words_rate_burst: int = 5
+    words_rate_client_header: str = ""
+    cache_max_age: int = 60
+    cache_stale_while_revalidate: int = 300
+    cdn_max_age: int = 0
+    purge_url: str = ""
+    purge_token: str = ""
+    purge_hook: str = ""
+    sql_stats: bool = True
+    slow_query_ms: float = 100.0
+    profiling: bool = False
+    ingest_queue: bool = False
+    ingest_batch_interval: float = 0.05
+    ingest_max_batch: int = 200
+    ingest_max_queue: int = 1000
+    ingest_job_ttl: float = 3600.0
+    maintenance_interval: float = 21600.0
+    maintenance_check_interval: float = 60.0
+    maintenance_idle_rps: float = 1.0
+    maintenance_vacuum_pages: int = 256
+    maintenance_analysis_limit: int = 1000
+    maintenance_integrity: str = "quick"
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            host=os.getenv("HOST", "0.0.0.0"),
+            port=int(os.getenv("PORT", 8000)),
+            remote_host=os.getenv("REMOTE_HOST", "api.example.com"),
+            remote_port=int(os.getenv("REMOTE_PORT", 443)),
+            bearer_token=os.getenv("BEARER_TOKEN", ""),
+            allowed_origins=[
+                origin.strip() for origin in os.getenv("ALLOWED_ORIGINS", "").split(",") if origin.strip()
+            ],
+            root_path=os.getenv("ROOT_PATH", "/api/v1"),
+            database_url=os.getenv("DATABASE_URL", "sqlite:///./data.db"),
+            log_file=os.getenv("LOG_FILE", "api.log"),
+            debug=os.getenv("DEBUG", "").lower() in ("1", "true", "yes"),
+            workers=int(os.getenv("WORKERS", 1)),
+            read_cache_size=int(os.getenv("READ_CACHE_SIZE", 1024)),
+            changes_cache_size=int(os.getenv("CHANGES_CACHE_SIZE", 64)),
+            data_version_check_interval=float(os.getenv("DATA_VERSION_CHECK_INTERVAL", 1.0)),
+            attempt_batch_size=int(os.getenv("ATTEMPT_BATCH_SIZE", 500)),
+            attempt_flush_interval=float(os.getenv("ATTEMPT_FLUSH_INTERVAL", 2.0)),
+            corpus_file=os.getenv("CORPUS_FILE", ""),
+            bundle_dir=os.getenv("BUNDLE_DIR", ""),
+            events_poll_interval=float(os.getenv("EVENTS_POLL_INTERVAL", 1.0)),
+            read_concurrency=int(os.getenv("READ_CONCURRENCY", 64)),
+            admin_concurrency=int(os.getenv("ADMIN_CONCURRENCY", 2)),
+            words_concurrency=int(os.getenv("WORDS_CONCURRENCY", 4)),
+            admission_queue_size=int(os.getenv("ADMISSION_QUEUE_SIZE", 128)),
+            admission_queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 2.0)),
+            words_rate_limit=float(os.getenv("WORDS_RATE_LIMIT", 0.0)),
+            words_rate_burst=int(os.getenv("WORDS_RATE_BURST", 5)),
+            words_rate_client_header=os.getenv("WORDS_RATE_CLIENT_HEADER", "").strip().lower(),
+            cache_max_age=int(os.getenv("CACHE_MAX_AGE", 60)),
+            cache_stale_while_revalidate=int(os.getenv("CACHE_STALE_WHILE_REVALIDATE", 300)),
+            cdn_max_age=int(os.getenv("CDN_MAX_AGE", 0)),
+            purge_url=os.getenv("PURGE_URL", ""),
+            purge_token=os.getenv("PURGE_TOKEN", ""),
+            purge_hook=os.getenv("PURGE_HOOK", ""),
+            sql_stats=os.getenv("SQL_STATS", "1").lower() not in ("0", "false", "no"),
+            slow_query_ms=float(os.getenv("SLOW_QUERY_MS", 100.0)),
+            profiling=os.getenv("PROFILING", "").lower() in ("1", "true", "yes"),
+            ingest_queue=os.getenv("INGEST_QUEUE", "").lower() in ("1", "true", "yes"),
+            ingest_batch_interval=float(os.getenv("INGEST_BATCH_INTERVAL", 0.05)),
+            ingest_max_batch=int(os.getenv("INGEST_MAX_BATCH", 200)),
+            ingest_max_queue=int(os.getenv("INGEST_MAX_QUEUE", 1000)),
+            ingest_job_ttl=float(os.getenv("INGEST_JOB_TTL", 3600.0)),
+            maintenance_interval=float(os.getenv("MAINTENANCE_INTERVAL", 21600.0)),
+            maintenance_check_interval=float(os.getenv("MAINTENANCE_CHECK_INTERVAL", 60.0)),
+            maintenance_idle_rps=float(os.getenv("MAINTENANCE_IDLE_RPS", 1.0)),
+            maintenance_vacuum_pages=int(os.getenv("MAINTENANCE_VACUUM_PAGES", 256)),
+            maintenance_analysis_limit=int(os.getenv("MAINTENANCE_ANALYSIS_LIMIT", 1000)),
+            maintenance_integrity=os.getenv("MAINTENANCE_INTEGRITY", "quick").lower(),
+        )
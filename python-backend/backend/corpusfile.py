@@ -0,0 +1,379 @@
+"""
+多個 worker 共用的唯讀語料檔 (memory-mapped)。
+
+將資料庫編譯成一個唯讀二進位檔，每個單字 / 練習題預先編碼為回應中的 JSON 片段，
+同一 (part, topic) 的片段以逗號相連並連續存放，因此 `/words`、`/practice` 的回應只需切出一段再加上外層括號。
+所有 worker 以 `mmap` 開啟同一個檔案，頁面由作業系統的 page cache 共用，語料變大時各 worker 的私有記憶體不會增加。
+
+檔案格式 (little-endian)：
+
+    header       HEADER (magic、資料版本、筆數、各區段位移)
+    fragments    依 (part, topic, word) 排序的單字 JSON 片段；依 (part, topic, entry_id) 排序的練習題 JSON 片段
+    word table   Q[word_count] 片段位移 + I[word_count] 片段長度
+    entry table  Q[entry_count] 片段位移 + I[entry_count] 片段長度 + Q[entry_count] entries.id
+    word ids     Q[word_count] 已排序的 words.id + I[word_count] 對應的 word table 索引
+    entry ids    Q[entry_count] 已排序的 entries.id + I[entry_count] 對應的 entry table 索引
+    directory    JSON：每個 (part, topic) 在兩個 table 中的起點、筆數與片段區段的位移、長度
+
+發佈流程：在同目錄寫入暫存檔並 fsync 後以 `os.replace()` 原子替換，已開啟舊檔的 worker 不受影響，
+其他 worker 在察覺資料版本改變時重新 `mmap`。建立與替換以 `<path>.lock` 檔案鎖序列化。
+
+也可手動建立：
+
+    python corpusfile.py [--env .env] [--output corpus.bin]
+"""
+import argparse
+import bisect
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+
+import grading
+import readmodel
+import versioning
+from schemas import ChoiceSchema, PracticeEntrySchema, WordSchema
+
+logger = logging.getLogger("quiz-api")
+
+MAGIC = b"PYENGCF1"
+HEADER = struct.Struct("<8sQIIQQQQQQ")  # magic, version, words, entries, directory, 長度, 四個 table 位移
+
+
+class TopicSlice(NamedTuple):
+    word_start: int
+    word_count: int
+    word_region: Tuple[int, int]  # (位移, 長度)，片段以逗號相連
+    entry_start: int
+    entry_count: int
+    entry_region: Tuple[int, int]
+
+
+def encode_word(word: readmodel.WordRecord) -> bytes:
+    return WordSchema.model_validate({
+        "word": word.word,
+        "pos": word.pos,
+        "meaning": word.meaning,
+        "pronunciations": json.loads(word.pronunciations) if word.pronunciations else [],
+        "definitions": json.loads(word.definitions) if word.definitions else [],
+        "verbs": json.loads(word.verbs) if word.verbs else [],
+    }).model_dump_json().encode()
+
+
+def encode_entry(entry: readmodel.EntryRecord) -> bytes:
+    return PracticeEntrySchema(
+        entry_id=entry.entry_id,
+        question=entry.question,
+        question_hash=entry.question_hash,
+        answer=grading.display_answer(entry.answer),
+        choices=[ChoiceSchema(choice_order=c.choice_order, choice_text=c.choice_text) for c in entry.choices]
+    ).model_dump_json(exclude_none=True).encode()
+
+
+def _align(f, boundary: int = 8):
+    padding = -f.tell() % boundary
+    if padding:
+        f.write(b"\0" * padding)
+
+
+def write(model: readmodel.ReadModel, path: str):
+    """將唯讀模型寫成語料檔 (直接寫入 `path`，原子發佈請用 `build()`)。"""
+    keys = sorted(set(model.words_by_topic) | set(model.entries_by_topic))
+    word_offsets, word_lengths, word_ids = array("Q"), array("I"), []
+    entry_offsets, entry_lengths, entry_pks = array("Q"), array("I"), array("Q")
+    directory = []
+
+    with open(path, "wb") as f:
+        f.write(b"\0" * HEADER.size)
+
+        def write_region(records, encode, offsets, lengths):
+            start = f.tell()
+            for i, record in enumerate(records):
+                if i:
+                    f.write(b",")
+                fragment = encode(record)
+                offsets.append(f.tell())
+                lengths.append(len(fragment))
+                f.write(fragment)
+            return start, f.tell() - start
+
+        for part, topic in keys:
+            words = model.words_by_topic.get((part, topic), ())
+            entries = model.entries_by_topic.get((part, topic), ())
+            word_start, entry_start = len(word_offsets), len(entry_offsets)
+            word_region = write_region(words, encode_word, word_offsets, word_lengths)
+            entry_region = write_region(entries, encode_entry, entry_offsets, entry_lengths)
+            word_ids.extend(w.id for w in words)
+            entry_pks.extend(e.id for e in entries)
+            directory.append([part, topic, word_start, len(words), *word_region,
+                              entry_start, len(entries), *entry_region])
+
+        def write_table(*arrays) -> int:
+            _align(f)
+            offset = f.tell()
+            for values in arrays:
+                values.tofile(f)
+                _align(f)
+            return offset
+
+        def id_index(ids) -> Tuple[array, array]:
+            order = sorted(range(len(ids)), key=ids.__getitem__)
+            return array("Q", (ids[i] for i in order)), array("I", order)
+
+        word_table = write_table(word_offsets, word_lengths)
+        entry_table = write_table(entry_offsets, entry_lengths, entry_pks)
+        word_id_table = write_table(*id_index(word_ids))
+        entry_id_table = write_table(*id_index(entry_pks))
+        directory_bytes = json.dumps({"topics": directory}, ensure_ascii=False).encode()
+        directory_offset = f.tell()
+        f.write(directory_bytes)
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, model.version, len(word_offsets), len(entry_offsets),
+                            directory_offset, len(directory_bytes),
+                            word_table, entry_table, word_id_table, entry_id_table))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_version(path: str) -> Optional[int]:
+    """讀取語料檔記錄的資料版本，檔案不存在或格式不符時回傳 None。"""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(header) < HEADER.size or header[:8] != MAGIC:
+        return None
+    return HEADER.unpack(header)[1]
+
+
+def build(engine: Engine, path: str, force: bool = False) -> int:
+    """
+    若語料檔不存在或版本落後資料庫，則重新建立並以 rename 原子發佈，回傳檔案的資料版本。
+    多個進程同時呼叫時以檔案鎖序列化，後到者發現檔案已是最新版本便直接返回。
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(f"{path}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            existing = read_version(path)
+            if not force and existing is not None and existing >= versioning.read(engine):
+                return existing
+
+            started = time.perf_counter()
+            model = readmodel.load(engine)
+            fd, tmp_path = tempfile.mkstemp(prefix=".corpus-", dir=directory)
+            os.close(fd)
+            try:
+                write(model, tmp_path)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            logger.info(
+                f"已發佈語料檔 {path}: 版本={model.version}, 單字={model.word_count}, 練習題={model.entry_count}, "
+                f"{os.path.getsize(path) / 1024 / 1024:.1f} MiB, 耗時 {(time.perf_counter() - started) * 1000:.0f}ms"
+            )
+            return model.version
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class CorpusFile:
+    """以 mmap 開啟的語料檔，所有查詢都只切片 (memoryview) 不複製，直到組成回應本文。"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.identity = os.fstat(f.fileno()).st_ino
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        (magic, self.version, word_count, entry_count, directory_offset, directory_length,
+         word_table, entry_table, word_id_table, entry_id_table) = HEADER.unpack_from(buf)
+        if magic != MAGIC:
+            raise ValueError(f"{path} 不是語料檔")
+        self.word_count = word_count
+        self.entry_count = entry_count
+        self._buf = buf
+
+        def table(offset: int, fmt: str, count: int) -> Tuple[memoryview, int]:
+            size = struct.calcsize(fmt) * count
+            view = buf[offset:offset + size].cast(fmt)
+            return view, offset + size + (-size % 8)
+
+        self._word_offsets, offset = table(word_table, "Q", word_count)
+        self._word_lengths, _ = table(offset, "I", word_count)
+        self._entry_offsets, offset = table(entry_table, "Q", entry_count)
+        self._entry_lengths, offset = table(offset, "I", entry_count)
+        self._entry_pks, _ = table(offset, "Q", entry_count)
+        self._word_ids, offset = table(word_id_table, "Q", word_count)
+        self._word_index, _ = table(offset, "I", word_count)
+        self._entry_ids, offset = table(entry_id_table, "Q", entry_count)
+        self._entry_index, _ = table(offset, "I", entry_count)
+
+        directory = json.loads(bytes(buf[directory_offset:directory_offset + directory_length]))
+        self._topics: Dict[readmodel.TopicKey, TopicSlice] = {}
+        topics_by_part: Dict[int, List[str]] = {}
+        parts_by_topic: Dict[str, List[int]] = {}
+        all_topics: Dict[str, None] = {}
+        for part, topic, ws, wc, wo, wl, es, ec, eo, el in directory["topics"]:
+            self._topics[(part, topic)] = TopicSlice(ws, wc, (wo, wl), es, ec, (eo, el))
+            if wc:
+                topics_by_part.setdefault(part, []).append(topic)
+                parts_by_topic.setdefault(topic, []).append(part)
+                all_topics.setdefault(topic)
+        # 排序與 `readmodel.ReadModel` 相同
+        self.topics_by_part = {part: tuple(topics) for part, topics in topics_by_part.items()}
+        self.parts_by_topic = {topic: tuple(parts) for topic, parts in parts_by_topic.items()}
+        self.all_topics = tuple(all_topics)
+        self.all_parts = tuple(topics_by_part)
+
+    def _region(self, region: Tuple[int, int]) -> memoryview:
+        offset, length = region
+        return self._buf[offset:offset + length]
+
+    def _word(self, index: int) -> memoryview:
+        offset = self._word_offsets[index]
+        return self._buf[offset:offset + self._word_lengths[index]]
+
+    def _entry(self, index: int) -> memoryview:
+        offset = self._entry_offsets[index]
+        return self._buf[offset:offset + self._entry_lengths[index]]
+
+    def topics(self, part: Optional[int] = None) -> Tuple[str, ...]:
+        return self.topics_by_part.get(part, ()) if part else self.all_topics
+
+    def parts(self, topic: Optional[str] = None) -> Tuple[int, ...]:
+        return self.parts_by_topic.get(topic, ()) if topic else self.all_parts
+
+    def words_body(self, part: Optional[int] = None, topic: Optional[str] = None) -> Optional[bytes]:
+        """回傳 `/words` 的完整 JSON 本文，沒有符合的單字時回傳 None。篩選語意與 `ReadModel.words()` 相同。"""
+        if part and topic:
+            keys = [(part, topic)]
+        elif part:
+            keys = [(part, t) for t in self.topics_by_part.get(part, ())]
+        elif topic:
+            keys = [(p, topic) for p in self.parts_by_topic.get(topic, ())]
+        else:
+            # 未篩選時依 id 排序
+            if not self.word_count:
+                return None
+            return b'{"words":[' + b",".join(self._word(i) for i in self._word_index) + b"]}"
+
+        regions = [self._region(s.word_region) for s in map(self._topics.get, keys) if s and s.word_count]
+        if not regions:
+            return None
+        return b'{"words":[' + b",".join(regions) + b"]}"
+
+    def practice_body(self, part: int, topic: str) -> Optional[bytes]:
+        """回傳 `/practice/{part}/{topic}` 的完整 JSON 本文，沒有練習題時回傳 None。"""
+        s = self._topics.get((part, topic))
+        if s is None or not s.entry_count:
+            return None
+        return b'{"entries":[' + self._region(s.entry_region) + b"]}"
+
+    def entries(self, part: int, topic: str) -> List[Tuple[int, memoryview]]:
+        """回傳 [(entries.id, 練習題 JSON 片段), ...]，依 entry_id 排序。"""
+        s = self._topics.get((part, topic))
+        if s is None:
+            return []
+        return [(self._entry_pks[i], self._entry(i)) for i in range(s.entry_start, s.entry_start + s.entry_count)]
+
+    def word(self, word_id: int) -> Optional[memoryview]:
+        i = bisect.bisect_left(self._word_ids, word_id)
+        if i < self.word_count and self._word_ids[i] == word_id:
+            return self._word(self._word_index[i])
+        return None
+
+    def entry(self, entry_pk: int) -> Optional[memoryview]:
+        i = bisect.bisect_left(self._entry_ids, entry_pk)
+        if i < self.entry_count and self._entry_ids[i] == entry_pk:
+            return self._entry(self._entry_index[i])
+        return None
+
+
+class CorpusFileStore:
+    """
+    每個 worker 持有一份，負責開啟 / 重新開啟語料檔。
+
+    `current()` 在已開啟的檔案版本不落後時不做任何系統呼叫；落後時檢查檔案是否已被替換 (inode 改變) 並重新 mmap。
+    舊的 mmap 不主動關閉，仍在使用它的請求結束後由垃圾回收釋放。
+    """
+
+    def __init__(self, path: str, engine: Engine):
+        self.path = path
+        self.engine = engine
+        self._file: Optional[CorpusFile] = None
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+
+    def current(self, version: int) -> Optional[CorpusFile]:
+        corpus = self._file
+        if corpus is not None and corpus.version >= version:
+            return corpus
+        return self.reload()
+
+    def reload(self) -> Optional[CorpusFile]:
+        with self._lock:
+            try:
+                identity = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                return self._file
+            if self._file is None or self._file.identity != identity:
+                self._file = CorpusFile(self.path)
+                logger.info(f"已開啟語料檔 {self.path}: 版本={self._file.version} (pid={os.getpid()})")
+            return self._file
+
+    def publish(self) -> Optional[CorpusFile]:
+        """
+        資料寫入後重新建立語料檔 (若仍落後) 並開啟新檔。
+
+        建立時需要把整個語料載入為 Python 物件，釋放後記憶體也不一定歸還給作業系統，
+        因此在短暫的子進程中執行，worker 本身只做 mmap。
+        """
+        with self._publish_lock:
+            existing = read_version(self.path)
+            if existing is None or existing < versioning.read(self.engine):
+                subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--env", os.devnull, "--output", self.path],
+                    env=dict(os.environ, DATABASE_URL=self.engine.url.render_as_string(hide_password=False)),
+                    check=True
+                )
+            return self.reload()
+
+
+def main():
+    from dotenv import load_dotenv
+
+    from config import Settings
+    from database import init_engine
+
+    parser = argparse.ArgumentParser(description="將資料庫編譯為唯讀語料檔")
+    parser.add_argument('--env', type=str, default='.env', help='環境變數設定檔路徑')
+    parser.add_argument('--output', type=str, default=None, help='輸出路徑 (預設讀取 CORPUS_FILE 環境變數)')
+    parser.add_argument('--force', action='store_true', help='即使版本未變也重新建立')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    load_dotenv(args.env)
+    settings = Settings.from_env()
+    output = args.output or settings.corpus_file
+    if not output:
+        parser.error("請以 --output 或 CORPUS_FILE 指定輸出路徑")
+    build(init_engine(settings.database_url), output, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+import os
+from typing import Optional
+
 from sqlalchemy import create_engine
 from sqlalchemy import event
 from sqlalchemy.engine import Engine
@@ -5,19 +8,45 @@ from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
 DATABASE_URL = "sqlite:///./data.db"
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# engine 由 `init_engine()` 延遲建立；每個 worker 進程各自建立 engine 與連線池，不共用任何連線
+engine: Optional[Engine] = None
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
 
 class Base(DeclarativeBase):
     pass
 
 
+def init_engine(url: str = DATABASE_URL) -> Engine:
+    """建立 engine 並綁定到 `SessionLocal`，可重複呼叫以切換資料庫。"""
+    global engine
+    if engine is not None:
+        engine.dispose()
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        pool_size=int(os.getenv("DB_POOL_SIZE", 5)),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 10)),
+    )
+    SessionLocal.configure(bind=engine)
+    return engine
+
+
+def get_engine() -> Engine:
+    if engine is None:
+        raise RuntimeError("資料庫尚未初始化，請先呼叫 init_engine()")
+    return engine
+
+
 @event.listens_for(Engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
     cursor = dbapi_connection.cursor()
     cursor.execute("PRAGMA foreign_keys=ON;")
+    # 必須在切換 WAL 之前設定才會對全新的資料庫生效；既有資料庫需於停機時執行 `python migrate.py --vacuum` 才會轉換
+    cursor.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+    # WAL 讓多個 worker 的讀取不會被寫入阻擋；寫入衝突時最多等待 5 秒
+    cursor.execute("PRAGMA journal_mode=WAL;")
+    cursor.execute("PRAGMA synchronous=NORMAL;")
+    cursor.execute("PRAGMA busy_timeout=5000;")
     cursor.close()
@@ -0,0 +1,176 @@
+"""
+以 Server-Sent Events 推送資料變更，用戶端收到通知後才重新讀取，不必定時輪詢。
+
+每個 worker 只有一個背景 task (`ChangeBroadcaster.start()`) 查詢資料庫：
+每 `EVENTS_POLL_INTERVAL` 秒 (或本 worker 寫入後立即) 讀取全域資料版本，版本改變時以 `version` 索引
+查出變更的 (part, topic) 並預先編碼成一個 SSE 訊框；所有連線共用同一份位元組與同一個 `asyncio.Event`，
+閒置連線只是一個等待中的協程，不佔執行緒也不各自查詢資料庫。其他 worker 的寫入同樣由版本輪詢察覺。
+
+事件格式：
+
+    id: 42
+    event: change
+    data: {"version":42,"topics":[{"part":1,"topic":"...","version":42}]}
+
+連線時先送出 `event: version` (目前版本)；重新連線時瀏覽器帶上 `Last-Event-ID`，
+錯過的變更會合併成一個 `change` 事件補送。`Last-Event-ID` 大於目前版本 (例如資料庫已重建) 時送出 `event: reset`。
+每條連線最多維持 `STREAM_MAX_AGE` 秒後結束，由 EventSource 自動重新連線，避免長連線阻擋 worker 正常關閉。
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, List, NamedTuple, Optional
+
+from sqlalchemy import func, select, union_all
+from sqlalchemy.engine import Engine
+
+import models
+import versioning
+
+logger = logging.getLogger("quiz-api")
+
+MEDIA_TYPE = "text/event-stream"
+HEARTBEAT_INTERVAL = 15.0  # 註解行，避免代理伺服器關閉閒置連線
+STREAM_MAX_AGE = 300.0
+RETRY_MS = 2000
+HISTORY_SIZE = 64
+
+
+class TopicChange(NamedTuple):
+    part: int
+    topic: str
+    version: int
+
+
+class ChangeEvent(NamedTuple):
+    version: int
+    frame: bytes
+
+
+def topic_changes(engine: Engine, after: int) -> List[TopicChange]:
+    """`version > after` 的單字、練習題與刪除紀錄所屬的主題及其最大版本，依版本排序。"""
+    changed = union_all(
+        select(models.Word.part, models.Word.topic, models.Word.version).where(models.Word.version > after),
+        select(models.Entry.part, models.Entry.topic, models.Entry.version).where(models.Entry.version > after),
+        select(models.Tombstone.part, models.Tombstone.topic, models.Tombstone.version)
+        .where(models.Tombstone.version > after),
+    ).subquery()
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(changed.c.part, changed.c.topic, func.max(changed.c.version).label("version"))
+            .group_by(changed.c.part, changed.c.topic)
+            .order_by("version", changed.c.part, changed.c.topic)
+        ).all()
+    return [TopicChange(*row) for row in rows]
+
+
+def encode(event: str, data: dict, event_id: Optional[int] = None) -> bytes:
+    lines = [] if event_id is None else [f"id: {event_id}"]
+    lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+def change_frame(version: int, topics: List[TopicChange]) -> bytes:
+    return encode("change", {"version": version, "topics": [t._asdict() for t in topics]}, event_id=version)
+
+
+class ChangeBroadcaster:
+    """每個 worker 持有一份，由單一背景 task 偵測變更並喚醒所有訂閱中的連線。"""
+
+    def __init__(self, engine: Engine, poll_interval: float = 1.0):
+        self.engine = engine
+        self.poll_interval = poll_interval
+        self.subscribers = 0
+        self._version = -1
+        self._events: Deque[ChangeEvent] = deque(maxlen=HISTORY_SIZE)
+        self._floor = -1  # 記憶體中的事件涵蓋 version > _floor 的變更
+        self._published = asyncio.Event()
+        self._poke = asyncio.Event()
+
+    def notify(self):
+        """本 worker 寫入後呼叫 (於事件迴圈中)，讓背景 task 立即檢查版本。"""
+        self._poke.set()
+
+    async def start(self) -> asyncio.Task:
+        """讀取目前的資料版本後啟動背景 task，於 lifespan 中呼叫。"""
+        self._version = self._floor = await asyncio.to_thread(versioning.read, self.engine)
+        return asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._poke.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._poke.clear()
+            try:
+                await self._check()
+            except Exception as e:
+                logger.error(f"偵測資料變更失敗: {e}")
+
+    async def _check(self):
+        version = await asyncio.to_thread(versioning.read, self.engine)
+        if version == self._version:
+            return
+        if version < self._version:
+            # 資料庫已重建：捨棄記憶體中的事件，之後連線的 Last-Event-ID 會被視為需要重設
+            self._events.clear()
+            self._version = self._floor = version
+        else:
+            topics = await asyncio.to_thread(topic_changes, self.engine, self._version)
+            if len(self._events) == self._events.maxlen:
+                self._floor = self._events[0].version
+            self._events.append(ChangeEvent(version, change_frame(version, topics)))
+            self._version = version
+            logger.info(f"推送資料變更: 版本={version}, 主題={len(topics)}, 連線={self.subscribers}")
+        published, self._published = self._published, asyncio.Event()
+        published.set()
+
+    def _pending(self, cursor: int) -> List[ChangeEvent]:
+        pending = []
+        for event in reversed(self._events):
+            if event.version <= cursor:
+                break
+            pending.append(event)
+        pending.reverse()
+        return pending
+
+    async def stream(self, last_event_id: Optional[int]) -> AsyncIterator[bytes]:
+        """單一連線的事件串流。"""
+        self.subscribers += 1
+        deadline = time.monotonic() + STREAM_MAX_AGE
+        try:
+            yield f"retry: {RETRY_MS}\n\n".encode()
+            cursor = self._version
+            if last_event_id is None:
+                yield encode("version", {"version": cursor}, event_id=cursor)
+            else:
+                cursor = last_event_id
+
+            while True:
+                published = self._published
+                if cursor > self._version:
+                    cursor = self._version
+                    yield encode("reset", {"version": cursor}, event_id=cursor)
+                elif cursor < self._floor:
+                    # 錯過的變更已不在記憶體中 (重新連線或連線太慢)，直接由資料庫合併補送
+                    version = self._version
+                    topics = await asyncio.to_thread(topic_changes, self.engine, cursor)
+                    cursor = version
+                    yield change_frame(cursor, topics)
+                    continue
+                for event in self._pending(cursor):
+                    yield event.frame
+                    cursor = event.version
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    await asyncio.wait_for(published.wait(), timeout=min(HEARTBEAT_INTERVAL, remaining))
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+        finally:
+            self.subscribers -= 1
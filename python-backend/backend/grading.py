@@ -0,0 +1,245 @@
+"""
+練習題批改：記憶體內答案表與作答紀錄的批次寫入。
+
+- `AnswerMapCache`：以 (part, topic) 為鍵快取正確答案，批改時不需再查詢資料庫，資料版本改變時重建
+- `AttemptLog`：作答紀錄先累積於記憶體，達到批次大小或定時器觸發時以單一交易附加寫入，
+  同時遞增 `entry_stats` / `choice_stats` 計數，讀取統計時不需掃描作答紀錄
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger("quiz-api")
+
+
+def display_answer(answer: str) -> str:
+    """去除答案開頭的選項代號 (例如 `"F. lead-lag network"` → `"lead-lag network"`)。"""
+    if '. ' in answer:
+        return answer[3:]
+    return answer
+
+
+class AnswerKey(NamedTuple):
+    entry_pk: int  # entries.id
+    answer: str  # 去除選項代號後的答案文字
+    correct_order: Optional[int]  # 正確選項的 choice_order，找不到對應選項時為 None
+    orders: Dict[str, int]  # choice_text → choice_order
+
+
+class AnswerMapCache:
+    """
+    (part, topic) → {entry_id: AnswerKey} 的快取。
+    每份答案表記錄建立時的全域資料版本，版本改變後下次查詢即重建。
+    """
+
+    def __init__(self):
+        self._maps: Dict[Tuple[int, str], Tuple[int, Dict[str, AnswerKey]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, part: int, topic: str, version: int) -> Dict[str, AnswerKey]:
+        key = (part, topic)
+        cached = self._maps.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        answer_map = self._build(db, part, topic)
+        with self._lock:
+            self._maps[key] = (version, answer_map)
+        return answer_map
+
+    def clear(self):
+        with self._lock:
+            self._maps.clear()
+
+    @staticmethod
+    def _build(db: Session, part: int, topic: str) -> Dict[str, AnswerKey]:
+        rows = db.query(models.Entry, models.Choice).join(
+            models.Choice, models.Choice.entry_id == models.Entry.id
+        ).filter(
+            models.Entry.part == part,
+            models.Entry.topic == topic
+        ).all()
+
+        entries: Dict[str, models.Entry] = {}
+        orders: Dict[str, Dict[str, int]] = {}
+        for entry, choice in rows:
+            entries[entry.entry_id] = entry
+            orders.setdefault(entry.entry_id, {})[choice.choice_text] = choice.choice_order
+
+        answer_map = {}
+        for entry_id, entry in entries.items():
+            answer = display_answer(entry.answer)
+            answer_map[entry_id] = AnswerKey(
+                entry_pk=entry.id,
+                answer=answer,
+                correct_order=orders[entry_id].get(answer),
+                orders=orders[entry_id]
+            )
+        logger.debug(f"已建立答案表: part={part}, topic={topic}, 題數={len(answer_map)}")
+        return answer_map
+
+
+class QuestionStats(NamedTuple):
+    attempts: int
+    correct: int
+    choices: List[Tuple[int, str, int]]  # (choice_order, choice_text, picks)
+
+    @property
+    def accuracy(self) -> Optional[float]:
+        if not self.attempts:
+            return None
+        return round(self.correct / self.attempts, 4)
+
+
+# (entry_pk, learner_id, choice_order, correct, created_at)
+AttemptRow = Tuple[int, Optional[str], Optional[int], bool, int]
+
+
+class AttemptLog:
+    """
+    作答紀錄的寫入緩衝區。
+
+    `append()` 只在記憶體中累積，累積到 `batch_size` 筆或距離上次寫入超過
+    `flush_interval` 秒時，由 `flush()` 以單一交易 executemany 寫入 `practice_attempts`。
+    """
+
+    def __init__(
+            self,
+            session_factory: Callable[[], Session],
+            batch_size: int = 500,
+            flush_interval: float = 2.0
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: List[AttemptRow] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def append(self, rows: List[AttemptRow]) -> bool:
+        """加入作答紀錄，回傳是否已達批次大小需要寫入。"""
+        with self._lock:
+            self._buffer.extend(rows)
+            return len(self._buffer) >= self.batch_size
+
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def due(self) -> bool:
+        return bool(self._buffer) and time.monotonic() - self._last_flush >= self.flush_interval
+
+    def flush(self) -> int:
+        """寫入目前緩衝區的所有紀錄，回傳寫入筆數。"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+            if not rows:
+                return 0
+
+            db = self.session_factory()
+            try:
+                self.write(db, rows)
+                db.commit()
+            except IntegrityError as e:
+                db.rollback()
+                # 違反約束的批次重試也會以同樣的方式失敗，放回緩衝區會讓之後的寫入全部卡住，因此記錄後捨棄
+                logger.error(f"作答紀錄違反資料庫約束，捨棄 {len(rows)} 筆: {e}")
+                return 0
+            except Exception:
+                db.rollback()
+                # 寫入失敗時 (例如等待寫入鎖逾時) 放回緩衝區，留待下次重試
+                with self._lock:
+                    self._buffer[:0] = rows
+                raise
+            finally:
+                db.close()
+
+            logger.debug(f"已寫入 {len(rows)} 筆作答紀錄")
+            return len(rows)
+
+    @staticmethod
+    def write(db: Session, rows: List[AttemptRow]):
+        """附加作答紀錄，並在同一交易中遞增每題與每個選項的統計計數。"""
+        db.execute(
+            models.PracticeAttempt.__table__.insert(),
+            [
+                dict(entry_id=entry_pk, learner_id=learner_id, choice_order=choice_order,
+                     correct=correct, created_at=created_at)
+                for entry_pk, learner_id, choice_order, correct, created_at in rows
+            ]
+        )
+
+        entry_deltas: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+        pick_deltas: Dict[Tuple[int, int], int] = defaultdict(int)
+        for entry_pk, _, choice_order, correct, _ in rows:
+            entry_deltas[entry_pk][0] += 1
+            entry_deltas[entry_pk][1] += int(correct)
+            if choice_order is not None:
+                pick_deltas[(entry_pk, choice_order)] += 1
+
+        # 以 INSERT ... SELECT 只遞增仍存在的練習題：作答後、寫入前被 `PUT /topics` 刪除的題目不寫入統計 (外鍵)，
+        # 作答紀錄本身仍保留
+        db.execute(text(
+            "INSERT INTO entry_stats (entry_id, attempts, correct) "
+            "SELECT id, :attempts, :correct FROM entries WHERE id = :entry_id "
+            "ON CONFLICT (entry_id) DO UPDATE SET "
+            "attempts = entry_stats.attempts + excluded.attempts, correct = entry_stats.correct + excluded.correct"
+        ), [
+            dict(entry_id=entry_pk, attempts=attempts, correct=correct)
+            for entry_pk, (attempts, correct) in entry_deltas.items()
+        ])
+
+        if pick_deltas:
+            # INSERT ... SELECT 搭配 upsert 時，SQLite 需要 WHERE 子句以消除語法歧義
+            db.execute(text(
+                "INSERT INTO choice_stats (choice_id, picks) "
+                "SELECT id, :picks FROM choices WHERE entry_id = :entry_id AND choice_order = :choice_order "
+                "ON CONFLICT (choice_id) DO UPDATE SET picks = choice_stats.picks + excluded.picks"
+            ), [
+                dict(entry_id=entry_pk, choice_order=choice_order, picks=picks)
+                for (entry_pk, choice_order), picks in pick_deltas.items()
+            ])
+
+
+def topic_stats(db: Session, part: int, topic: str) -> Dict[int, QuestionStats]:
+    """
+    讀取某 (part, topic) 所有題目的統計計數，只掃描該主題的題目與選項 (O(題數))，
+    不會讀取 `practice_attempts`。
+
+    :return: {entries.id: QuestionStats}
+    """
+    rows = db.query(models.Entry.id, models.EntryStat.attempts, models.EntryStat.correct).outerjoin(
+        models.EntryStat, models.EntryStat.entry_id == models.Entry.id
+    ).filter(
+        models.Entry.part == part,
+        models.Entry.topic == topic
+    ).all()
+    stats = {
+        entry_pk: QuestionStats(attempts or 0, correct or 0, [])
+        for entry_pk, attempts, correct in rows
+    }
+
+    choice_rows = db.query(
+        models.Choice.entry_id, models.Choice.choice_order, models.Choice.choice_text, models.ChoiceStat.picks
+    ).join(
+        models.Entry, models.Entry.id == models.Choice.entry_id
+    ).outerjoin(
+        models.ChoiceStat, models.ChoiceStat.choice_id == models.Choice.id
+    ).filter(
+        models.Entry.part == part,
+        models.Entry.topic == topic
+    ).order_by(models.Choice.entry_id, models.Choice.choice_order).all()
+    for entry_pk, choice_order, choice_text, picks in choice_rows:
+        stats[entry_pk].choices.append((choice_order, choice_text, picks or 0))
+
+    return stats
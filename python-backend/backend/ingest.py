@@ -0,0 +1,341 @@
+"""
+管理端寫入的佇列模式 (`INGEST_QUEUE=1`)：合併多個請求為單一交易的背景寫入器。
+
+`/add-words`、`/add-practices` 驗證後只將工作放入 worker 內的佇列，由唯一的背景 task
+每 `INGEST_BATCH_INTERVAL` 秒取出最多 `INGEST_MAX_BATCH` 個工作，在執行緒中以單一交易寫入
+(全域資料版本只遞增一次、只 fsync 一次)，寫入時才持有 SQLite 的寫入鎖。
+
+- 每個工作各自不可分割：任一筆單字 / 練習題已存在 (或在同一個請求中重複) 時整個工作回報 409，
+  不寫入任何資料列；同步模式則會保留衝突之前已各自提交的資料列
+- 已完成的工作與資料列在同一交易中寫入 `ingest_jobs`，其他 worker 也能查詢；
+  尚在佇列中的工作只存在於提交它的 worker
+- 佇列已滿時 `submit()` 拋出 `QueueFull`，API 回傳 503 + `Retry-After`
+- 工作 id 以提交它的 worker pid 開頭，查詢不到時用來判斷工作是否可能仍在該 worker 的佇列中
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.orm import Session
+
+import models
+import versioning
+from schemas import EntryCreateSchema, TopicWordSchema, WordCreateSchema
+
+logger = logging.getLogger("quiz-api")
+
+WORDS = "words"
+PRACTICES = "practices"
+
+QUEUED = "queued"
+DONE = "done"
+FAILED = "failed"
+
+LOOKUP_CHUNK = 500  # 衝突檢查每次查詢的項目數 (單字每項 3 個綁定變數)
+
+
+class QueueFull(Exception):
+    pass
+
+
+def word_columns(item: TopicWordSchema) -> Dict[str, Optional[str]]:
+    """單字除 part / topic 之外的欄位，發音、定義與動詞變化以 JSON 字串存入。"""
+    return dict(
+        word=item.word,
+        pos=item.pos,
+        meaning=item.meaning,
+        pronunciations=json.dumps([p.model_dump() for p in item.pronunciations], ensure_ascii=False),
+        definitions=json.dumps([d.model_dump() for d in item.definitions], ensure_ascii=False),
+        verbs=json.dumps([v.model_dump() for v in item.verbs], ensure_ascii=False)
+    )
+
+
+def build_word(item: WordCreateSchema, version: int) -> models.Word:
+    return models.Word(part=item.part, topic=item.topic, version=version, **word_columns(item))
+
+
+def question_hash(question: str) -> int:
+    return int(hashlib.sha256(question.encode()).hexdigest()[:8], 16)
+
+
+def choice_text(choice: str) -> str:
+    """去除選項開頭的代號 (例如 `"A: lead"` → `"lead"`)。"""
+    if ": " in choice:
+        return choice.split(": ", 1)[1]
+    return choice
+
+
+def build_entry(part: int, topic: str, entry_id: str, data: EntryCreateSchema, version: int) -> models.Entry:
+    """由請求中的練習題建立資料列與其選項 (依序編號，隨練習題一併寫入)。"""
+    return models.Entry(
+        entry_id=entry_id,
+        question=data.question,
+        question_hash=question_hash(data.question),
+        answer=data.answer,
+        topic=topic,
+        part=part,
+        version=version,
+        choices=[
+            models.Choice(choice_text=choice_text(choice), choice_order=idx)
+            for idx, choice in enumerate(data.choices, start=1)
+        ]
+    )
+
+
+def word_conflict(item: WordCreateSchema) -> str:
+    return f"Word '{item.word}' already exists under part {item.part} and topic '{item.topic}'"
+
+
+def entry_conflict(part: int, topic: str, entry_id: str) -> str:
+    return f"entry_id '{entry_id}' already exists in part {part} and topic '{topic}'"
+
+
+@dataclass
+class Job:
+    kind: str  # WORDS / PRACTICES
+    words: List[WordCreateSchema] = field(default_factory=list)
+    part: int = 0  # PRACTICES 的 part / topic
+    topic: str = ""
+    entries: Dict[str, EntryCreateSchema] = field(default_factory=dict)
+    job_id: str = field(default_factory=lambda: f"{os.getpid()}-{secrets.token_hex(6)}")
+    submitted_at: float = field(default_factory=time.time)
+    status: str = QUEUED
+    version: Optional[int] = None
+    added: List[str] = field(default_factory=list)
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+    finished_at: Optional[float] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def size(self) -> int:
+        return len(self.words) if self.kind == WORDS else len(self.entries)
+
+    def topics(self) -> List[Tuple[int, str]]:
+        """寫入的 (part, topic)，依序、不重複。"""
+        if self.kind == PRACTICES:
+            return [(self.part, self.topic)]
+        return list(dict.fromkeys((item.part, item.topic) for item in self.words))
+
+    def fail(self, status_code: int, error: str):
+        self.status = FAILED
+        self.version, self.added = None, []
+        self.status_code = status_code
+        self.error = error
+
+
+class IngestWriter:
+    def __init__(
+            self,
+            session_factory: Callable[[], Session],
+            batch_interval: float = 0.05,
+            max_batch: int = 200,
+            max_queue: int = 1000,
+            job_ttl: float = 3600.0,
+            max_finished: int = 10000
+    ):
+        self.session_factory = session_factory
+        self.batch_interval = batch_interval
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self.job_ttl = job_ttl
+        self.max_finished = max_finished
+        self.batches = 0
+        self.jobs_total: Dict[str, int] = {DONE: 0, FAILED: 0}
+        self._queue: Deque[Job] = deque()
+        self._jobs: Dict[str, Job] = {}  # 佇列中的工作
+        self._finished: "OrderedDict[str, Job]" = OrderedDict()  # 最近完成的工作
+        self._wakeup = asyncio.Event()
+        self._closing = False
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def submit(self, job: Job) -> Job:
+        if self._closing or len(self._queue) >= self.max_queue:
+            raise QueueFull("寫入佇列已滿")
+        self._queue.append(job)
+        self._jobs[job.job_id] = job
+        self._wakeup.set()
+        return job
+
+    async def run(self, on_commit: Callable[[int, List[Job]], Awaitable[None]]):
+        """
+        背景寫入迴圈。被喚醒後再等待 `batch_interval` 秒收集同一波請求，接著分批寫入直到佇列清空；
+        `on_commit(version, 已寫入的工作)` 在工作標記完成之前呼叫 (發佈變更)，呼叫端得到回應時即可讀到新資料。
+        `stop()` 之後寫完剩餘的工作才結束。
+        """
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if not self._closing:
+                await asyncio.sleep(self.batch_interval)
+            while self._queue:
+                batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.max_batch))]
+                try:
+                    version = await asyncio.to_thread(self.apply, batch)
+                except Exception as e:
+                    logger.error(f"批次寫入失敗 ({len(batch)} 個工作): {e}", exc_info=True)
+                    version = 0
+                    for job in batch:
+                        job.fail(500, "Internal Server Error")
+                self.batches += 1
+                applied = [job for job in batch if job.status == DONE]
+                if applied:
+                    try:
+                        await on_commit(version, applied)
+                    except Exception as e:
+                        logger.error(f"發佈批次寫入的變更失敗: {e}")
+                for job in batch:
+                    self.finish(job)
+            if self._closing:
+                return
+
+    def stop(self):
+        self._closing = True
+        self._wakeup.set()
+
+    def finish(self, job: Job):
+        job.finished_at = job.finished_at or time.time()
+        self.jobs_total[job.status] += 1
+        self._jobs.pop(job.job_id, None)
+        self._finished[job.job_id] = job
+        while len(self._finished) > self.max_finished:
+            self._finished.popitem(last=False)
+        job.done.set()
+
+    def apply(self, batch: List[Job]) -> int:
+        """
+        以單一交易寫入一批工作，回傳此批資料列的全域資料版本 (沒有任何工作寫入時為 0)。
+        先遞增版本以取得寫入鎖，之後的衝突檢查不會與其他 worker 的寫入交錯。
+        """
+        db = self.session_factory()
+        try:
+            version = versioning.bump(db)
+            for job in batch:
+                if job.kind == WORDS:
+                    self.apply_words(db, job, version)
+                else:
+                    self.apply_practices(db, job, version)
+            if not any(job.status == DONE for job in batch):
+                # 全部衝突：不遞增版本，只記錄工作結果
+                db.rollback()
+                version = 0
+            self.record(db, batch)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        logger.info(
+            f"批次寫入: 工作={len(batch)}, 成功={sum(job.status == DONE for job in batch)}, "
+            f"資料列={sum(job.size for job in batch if job.status == DONE)}, 版本={version}"
+        )
+        return version
+
+    @staticmethod
+    def apply_words(db: Session, job: Job, version: int):
+        keys = [(item.part, item.topic, item.word) for item in job.words]
+        existing = set()
+        # 分段查詢，每段的綁定變數數量遠低於 SQLite 的上限 (32766)
+        for start in range(0, len(keys), LOOKUP_CHUNK):
+            existing.update(tuple(row) for row in db.execute(
+                select(models.Word.part, models.Word.topic, models.Word.word)
+                .where(tuple_(models.Word.part, models.Word.topic, models.Word.word)
+                       .in_(keys[start:start + LOOKUP_CHUNK]))
+            ))
+        seen = set()
+        for key, item in zip(keys, job.words):
+            if key in existing or key in seen:
+                return job.fail(409, word_conflict(item))
+            seen.add(key)
+        db.add_all(build_word(item, version) for item in job.words)
+        db.flush()
+        job.status, job.version, job.added = DONE, version, [item.word for item in job.words]
+
+    @staticmethod
+    def apply_practices(db: Session, job: Job, version: int):
+        entry_ids = list(job.entries)
+        existing = set()
+        for start in range(0, len(entry_ids), LOOKUP_CHUNK):
+            existing.update(db.execute(
+                select(models.Entry.entry_id).where(
+                    models.Entry.part == job.part,
+                    models.Entry.topic == job.topic,
+                    models.Entry.entry_id.in_(entry_ids[start:start + LOOKUP_CHUNK])
+                )
+            ).scalars())
+        for entry_id in entry_ids:
+            if entry_id in existing:
+                return job.fail(409, entry_conflict(job.part, job.topic, entry_id))
+        db.add_all(
+            build_entry(job.part, job.topic, entry_id, data, version) for entry_id, data in job.entries.items()
+        )
+        db.flush()
+        job.status, job.version, job.added = DONE, version, entry_ids
+
+    def record(self, db: Session, batch: List[Job]):
+        """於同一交易中記錄工作結果，並刪除超過保留時間的紀錄。"""
+        now = time.time()
+        for job in batch:
+            job.finished_at = now
+        db.execute(models.IngestJob.__table__.insert(), [
+            dict(job_id=job.job_id, kind=job.kind, status=job.status, version=job.version,
+                 added=json.dumps(job.added, ensure_ascii=False), status_code=job.status_code, error=job.error,
+                 submitted_at=int(job.submitted_at), finished_at=int(now))
+            for job in batch
+        ])
+        db.execute(delete(models.IngestJob).where(models.IngestJob.finished_at < now - self.job_ttl))
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """本 worker 佇列中或最近完成的工作，其次查詢 `ingest_jobs`；都找不到時回傳 None。"""
+        job = self._jobs.get(job_id) or self._finished.get(job_id)
+        if job is not None:
+            return job
+        db = self.session_factory()
+        try:
+            row = db.get(models.IngestJob, job_id)
+        finally:
+            db.close()
+        if row is not None:
+            return Job(
+                kind=row.kind, job_id=row.job_id, submitted_at=row.submitted_at, status=row.status,
+                version=row.version, added=json.loads(row.added), status_code=row.status_code,
+                error=row.error, finished_at=row.finished_at
+            )
+        if pending_elsewhere(job_id):
+            return Job(kind="", job_id=job_id, submitted_at=0.0)
+        return None
+
+
+def pending_elsewhere(job_id: str) -> bool:
+    """工作 id 所屬的是仍在執行的其他 worker (同一個主進程的子進程) 時，工作可能仍在該 worker 的佇列中。"""
+    pid, _, _ = job_id.partition("-")
+    if not pid.isdigit() or int(pid) == os.getpid():
+        return False
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # 第 2 欄 (程序名稱) 可能含空白，從最後一個 ')' 之後開始解析
+            return int(f.read().rsplit(")", 1)[1].split()[1]) == os.getppid()
+    except FileNotFoundError:
+        return False
+    except OSError:
+        pass
+    # 沒有 /proc 時只確認進程存在
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
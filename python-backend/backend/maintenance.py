@@ -0,0 +1,243 @@
+"""
+SQLite 例行維護：在流量低時更新查詢規劃器的統計、漸進式釋放空頁並檢查資料庫完整性。
+
+- 每個 worker 各自執行 `MaintenanceScheduler.run()`，每 `MAINTENANCE_CHECK_INTERVAL` 秒檢查一次：
+  距離上一次維護 (任何 worker 執行的) 超過 `MAINTENANCE_INTERVAL` 秒，且本 worker 在這段期間的請求率
+  不超過 `MAINTENANCE_IDLE_RPS` 時才執行；延遲超過兩倍間隔時不論流量都會執行
+- 以單一條件式 INSERT 在 `maintenance_runs` 寫入 `running` 紀錄來取得執行權，同一間隔內只有一個 worker 會執行
+- 步驟：
+  1. `ANALYZE` (以 `analysis_limit` 限制每個索引取樣的列數) 與 `PRAGMA optimize`
+  2. `PRAGMA incremental_vacuum(N)`：每次只釋放 `MAINTENANCE_VACUUM_PAGES` 個空頁，各自為一個短的寫入交易，
+     WAL 模式下讀取不受影響；之後以 PASSIVE checkpoint 讓檔案實際縮小。
+     需要 `auto_vacuum=INCREMENTAL` 的資料庫 (全新的資料庫建立時即是；既有資料庫需於停機時執行 `python migrate.py --vacuum`)，
+     否則略過。排程只執行 `incremental_vacuum`，不會執行完整的 `VACUUM`
+  3. `PRAGMA quick_check` (`MAINTENANCE_INTEGRITY=full` 時為 `integrity_check`)：唯讀交易，不阻擋寫入
+- 各步驟耗時與結果寫回該筆紀錄 (保留最近 `KEEP_RUNS` 筆)，`/metrics` 輸出最近一次的狀態
+
+也可以手動執行一次 (不檢查間隔與流量)：
+
+    python maintenance.py [--env .env]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger("quiz-api")
+
+RUNNING = "running"
+OK = "ok"
+FAILED = "failed"
+
+INTEGRITY_PRAGMAS = {"quick": "quick_check", "full": "integrity_check"}
+KEEP_RUNS = 100
+VACUUM_PAUSE = 0.01  # 每次釋放空頁之間暫停的秒數，讓 API 的寫入取得鎖
+MAX_INTEGRITY_MESSAGES = 20
+
+CLAIM = text(
+    "INSERT INTO maintenance_runs (pid, status, started_at) "
+    "SELECT :pid, :status, :now WHERE NOT EXISTS (SELECT 1 FROM maintenance_runs WHERE started_at > :since) "
+    "RETURNING id"
+)
+
+
+def claim(engine: Engine, interval: float, now: Optional[float] = None) -> Optional[int]:
+    """
+    距離上一次維護超過 `interval` 秒時寫入一筆 `running` 紀錄並回傳其 id，否則回傳 None。
+    判斷與寫入在同一個陳述式中，多個 worker 同時呼叫時只有一個會取得執行權。
+    """
+    now = int(now if now is not None else time.time())
+    with engine.begin() as conn:
+        return conn.execute(CLAIM, dict(pid=os.getpid(), status=RUNNING, now=now, since=now - interval)).scalar()
+
+
+def last_run(engine: Engine) -> Optional[models.MaintenanceRun]:
+    with Session(engine) as db:
+        return db.execute(
+            select(models.MaintenanceRun).order_by(models.MaintenanceRun.started_at.desc()).limit(1)
+        ).scalar()
+
+
+def timed(step: Callable[[], None]) -> int:
+    started = time.perf_counter()
+    step()
+    return int((time.perf_counter() - started) * 1000)
+
+
+def vacuum(conn: Connection, pages: int, should_stop: Callable[[], bool]) -> Optional[int]:
+    """逐步釋放空頁，回傳釋放的頁數；資料庫不是 incremental auto_vacuum 時回傳 None。"""
+    if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+        return None
+    freed = 0
+    free = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+    while free and not should_stop():
+        # 每釋放一頁回傳一列 (沒有欄位)，需以 DB-API cursor 全部取出陳述式才會執行完畢
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+        finally:
+            cursor.close()
+        remaining = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        freed += free - remaining
+        free = remaining
+        time.sleep(VACUUM_PAUSE)
+    conn.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+    return freed
+
+
+def perform(
+        engine: Engine,
+        run_id: int,
+        vacuum_pages: int = 256,
+        analysis_limit: int = 1000,
+        integrity: str = "quick",
+        should_stop: Callable[[], bool] = lambda: False
+) -> models.MaintenanceRun:
+    """執行一次維護並將結果寫回 `run_id` 的紀錄。"""
+    started = time.perf_counter()
+    results = {}
+    try:
+        # autocommit：每個 PRAGMA 各自為一個交易，寫入鎖只在單一步驟內持有
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql(f"PRAGMA analysis_limit={int(analysis_limit)}")
+            results["analyze_ms"] = timed(lambda: conn.exec_driver_sql("ANALYZE"))
+            results["optimize_ms"] = timed(lambda: conn.exec_driver_sql("PRAGMA optimize"))
+
+            vacuum_started = time.perf_counter()
+            results["freed_pages"] = vacuum(conn, vacuum_pages, should_stop)
+            if results["freed_pages"] is not None:
+                results["vacuum_ms"] = int((time.perf_counter() - vacuum_started) * 1000)
+            else:
+                logger.warning(
+                    "資料庫不是 incremental auto_vacuum，略過 vacuum (請於停機維護時執行 `python migrate.py --vacuum`)"
+                )
+
+            pragma = INTEGRITY_PRAGMAS.get(integrity)
+            if pragma is not None:
+                integrity_started = time.perf_counter()
+                messages = conn.exec_driver_sql(f"PRAGMA {pragma}({MAX_INTEGRITY_MESSAGES})").scalars().all()
+                results["integrity_ms"] = int((time.perf_counter() - integrity_started) * 1000)
+                results["integrity"] = "\n".join(messages)
+            results["freelist_pages"] = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        results["status"] = OK if results.get("integrity", "ok") == "ok" else FAILED
+    except Exception as e:
+        logger.error(f"資料庫維護失敗: {e}", exc_info=True)
+        results.update(status=FAILED, error=str(e))
+
+    results.update(finished_at=int(time.time()), duration_ms=int((time.perf_counter() - started) * 1000))
+    with Session(engine) as db:
+        run = db.get(models.MaintenanceRun, run_id)
+        for key, value in results.items():
+            setattr(run, key, value)
+        # 只保留最近的紀錄
+        db.execute(models.MaintenanceRun.__table__.delete().where(models.MaintenanceRun.id.not_in(
+            select(models.MaintenanceRun.id).order_by(models.MaintenanceRun.started_at.desc()).limit(KEEP_RUNS)
+        )))
+        db.commit()
+        db.refresh(run)
+    if run.integrity not in (None, "ok"):
+        logger.error(f"資料庫完整性檢查發現問題: {run.integrity}")
+    logger.info(
+        f"資料庫維護完成: 狀態={run.status}, 耗時 {run.duration_ms} ms "
+        f"(ANALYZE {run.analyze_ms} ms, optimize {run.optimize_ms} ms, vacuum {run.vacuum_ms} ms "
+        f"釋放 {run.freed_pages} 頁, 完整性檢查 {run.integrity_ms} ms), pid={os.getpid()}"
+    )
+    return run
+
+
+class MaintenanceScheduler:
+    """
+    每個 worker 一個，決定何時執行維護並保存最近一次的結果供 `/metrics` 讀取。
+    `note_request()` 由准入控制中介層在每個請求呼叫，用來估計本 worker 的流量。
+    """
+
+    def __init__(
+            self,
+            engine: Engine,
+            interval: float = 21600.0,
+            check_interval: float = 60.0,
+            idle_rps: float = 1.0,
+            vacuum_pages: int = 256,
+            analysis_limit: int = 1000,
+            integrity: str = "quick"
+    ):
+        self.engine = engine
+        self.interval = interval
+        self.check_interval = check_interval
+        self.idle_rps = idle_rps
+        self.vacuum_pages = vacuum_pages
+        self.analysis_limit = analysis_limit
+        self.integrity = integrity
+        self.requests = 0
+        self.runs_total: Dict[str, int] = defaultdict(int)  # 本 worker 執行的次數 (依結果)
+        self.last: Optional[models.MaintenanceRun] = None  # 最近一次維護 (任何 worker)
+        self._stopping = False
+
+    def note_request(self):
+        self.requests += 1
+
+    async def run(self):
+        seen = self.requests
+        while not self._stopping:
+            await asyncio.sleep(self.check_interval)
+            rate = (self.requests - seen) / self.check_interval
+            seen = self.requests
+            try:
+                await asyncio.to_thread(self.check, rate)
+            except Exception as e:
+                logger.error(f"檢查資料庫維護排程失敗: {e}")
+
+    def stop(self):
+        self._stopping = True
+
+    def check(self, rate: float, now: Optional[float] = None):
+        """依上一次維護的時間與目前的請求率決定是否執行。"""
+        now = now if now is not None else time.time()
+        self.last = last_run(self.engine)
+        # 從未執行過時視為剛好到期，仍需等待流量低的時段
+        age = now - self.last.started_at if self.last is not None else self.interval
+        if age < self.interval or (rate > self.idle_rps and age < 2 * self.interval):
+            return
+        run_id = claim(self.engine, self.interval, now)
+        if run_id is None:
+            return
+        logger.info(f"開始資料庫維護 (請求率 {rate:.2f}/s, pid={os.getpid()})")
+        self.last = perform(self.engine, run_id, self.vacuum_pages, self.analysis_limit, self.integrity,
+                            should_stop=lambda: self._stopping)
+        self.runs_total[self.last.status] += 1
+
+
+def main():
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="英簡單資料庫例行維護 (立即執行一次)")
+    parser.add_argument('--env', type=str, default='.env', help='環境變數設定檔路徑')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    load_dotenv(args.env)
+
+    from config import Settings
+    from database import init_engine
+    settings = Settings.from_env()
+    engine = init_engine(settings.database_url)
+    run_id = claim(engine, interval=0)
+    if run_id is None:
+        raise SystemExit("無法取得維護的執行權")
+    run = perform(engine, run_id, settings.maintenance_vacuum_pages, settings.maintenance_analysis_limit,
+                  settings.maintenance_integrity)
+    if run.status != OK:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
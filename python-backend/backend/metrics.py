@@ -0,0 +1,103 @@
+"""
+各 worker 自有的執行期指標，以 Prometheus 文字格式由 `GET /metrics` 輸出。
+
+不依賴 prometheus_client：計數器 (`Counter`) 由各模組在事件發生時遞增，
+其餘數值 (快取命中、連線數等) 以回呼 (`Registry.callback()`) 在輸出時讀取。
+多 worker 時每次請求只會看到處理它的 worker，輸出中帶有 `pid` 標籤以便區分。
+"""
+import gc
+import os
+import threading
+from typing import Callable, Dict, List, Tuple, Union
+
+Labels = Tuple[Tuple[str, str], ...]
+GaugeValue = Union[float, Dict[Labels, float]]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def resident_memory_bytes() -> float:
+    """目前的常駐記憶體 (RSS)，讀取 /proc/self/statm；非 Linux 平台回傳 0。"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return 0
+
+
+def open_fds() -> float:
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return 0
+
+
+def gc_collections() -> Dict[Labels, float]:
+    return {labels(generation=generation): stats["collections"] for generation, stats in enumerate(gc.get_stats())}
+
+
+def labels(**values) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in values.items()))
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(label_pairs: Labels) -> str:
+    pairs = label_pairs + (("pid", str(os.getpid())),)
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **label_values):
+        key = labels(**label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **label_values) -> float:
+        return self._values.get(labels(**label_values), 0)
+
+    def samples(self) -> Dict[Labels, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Registry:
+    def __init__(self):
+        self._counters: Dict[str, Counter] = {}
+        self._callbacks: Dict[str, Tuple[str, str, Callable[[], GaugeValue]]] = {}
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        if name not in self._counters:
+            self._counters[name] = Counter(name, help_text)
+        return self._counters[name]
+
+    def callback(self, name: str, help_text: str, read: Callable[[], GaugeValue], kind: str = "gauge"):
+        """
+        輸出時呼叫 `read()` 取得數值 (單一數值，或 {labels(...): 數值} 的字典)；
+        其他模組自行維護的累計值 (如快取命中次數) 以 `kind="counter"` 註冊。
+        """
+        self._callbacks[name] = (kind, help_text, read)
+
+    def render(self) -> bytes:
+        lines: List[str] = []
+        for counter in self._counters.values():
+            lines.append(f"# HELP {counter.name} {counter.help_text}")
+            lines.append(f"# TYPE {counter.name} counter")
+            for label_pairs, value in sorted(counter.samples().items()):
+                lines.append(f"{counter.name}{format_labels(label_pairs)} {value:.15g}")
+        for name, (kind, help_text, read) in self._callbacks.items():
+            value = read()
+            samples = value if isinstance(value, dict) else {(): value}
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for label_pairs, sample in sorted(samples.items()):
+                lines.append(f"{name}{format_labels(label_pairs)} {sample:.15g}")
+        return ("\n".join(lines) + "\n").encode()
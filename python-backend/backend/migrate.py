@@ -0,0 +1,344 @@
+"""
+資料庫結構遷移。
+
+API 啟動時不再自動建立表格，部署或升級時需先執行一次：
+
+    python migrate.py [--env .env]              # 套用尚未套用的遷移，並執行待完成的回填
+    python migrate.py --no-backfill             # 只套用遷移，回填留待之後 (可在 API 運作中) 執行
+    python migrate.py --backfill-only           # 只執行待完成的回填
+    python migrate.py --status                  # 列出已套用的遷移與回填進度
+    python migrate.py --vacuum                  # (停機維護時) 以完整 VACUUM 轉換為 incremental auto_vacuum
+
+`run_apps.py` 會在啟動 API worker 之前自動套用遷移，並在 API 啟動後於背景執行回填。
+
+遷移依 `MIGRATIONS` 的版本順序套用，已套用的版本記錄於 `schema_migrations`；每個遷移在單一交易中執行，
+失敗時整個遷移回滾 (需要自行控制交易或外鍵設定的遷移除外，這類遷移必須可重複執行)。需要改寫大量既有資料列的變更不在遷移交易中進行，
+而是由遷移以 `backfill.enqueue()` 建立回填，之後分成許多短交易執行 (見 `backfill.py`)。
+
+新增結構變更時在 `MIGRATIONS` 末端加上新的版本，不要修改已發佈的遷移。全新的資料庫同樣依序套用所有遷移，
+而 `baseline` 以目前的模型建立表格，因此之後的遷移需先檢查欄位 / 索引是否已存在。
+"""
+import argparse
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+
+from sqlalchemy import inspect, MetaData, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.orm import Session
+
+import backfill
+import models
+import srs
+from database import init_engine
+
+logger = logging.getLogger("quiz-migrate")
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+    transactional: bool = True  # False 時以 autocommit 連線執行，完成後才記錄版本
+
+
+def add_missing_columns(conn: Connection):
+    """
+    `create_all()` 不會修改既有的表格：為舊資料庫補上模型中新增的欄位與索引。
+    新增的欄位必須可為 NULL 或帶有 `server_default`，既有資料列會取得預設值。
+    """
+    inspector = inspect(conn)
+    for table in models.Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        added = False
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(conn.dialect)}"
+            if not column.nullable:
+                ddl += " NOT NULL"
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+            conn.execute(text(ddl))
+            logger.info(f"已新增欄位: {table.name}.{column.name}")
+            added = True
+        if added:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+ATTEMPTS_IN_RANGE = (
+    "FROM practice_attempts AS a JOIN entries AS e ON e.id = a.entry_id WHERE a.id > :lo AND a.id <= :hi"
+)
+BACKFILL_ENTRY_STATS = text(
+    "INSERT INTO entry_stats (entry_id, attempts, correct) "
+    f"SELECT a.entry_id, count(*), sum(a.correct) {ATTEMPTS_IN_RANGE} GROUP BY a.entry_id "
+    "ON CONFLICT (entry_id) DO UPDATE SET attempts = entry_stats.attempts + excluded.attempts, "
+    "correct = entry_stats.correct + excluded.correct"
+)
+BACKFILL_CHOICE_STATS = text(
+    "INSERT INTO choice_stats (choice_id, picks) "
+    "SELECT c.id, count(*) FROM practice_attempts AS a "
+    "JOIN choices AS c ON c.entry_id = a.entry_id AND c.choice_order = a.choice_order "
+    "WHERE a.id > :lo AND a.id <= :hi GROUP BY c.id "
+    "ON CONFLICT (choice_id) DO UPDATE SET picks = choice_stats.picks + excluded.picks"
+)
+
+
+def backfill_attempt_stats(db: Session, lo: int, hi: int) -> int:
+    """以作答紀錄補算統計計數 (與 `AttemptLog.write()` 的遞增相同)；已刪除的練習題不再計入。"""
+    params = dict(lo=lo, hi=hi)
+    count = db.execute(text(f"SELECT count(*) {ATTEMPTS_IN_RANGE}"), params).scalar()
+    if count:
+        db.execute(BACKFILL_ENTRY_STATS, params)
+        db.execute(BACKFILL_CHOICE_STATS, params)
+    return count
+
+
+BACKFILLS = {
+    item.name: item for item in (
+        # `entry_stats` / `choice_stats` 加入之前已寫入的作答紀錄
+        backfill.Backfill("attempt_stats", models.PracticeAttempt.__table__, backfill_attempt_stats),
+    )
+}
+
+
+def baseline(conn: Connection):
+    """
+    遷移框架之前的結構：建立所有尚未存在的表格並補上缺少的欄位。
+    已有作答紀錄但沒有統計表的舊資料庫，另外建立統計計數的回填。
+    """
+    inspector = inspect(conn)
+    legacy_attempts = inspector.has_table("practice_attempts") and not inspector.has_table("entry_stats")
+    models.Base.metadata.create_all(bind=conn)
+    add_missing_columns(conn)
+    if legacy_attempts:
+        backfill.enqueue(conn, BACKFILLS["attempt_stats"])
+
+
+def create_maintenance_runs(conn: Connection):
+    models.MaintenanceRun.__table__.create(bind=conn, checkfirst=True)
+
+
+def incremental_auto_vacuum(conn: Connection):
+    """
+    例行維護需要 `auto_vacuum=INCREMENTAL` 才能以 `PRAGMA incremental_vacuum` 逐步釋放空頁。
+    全新的資料庫在建立時已是此模式；既有資料庫的轉換需要一次完整的 `VACUUM` (重寫整個檔案，期間阻擋所有寫入)，
+    不在部署時自動執行，只提示於維護時段以 `python migrate.py --vacuum` 轉換 (見 `convert_auto_vacuum()`)。
+    """
+    if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+        logger.warning(
+            "資料庫不是 incremental auto_vacuum，例行維護不會釋放空頁；"
+            "請於停機維護時執行 `python migrate.py --vacuum` 轉換 (完整 VACUUM，期間阻擋寫入)"
+        )
+
+
+def convert_auto_vacuum(engine: Engine) -> bool:
+    """
+    以一次完整的 `VACUUM` 將資料庫轉換為 `auto_vacuum=INCREMENTAL`，回傳是否執行了轉換。
+    重寫整個檔案，耗時與檔案大小成正比且期間阻擋所有寫入，需在停止 API 的維護時段明確執行 (`--vacuum`)。
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2:
+            logger.info("資料庫已是 incremental auto_vacuum，不需轉換")
+            return False
+        started = time.perf_counter()
+        logger.info("正在以 VACUUM 將資料庫轉換為 incremental auto_vacuum...")
+        conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.exec_driver_sql("VACUUM")
+    logger.info(f"已轉換為 incremental auto_vacuum ({(time.perf_counter() - started):.1f} 秒)")
+    return True
+
+
+def autoincrement_ids(conn: Connection):
+    """
+    `words` / `entries` 改為 AUTOINCREMENT，刪除 id 最大的項目後新增的項目不會再取得同一個 id
+    (否則舊的複習狀態、作答紀錄與 tombstone 會指向新的、不相關的項目)。
+
+    SQLite 無法修改既有表格的主鍵，需依官方建議的步驟重建：關閉外鍵檢查，在單一交易中建立新表、複製資料列、
+    刪除舊表、改名並重建索引，確認 `foreign_key_check` 無誤後提交。`choices`、`entry_stats` 以 id 參照，複製後不變。
+    只複製語料本身 (不含作答紀錄)，持有寫入鎖的時間與單字 / 練習題的筆數成正比。
+    `sqlite_sequence` 設為目前最大 id 與 tombstone 中最大 id 的較大者，已刪除的 id 也不會再被使用。
+    """
+    tables = [
+        (table, item_type) for table, item_type in ((models.Word.__table__, srs.ITEM_TYPES["word"]), (models.Entry.__table__, srs.ITEM_TYPES["entry"]))
+        if "AUTOINCREMENT" not in conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table.name,)
+        ).scalar().upper()
+    ]
+    if not tables:
+        return
+    conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+    try:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            for table, item_type in tables:
+                staging = table.to_metadata(MetaData(), name=f"new_{table.name}")
+                conn.execute(CreateTable(staging))
+                columns = ", ".join(column.name for column in table.columns)
+                conn.exec_driver_sql(f"INSERT INTO new_{table.name} ({columns}) SELECT {columns} FROM {table.name}")
+                conn.exec_driver_sql(f"DROP TABLE {table.name}")
+                conn.exec_driver_sql(f"ALTER TABLE new_{table.name} RENAME TO {table.name}")
+                for index in table.indexes:
+                    index.create(conn)
+                seq = conn.exec_driver_sql(
+                    f"SELECT max(coalesce((SELECT max(id) FROM {table.name}), 0), "
+                    "coalesce((SELECT max(item_id) FROM tombstones WHERE item_type = ?), 0))", (item_type,)
+                ).scalar()
+                conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = ?", (table.name,))
+                conn.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table.name, seq))
+                logger.info(f"已將 {table.name} 改為 AUTOINCREMENT (下一個 id > {seq})")
+            problems = conn.exec_driver_sql("PRAGMA foreign_key_check").fetchall()
+            if problems:
+                raise RuntimeError(f"重建後外鍵檢查失敗: {problems[:5]}")
+            conn.exec_driver_sql("COMMIT")
+        except Exception:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
+    finally:
+        conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline", baseline),
+    Migration(2, "maintenance_runs", create_maintenance_runs),
+    Migration(3, "incremental_auto_vacuum", incremental_auto_vacuum),
+    Migration(4, "autoincrement_ids", autoincrement_ids, transactional=False),
+]
+
+
+def applied_versions(engine: Engine) -> List[int]:
+    with engine.connect() as conn:
+        return list(conn.execute(
+            select(models.SchemaMigration.version).order_by(models.SchemaMigration.version)
+        ).scalars())
+
+
+def record_version(conn: Connection, migration: Migration, duration_ms: int = 0) -> bool:
+    """寫入已套用的版本，回傳是否由本次寫入 (版本已存在時為 False)。"""
+    return conn.execute(
+        sqlite_insert(models.SchemaMigration)
+        .values(version=migration.version, name=migration.name, applied_at=int(time.time()), duration_ms=duration_ms)
+        .on_conflict_do_nothing(index_elements=["version"])
+        .returning(models.SchemaMigration.version)
+    ).scalar() is not None
+
+
+def apply_migrations(engine: Engine) -> List[int]:
+    """依序套用尚未套用的遷移，回傳本次套用的版本。"""
+    models.SchemaMigration.__table__.create(bind=engine, checkfirst=True)
+    models.SchemaBackfill.__table__.create(bind=engine, checkfirst=True)
+    applied = []
+    for migration in MIGRATIONS:
+        started = time.perf_counter()
+        if migration.transactional:
+            with engine.begin() as conn:
+                # 先寫入版本列以取得寫入鎖：同時執行的另一個遷移程序會在此等待，之後看到版本已存在而略過
+                if not record_version(conn, migration):
+                    continue
+                migration.upgrade(conn)
+                duration_ms = int((time.perf_counter() - started) * 1000)
+                conn.execute(
+                    models.SchemaMigration.__table__.update()
+                    .where(models.SchemaMigration.version == migration.version)
+                    .values(duration_ms=duration_ms)
+                )
+        else:
+            if migration.version in applied_versions(engine):
+                continue
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                migration.upgrade(conn)
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            with engine.begin() as conn:
+                if not record_version(conn, migration, duration_ms):
+                    continue
+        logger.info(f"已套用遷移 {migration.version:04d}_{migration.name} ({duration_ms} ms)")
+        applied.append(migration.version)
+    return applied
+
+
+def run_backfills(engine: Engine, target_ms: float = 5.0, pause: float = 0.01) -> List[backfill.BackfillResult]:
+    """執行所有待完成的回填。"""
+    results = []
+    for name in backfill.pending(engine):
+        if name not in BACKFILLS:
+            logger.warning(f"未知的回填: {name}")
+            continue
+        result = backfill.run(engine, BACKFILLS[name], target_ms=target_ms, pause=pause)
+        if result:
+            results.append(result)
+    return results
+
+
+def migrate(engine: Engine, run_backfill: bool = True):
+    """建立資料庫目錄、套用尚未套用的遷移，並 (可選) 執行待完成的回填。"""
+    db_dir = os.path.dirname(engine.url.database or "")
+    if db_dir and not os.path.exists(db_dir):
+        os.makedirs(db_dir)
+        logger.info(f"已創建資料庫目錄: {db_dir}")
+
+    applied = apply_migrations(engine)
+    logger.info(f"資料庫結構版本: {MIGRATIONS[-1].version}" + (f" (本次套用 {len(applied)} 個遷移)" if applied else ""))
+    if run_backfill:
+        run_backfills(engine)
+
+
+def print_status(engine: Engine):
+    applied = set(applied_versions(engine)) if inspect(engine).has_table("schema_migrations") else set()
+    for migration in MIGRATIONS:
+        mark = "已套用" if migration.version in applied else "未套用"
+        print(f"{migration.version:04d}_{migration.name:<24} {mark}")
+    if not inspect(engine).has_table("schema_backfills"):
+        return
+    for name, state in backfill.status(engine).items():
+        if state.finished_at is not None:
+            finished = datetime.fromtimestamp(state.finished_at).isoformat(sep=" ", timespec="seconds")
+            print(f"回填 {name:<24} 完成於 {finished}，{state.rows} 筆，{state.batches} 個批次")
+        else:
+            print(f"回填 {name:<24} 進行中: id {state.cursor}/{state.end}，已改寫 {state.rows} 筆")
+
+
+def main():
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="英簡單資料庫結構遷移")
+    parser.add_argument('--env', type=str, default='.env', help='環境變數設定檔路徑')
+    parser.add_argument('--no-backfill', action='store_true', help='只套用遷移，不執行回填')
+    parser.add_argument('--backfill-only', action='store_true', help='只執行待完成的回填')
+    parser.add_argument('--status', action='store_true', help='列出已套用的遷移與回填進度')
+    parser.add_argument('--vacuum', action='store_true',
+                        help='以完整 VACUUM 轉換為 incremental auto_vacuum (期間阻擋寫入，請於停機維護時執行)')
+    parser.add_argument('--batch-ms', type=float, default=5.0, help='回填時每個批次交易的目標毫秒數')
+    parser.add_argument('--pause', type=float, default=0.01, help='回填批次之間暫停的秒數')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    load_dotenv(args.env)
+
+    from config import Settings
+    settings = Settings.from_env()
+    try:
+        engine = init_engine(settings.database_url)
+        if args.status:
+            print_status(engine)
+        elif args.vacuum:
+            convert_auto_vacuum(engine)
+        elif args.backfill_only:
+            run_backfills(engine, args.batch_ms, args.pause)
+        else:
+            migrate(engine, run_backfill=False)
+            if not args.no_backfill:
+                run_backfills(engine, args.batch_ms, args.pause)
+    except Exception as e:
+        logger.error(f"資料庫初始化錯誤: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@ from __future__ import annotations  # 允許使用前向引用
 
 from typing import List, Optional
 
-from sqlalchemy import Integer, String, Text, ForeignKey, UniqueConstraint
+from sqlalchemy import Boolean, Integer, String, Text, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database import Base
@@ -18,6 +18,8 @@ class Entry(Base):
     answer: Mapped[str] = mapped_column(Text, nullable=False)
     topic: Mapped[str] = mapped_column(String, nullable=False)
     part: Mapped[int] = mapped_column(Integer, nullable=False)
+    # 最後一次寫入時的全域資料版本，供 /changes 增量同步
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
 
     # 定義與 Choice 的一對多關聯
     choices: Mapped[List[Choice]] = relationship(
@@ -28,6 +30,9 @@ class Entry(Base):
 
     __table_args__ = (
         UniqueConstraint('part', 'topic', 'entry_id', name='uix_part_topic_entry_id'),
+        Index('ix_entries_version', 'version'),
+        # 已刪除的 id 不再重複使用，作答紀錄、複習狀態與 tombstone 不會指向之後新增的練習題
+        {'sqlite_autoincrement': True},
     )
 
 
@@ -66,7 +71,190 @@ class Word(Base):
     pronunciations: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON
     definitions: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON
     verbs: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON
+    # 最後一次寫入時的全域資料版本，供 /changes 增量同步
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
 
     __table_args__ = (
         UniqueConstraint('part', 'topic', 'word', name='uix_part_topic_word'),
+        Index('ix_words_version', 'version'),
+        {'sqlite_autoincrement': True},  # 同 Entry：已刪除的 id 不再重複使用
+    )
+
+
+class ReviewState(Base):
+    """
+    單一學習者對單一單字 / 練習題的複習排程狀態 (SM-2)。
+    以 (learner_id, item_type, item_id) 為主鍵並使用 WITHOUT ROWID 以縮小表格體積，
+    所有欄位皆為整數，時間以 epoch 秒儲存。
+    """
+    __tablename__ = 'review_states'
+
+    learner_id: Mapped[str] = mapped_column(String, primary_key=True)
+    item_type: Mapped[int] = mapped_column(Integer, primary_key=True)  # 0: word, 1: entry
+    item_id: Mapped[int] = mapped_column(Integer, primary_key=True)  # words.id 或 entries.id
+    due: Mapped[int] = mapped_column(Integer, nullable=False)
+    interval: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # 天數
+    ease: Mapped[int] = mapped_column(Integer, nullable=False, default=2500)  # 千分比，2500 = 2.5
+    reps: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    lapses: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_review: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # 到期佇列索引：「某學習者最早到期的 N 筆」為有界的索引範圍掃描
+        Index('ix_review_states_learner_due', 'learner_id', 'due'),
+        {'sqlite_with_rowid': False},
+    )
+
+
+class PracticeAttempt(Base):
+    """
+    練習題作答紀錄，只做附加寫入。
+    除主鍵外不建立任何索引，以維持批次寫入的速度；遞增的 id 可作為增量統計的檢查點。
+    """
+    __tablename__ = 'practice_attempts'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    entry_id: Mapped[int] = mapped_column(Integer, nullable=False)  # entries.id
+    learner_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    choice_order: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # 未作答時為 None
+    correct: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    created_at: Mapped[int] = mapped_column(Integer, nullable=False)  # epoch 秒
+
+
+class EntryStat(Base):
+    """
+    每題的累計作答次數與答對次數，與 `practice_attempts` 在同一交易中遞增維護。
+    """
+    __tablename__ = 'entry_stats'
+
+    entry_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey('entries.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    correct: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class ChoiceStat(Base):
+    """
+    每個選項被選取的累計次數。
+    """
+    __tablename__ = 'choice_stats'
+
+    choice_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey('choices.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    picks: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class DataVersion(Base):
+    """
+    全域資料版本，只有一列 (id = 1)。
+    每次管理端寫入 (新增單字 / 練習題) 都會在同一交易中遞增，
+    各 worker 以此判斷自身的讀取快取是否過期。
+    """
+    __tablename__ = 'data_version'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class Tombstone(Base):
+    """
+    已刪除的單字 / 練習題，讓 /changes 能回報刪除。
+    以 (item_type, item_id) 為主鍵，同一 id 再次被刪除時覆寫版本。
+    """
+    __tablename__ = 'tombstones'
+
+    item_type: Mapped[int] = mapped_column(Integer, primary_key=True)  # 0: word, 1: entry
+    item_id: Mapped[int] = mapped_column(Integer, primary_key=True)  # words.id 或 entries.id
+    part: Mapped[int] = mapped_column(Integer, nullable=False)
+    topic: Mapped[str] = mapped_column(String, nullable=False)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)  # 刪除時的全域資料版本
+
+    __table_args__ = (
+        Index('ix_tombstones_version', 'version'),
+        {'sqlite_with_rowid': False},
+    )
+
+
+class IngestJob(Base):
+    """
+    佇列寫入模式 (`INGEST_QUEUE=1`) 已完成的工作，與該批次的資料寫入在同一交易中記錄，
+    任何 worker 都能回答 `GET /ingest/jobs/{job_id}`；保留 `INGEST_JOB_TTL` 秒。
+    """
+    __tablename__ = 'ingest_jobs'
+
+    job_id: Mapped[str] = mapped_column(String, primary_key=True)
+    kind: Mapped[str] = mapped_column(String, nullable=False)  # words / practices
+    status: Mapped[str] = mapped_column(String, nullable=False)  # done / failed
+    version: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # 寫入時的全域資料版本
+    added: Mapped[str] = mapped_column(Text, nullable=False, default="[]")  # JSON：新增的 word / entry_id
+    status_code: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # 失敗時的 HTTP 狀態碼
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    submitted_at: Mapped[int] = mapped_column(Integer, nullable=False)  # epoch 秒
+    finished_at: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index('ix_ingest_jobs_finished_at', 'finished_at'),
+        {'sqlite_with_rowid': False},
+    )
+
+
+class SchemaMigration(Base):
+    """
+    已套用的結構遷移版本 (`migrate.MIGRATIONS`)，每個版本一列。
+    """
+    __tablename__ = 'schema_migrations'
+
+    version: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String, nullable=False)
+    applied_at: Mapped[int] = mapped_column(Integer, nullable=False)  # epoch 秒
+    duration_ms: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class SchemaBackfill(Base):
+    """
+    批次回填的進度檢查點：來源表依 id 遞增處理，`cursor` 之前 (含) 的資料列已處理完畢。
+    每個批次與其資料寫入在同一交易中更新，中斷後由 `cursor` 繼續。
+    """
+    __tablename__ = 'schema_backfills'
+
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    cursor: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    end: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # 建立時來源表的最大 id，之後的資料列不需回填
+    rows: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    batches: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    started_at: Mapped[int] = mapped_column(Integer, nullable=False)  # epoch 秒
+    updated_at: Mapped[int] = mapped_column(Integer, nullable=False)
+    finished_at: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
+
+class MaintenanceRun(Base):
+    """
+    SQLite 例行維護 (`maintenance.py`) 的執行紀錄：開始時寫入 `running` 以取得執行權，結束時寫回各步驟耗時與結果。
+    只保留最近的紀錄。
+    """
+    __tablename__ = 'maintenance_runs'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    pid: Mapped[int] = mapped_column(Integer, nullable=False)
+    status: Mapped[str] = mapped_column(String, nullable=False)  # running / ok / failed
+    started_at: Mapped[int] = mapped_column(Integer, nullable=False)  # epoch 秒
+    finished_at: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    duration_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    analyze_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    optimize_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    vacuum_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # 未啟用 incremental auto_vacuum 時為 None
+    integrity_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    freed_pages: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    freelist_pages: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # 維護後剩餘的空頁數
+    integrity: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # "ok" 或檢查回報的問題 (未檢查時為 None)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    __table_args__ = (
+        Index('ix_maintenance_runs_started_at', 'started_at'),
     )
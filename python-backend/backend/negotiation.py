@@ -0,0 +1,87 @@
+"""
+讀取端點的回應編碼協商 (JSON / MessagePack / CBOR)。
+
+依 `Accept` 標頭選擇編碼；MessagePack 與 CBOR 由 JSON 位元組轉換而來，
+分別需要安裝 `msgpack` 與 `cbor2` (`pip install -e ".[binary]"`)，未安裝時該編碼不會被選用，一律回傳 JSON；
+API 啟動時會記錄未安裝的套件。
+"""
+import json
+from typing import Dict, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+CBOR = "application/cbor"
+
+# 常見的別名，一律以標準名稱回應
+ALIASES: Dict[str, str] = {
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+}
+
+
+def available() -> Tuple[str, ...]:
+    """目前可提供的編碼 (JSON 永遠可用)。"""
+    media_types = [JSON]
+    if msgpack is not None:
+        media_types.append(MSGPACK)
+    if cbor2 is not None:
+        media_types.append(CBOR)
+    return tuple(media_types)
+
+
+def unavailable() -> Tuple[str, ...]:
+    """未安裝而停用的編碼所需的套件名稱。"""
+    return tuple(name for name, module in (("msgpack", msgpack), ("cbor2", cbor2)) if module is None)
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """
+    依 `Accept` 標頭選出品質值 (q) 最高且可提供的編碼，同分時取標頭中較前者。
+    未提供標頭、只接受 `*/*` 或沒有可提供的編碼時回傳 JSON。
+    """
+    if not accept:
+        return JSON
+    supported = available()
+    best, best_q = JSON, 0.0
+    for item in accept.split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        media_type = ALIASES.get(media_type.lower(), media_type.lower())
+        if media_type not in supported:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > best_q:
+            best, best_q = media_type, q
+    return best
+
+
+def transcode(json_body: bytes, media_type: str) -> bytes:
+    """將 JSON 本文轉換為指定的編碼。"""
+    if media_type == JSON:
+        return json_body
+    data = json.loads(json_body)
+    if media_type == MSGPACK:
+        return msgpack.packb(data)
+    if media_type == CBOR:
+        return cbor2.dumps(data)
+    raise ValueError(f"不支援的編碼: {media_type}")
+
+
+# 供路由的 `responses=` 使用，讓 OpenAPI 文件列出其他編碼
+OPENAPI_RESPONSES = {200: {"content": {MSGPACK: {}, CBOR: {}}}}
@@ -0,0 +1,203 @@
+"""
+將唯讀端點預先輸出為靜態 JSON 檔，供 CDN / 靜態網站主機直接提供。
+
+輸出目錄結構：
+
+    index.json          資料版本、各主題版本，以及「請求路徑 → 檔案」的對照表 (routes)
+    _headers            靜態主機的回應標頭設定 (Netlify / Cloudflare Pages 格式)
+    data/<sha256>.json  回應本文，以內容的 SHA-256 命名，可 immutable 快取
+
+預先輸出的請求 (與 API 回應的位元組完全相同)：
+
+- 每個 (part, topic) 的 `/words?part=&topic=` 與 `/practice/{part}/{topic}`
+- `/topics`、`/topics?part=`、`/parts`、`/parts?topic=`
+
+只指定 part 或 topic、或未指定篩選條件的 `/words` 不預先輸出 (內容即為多個主題的合併，且隨語料線性成長)。
+routes 的鍵為正規化的路徑：query 依 `part`、`topic` 的順序以 `urlencode()` 編碼，路徑中的 topic 以 `quote()` 編碼。
+
+與 `bundles.py` 相同由資料庫快照產生，主題版本未改變時沿用上一份 `index.json` 中的檔案，
+`/topics`、`/parts` 每次重新產生；只保留新舊兩份 index 引用的檔案，以 `<目錄>/.lock` 檔案鎖序列化。
+
+    python prerender.py [--env .env] [--output static/] [--force]
+"""
+import argparse
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import quote, urlencode
+
+from sqlalchemy.engine import Engine
+
+import bundles
+import corpusfile
+import versioning
+from schemas import PartsResponse, TopicsResponse
+
+logger = logging.getLogger("quiz-api")
+
+INDEX = "index.json"
+DATA_DIR = "data"
+
+HEADERS = """\
+/*
+  Access-Control-Allow-Origin: *
+/data/*
+  Cache-Control: public, max-age=31536000, immutable
+/index.json
+  Cache-Control: no-cache
+"""
+
+
+def words_route(part: int, topic: str) -> str:
+    return "/words?" + urlencode({"part": part, "topic": topic})
+
+
+def practice_route(part: int, topic: str) -> str:
+    return f"/practice/{part}/{quote(topic, safe='')}"
+
+
+def topics_route(part: Optional[int] = None) -> str:
+    return "/topics" if part is None else "/topics?" + urlencode({"part": part})
+
+
+def parts_route(topic: Optional[str] = None) -> str:
+    return "/parts" if topic is None else "/parts?" + urlencode({"topic": topic})
+
+
+def write_body(directory: str, body: bytes) -> str:
+    """寫入回應本文，回傳相對於輸出目錄的路徑。"""
+    info = bundles.write_content_addressed(os.path.join(directory, DATA_DIR), body, ".json")
+    return f"{DATA_DIR}/{info['file']}"
+
+
+def metadata_bodies(topic_names) -> Dict[str, bytes]:
+    """
+    `/topics` 與 `/parts` 的回應本文，只依據有單字的主題 (依 (part, topic) 排序)，
+    順序與唯讀模型相同：主題依第一次出現的順序，part 由小到大。
+    """
+    topics_by_part: Dict[int, List[str]] = {}
+    parts_by_topic: Dict[str, List[int]] = {}
+    for part, topic in sorted(topic_names):
+        topics_by_part.setdefault(part, []).append(topic)
+        parts_by_topic.setdefault(topic, []).append(part)
+    if not topics_by_part:
+        return {}
+
+    def topics_body(names) -> bytes:
+        return TopicsResponse(count=len(names), topics=names).model_dump_json().encode()
+
+    def parts_body(numbers) -> bytes:
+        return PartsResponse(count=len(numbers), parts=numbers).model_dump_json().encode()
+
+    bodies = {topics_route(): topics_body(list(parts_by_topic)), parts_route(): parts_body(list(topics_by_part))}
+    bodies.update((topics_route(part), topics_body(names)) for part, names in topics_by_part.items())
+    bodies.update((parts_route(topic), parts_body(numbers)) for topic, numbers in parts_by_topic.items())
+    return bodies
+
+
+def build(engine: Engine, directory: str, previous: Optional[dict]) -> dict:
+    """由資料庫快照產生所有靜態回應，寫入新的 index，回傳 index。"""
+    os.makedirs(os.path.join(directory, DATA_DIR), exist_ok=True)
+    reusable = {
+        (topic["part"], topic["topic"]): topic
+        for topic in (previous or {}).get("topics", ())
+        if all(os.path.exists(os.path.join(directory, path)) for path in topic["routes"].values())
+    }
+    topics = []
+    with_words = []
+    rebuilt = 0
+    with bundles.temporary_snapshot(engine, directory) as (version, snapshot_path):
+        with bundles.connect_snapshot(snapshot_path) as conn:
+            for (part, topic), topic_version in sorted(bundles.topic_versions(conn).items()):
+                item = reusable.get((part, topic))
+                if item is None or item["version"] != topic_version:
+                    words, entries = bundles.topic_records(conn, part, topic)
+                    routes = {}
+                    if words:
+                        routes[words_route(part, topic)] = write_body(
+                            directory, b'{"words":[' + b",".join(map(corpusfile.encode_word, words)) + b"]}"
+                        )
+                    if entries:
+                        routes[practice_route(part, topic)] = write_body(
+                            directory, b'{"entries":[' + b",".join(map(corpusfile.encode_entry, entries)) + b"]}"
+                        )
+                    item = {"part": part, "topic": topic, "version": topic_version, "routes": routes}
+                    rebuilt += 1
+                if words_route(part, topic) in item["routes"]:
+                    with_words.append((part, topic))
+                topics.append(item)
+
+    routes = {path: write_body(directory, body) for path, body in metadata_bodies(with_words).items()}
+    for item in topics:
+        routes.update(item["routes"])
+    index = {"version": version, "generated_at": int(time.time()), "topics": topics, "routes": routes}
+
+    with open(os.path.join(directory, "_headers"), "w", encoding="utf-8") as f:
+        f.write(HEADERS)
+    fd, tmp_path = tempfile.mkstemp(prefix=".index-", dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, os.path.join(directory, INDEX))
+    logger.info(f"已輸出靜態回應: 版本={version}, 路徑={len(routes)}, 主題={len(topics)} (重新產生 {rebuilt} 個)")
+    return index
+
+
+def read_index(directory: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(directory, INDEX), "rb") as f:
+            return json.loads(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def referenced_files(index: Optional[dict]) -> Iterator[str]:
+    if index:
+        yield from index["routes"].values()
+
+
+def remove_unreferenced(directory: str, keep: set):
+    data_dir = os.path.join(directory, DATA_DIR)
+    for name in os.listdir(data_dir):
+        if name.endswith(".json") and f"{DATA_DIR}/{name}" not in keep:
+            os.unlink(os.path.join(data_dir, name))
+
+
+def publish(engine: Engine, directory: str, force: bool = False) -> dict:
+    """若 index 不存在或版本落後資料庫，則重新輸出，回傳目前的 index。"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, ".lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            previous = read_index(directory)
+            if not force and previous is not None and previous["version"] >= versioning.read(engine):
+                return previous
+            index = build(engine, directory, previous)
+            remove_unreferenced(directory, set(referenced_files(previous)) | set(referenced_files(index)))
+            return index
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def main():
+    from dotenv import load_dotenv
+
+    from config import Settings
+    from database import init_engine
+
+    parser = argparse.ArgumentParser(description="將唯讀端點預先輸出為靜態 JSON 檔")
+    parser.add_argument('--env', type=str, default='.env', help='環境變數設定檔路徑')
+    parser.add_argument('--output', type=str, default='static', help='輸出目錄')
+    parser.add_argument('--force', action='store_true', help='即使版本未變也重新輸出')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    load_dotenv(args.env)
+    publish(init_engine(Settings.from_env().database_url), args.output, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+線上診斷：以 cProfile 剖析接下來的 N 個請求，以及以 tracemalloc 比較記憶體快照、統計各路由的配置增長。
+
+兩者皆需設定 `PROFILING=1` 才會註冊端點與中介層；啟用後未進行剖析 / 追蹤時，
+中介層每個請求只檢查一次旗標。只作用於處理管理請求的 worker。
+
+- `RequestProfiler`：同一時間只能有一個剖析。剖析期間此 worker 處理的其他請求 (含執行緒中的工作)
+  也會一併計入，結果反映的是這段時間整個 worker 的 CPU 分布
+- `AllocationTracker`：開始時取得基準快照，之後每次報告取得新快照並依程式位置比較；
+  各路由的增長以請求前後 `tracemalloc.get_traced_memory()` 的差計算，並行請求互相重疊時只是近似值
+"""
+import asyncio
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+from typing import Dict, List, NamedTuple, Optional
+
+SORT_KEYS = ("cumulative", "tottime", "calls")
+
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+)
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+class RequestProfiler:
+    def __init__(self):
+        self.active = False
+        self.started = 0  # 已開始剖析的請求數
+        self.finished = 0
+        self._limit = 0
+        self._route: Optional[str] = None
+        self._profile: Optional[cProfile.Profile] = None
+        self._done: Optional[asyncio.Event] = None
+
+    def arm(self, requests: int, route: Optional[str] = None):
+        """剖析接下來 `requests` 個路徑以 `route` 開頭 (未指定時為任何) 的請求。"""
+        if self.active:
+            raise ProfilerBusy("已有進行中的剖析")
+        self.started = self.finished = 0
+        self._limit = requests
+        self._route = route
+        self._profile = cProfile.Profile()
+        self._done = asyncio.Event()
+        self.active = True
+
+    def begin(self, path: str) -> bool:
+        """請求開始時呼叫，回傳此請求是否計入剖析。"""
+        if self.started >= self._limit or (self._route is not None and not path.startswith(self._route)):
+            return False
+        if self.started == 0:
+            self._profile.enable()
+        self.started += 1
+        return True
+
+    def end(self):
+        self.finished += 1
+        if self.finished >= self._limit:
+            self._done.set()
+
+    async def wait(self, timeout: float) -> int:
+        """等待剖析完成 (或逾時) 後停止，回傳完成剖析的請求數。"""
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self.active = False
+            if self.started:
+                self._profile.disable()
+        return self.finished
+
+    def report(self, sort: str = "cumulative", limit: int = 50) -> str:
+        if not self.started:
+            return ""
+        stream = io.StringIO()
+        pstats.Stats(self._profile, stream=stream).strip_dirs().sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+
+class AllocationStat(NamedTuple):
+    location: str
+    size_diff: int
+    size: int
+    count_diff: int
+    count: int
+
+
+class RouteAllocation(NamedTuple):
+    route: str
+    requests: int
+    net_bytes: int
+    mean_bytes: float
+
+
+class AllocationTracker:
+    def __init__(self):
+        self.active = False
+        self.started_at = 0.0
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._routes: Dict[str, List[int]] = {}  # route -> [請求數, 淨增長 bytes]
+
+    def start(self, frames: int = 1):
+        if self.active:
+            raise ProfilerBusy("記憶體追蹤已在進行中")
+        tracemalloc.start(frames)
+        self._baseline = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        self._routes = {}
+        self.started_at = time.time()
+        self.active = True
+
+    def stop(self):
+        self.active = False
+        self._baseline = None
+        tracemalloc.stop()
+
+    def record(self, route: str, net_bytes: int):
+        stats = self._routes.setdefault(route, [0, 0])
+        stats[0] += 1
+        stats[1] += net_bytes
+
+    def compare(self, group_by: str = "lineno", limit: int = 20) -> List[AllocationStat]:
+        """與基準快照比較，依增長量取前 `limit` 個程式位置 (耗時，應在執行緒中呼叫)。"""
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        differences = snapshot.compare_to(self._baseline, group_by)
+        return [
+            AllocationStat(
+                " <- ".join(f"{frame.filename}:{frame.lineno}" for frame in stat.traceback),
+                stat.size_diff, stat.size, stat.count_diff, stat.count
+            )
+            for stat in differences[:limit]
+        ]
+
+    def routes(self) -> List[RouteAllocation]:
+        return sorted(
+            (RouteAllocation(route, requests, net_bytes, net_bytes / requests)
+             for route, (requests, net_bytes) in self._routes.items()),
+            key=lambda allocation: allocation.net_bytes, reverse=True
+        )
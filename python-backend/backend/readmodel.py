@@ -0,0 +1,188 @@
+"""
+記憶體內的唯讀資料模型 (read model)。
+
+啟動後第一次讀取時將 `words`、`entries`、`choices` 全部載入為不可變的 NamedTuple，
+依 (part, topic) 分組，所有 GET 端點直接由此回答，熱路徑上不執行任何 SQL。
+
+管理端寫入遞增全域資料版本後，下一次讀取會以新的資料重建一份完整的模型，
+建立完成後以單一參照指派替換舊模型；正在使用舊模型的請求不受影響。
+"""
+import logging
+import sys
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+import models
+import versioning
+
+logger = logging.getLogger("quiz-api")
+
+
+class WordRecord(NamedTuple):
+    id: int
+    part: int
+    topic: str
+    word: str
+    pos: Optional[str]
+    meaning: Optional[str]
+    pronunciations: Optional[str]  # JSON
+    definitions: Optional[str]  # JSON
+    verbs: Optional[str]  # JSON
+
+
+class ChoiceRecord(NamedTuple):
+    choice_order: int
+    choice_text: str
+
+
+class EntryRecord(NamedTuple):
+    id: int
+    part: int
+    topic: str
+    entry_id: str
+    question: str
+    question_hash: int
+    answer: str
+    choices: Tuple[ChoiceRecord, ...]  # 依 choice_order 排序
+
+
+TopicKey = Tuple[int, str]
+
+
+class ReadModel:
+    """
+    某個資料版本的完整快照，建立後不再修改。
+
+    排序與原本的 SQL 查詢 (走唯一索引) 一致：同一 topic 的單字依 `word`、練習題依 `entry_id` 排序，
+    主題與 part 依索引中第一次出現的順序，未篩選的單字依 id 排序。
+    """
+
+    def __init__(self, version: int, words: List[WordRecord], entries: List[EntryRecord]):
+        self.version = version
+        self.word_count = len(words)
+        self.entry_count = len(entries)
+
+        self.all_words: Tuple[WordRecord, ...] = tuple(sorted(words, key=lambda w: w.id))
+        self.words_by_id: Dict[int, WordRecord] = {w.id: w for w in self.all_words}
+        self.entries_by_id: Dict[int, EntryRecord] = {e.id: e for e in entries}
+
+        grouped_words: Dict[TopicKey, List[WordRecord]] = {}
+        for word in words:
+            grouped_words.setdefault((word.part, word.topic), []).append(word)
+        self.words_by_topic: Dict[TopicKey, Tuple[WordRecord, ...]] = {
+            key: tuple(sorted(group, key=lambda w: w.word)) for key, group in sorted(grouped_words.items())
+        }
+
+        grouped_entries: Dict[TopicKey, List[EntryRecord]] = {}
+        for entry in entries:
+            grouped_entries.setdefault((entry.part, entry.topic), []).append(entry)
+        self.entries_by_topic: Dict[TopicKey, Tuple[EntryRecord, ...]] = {
+            key: tuple(sorted(group, key=lambda e: e.entry_id)) for key, group in grouped_entries.items()
+        }
+
+        # /topics 與 /parts 只依據 words 表
+        topics_by_part: Dict[int, List[str]] = {}
+        parts_by_topic: Dict[str, List[int]] = {}
+        all_topics: Dict[str, None] = {}
+        for part, topic in self.words_by_topic:
+            topics_by_part.setdefault(part, []).append(topic)
+            parts_by_topic.setdefault(topic, []).append(part)
+            all_topics.setdefault(topic)
+        self.topics_by_part = {part: tuple(topics) for part, topics in topics_by_part.items()}
+        self.parts_by_topic = {topic: tuple(parts) for topic, parts in parts_by_topic.items()}
+        self.all_topics = tuple(all_topics)
+        self.all_parts = tuple(topics_by_part)
+
+    def words(self, part: Optional[int] = None, topic: Optional[str] = None) -> Tuple[WordRecord, ...]:
+        if part and topic:
+            return self.words_by_topic.get((part, topic), ())
+        if part:
+            return tuple(w for t in self.topics_by_part.get(part, ()) for w in self.words_by_topic[(part, t)])
+        if topic:
+            return tuple(w for p in self.parts_by_topic.get(topic, ()) for w in self.words_by_topic[(p, topic)])
+        return self.all_words
+
+    def entries(self, part: int, topic: str) -> Tuple[EntryRecord, ...]:
+        return self.entries_by_topic.get((part, topic), ())
+
+    def topics(self, part: Optional[int] = None) -> Tuple[str, ...]:
+        return self.topics_by_part.get(part, ()) if part else self.all_topics
+
+    def parts(self, topic: Optional[str] = None) -> Tuple[int, ...]:
+        return self.parts_by_topic.get(topic, ()) if topic else self.all_parts
+
+
+def load(engine: Engine) -> ReadModel:
+    """
+    從資料庫載入完整的唯讀模型。
+
+    先讀取資料版本再讀取資料，因此模型記錄的版本不會比實際內容新；
+    若載入期間有其他寫入，只會讓下一次讀取再重建一次。
+    """
+    version = versioning.read(engine)
+    intern = sys.intern
+    with engine.connect() as conn:
+        words = [
+            WordRecord(row.id, row.part, intern(row.topic), row.word, row.pos and intern(row.pos), row.meaning,
+                       row.pronunciations, row.definitions, row.verbs)
+            for row in conn.execute(select(
+                models.Word.id, models.Word.part, models.Word.topic, models.Word.word, models.Word.pos,
+                models.Word.meaning, models.Word.pronunciations, models.Word.definitions, models.Word.verbs
+            ))
+        ]
+
+        choices: Dict[int, List[ChoiceRecord]] = {}
+        for entry_pk, choice_order, choice_text in conn.execute(
+                select(models.Choice.entry_id, models.Choice.choice_order, models.Choice.choice_text)
+                .order_by(models.Choice.entry_id, models.Choice.choice_order)
+        ):
+            choices.setdefault(entry_pk, []).append(ChoiceRecord(choice_order, choice_text))
+
+        entries = [
+            EntryRecord(row.id, row.part, intern(row.topic), row.entry_id, row.question, row.question_hash,
+                        row.answer, tuple(choices.get(row.id, ())))
+            for row in conn.execute(select(
+                models.Entry.id, models.Entry.part, models.Entry.topic, models.Entry.entry_id,
+                models.Entry.question, models.Entry.question_hash, models.Entry.answer
+            ))
+        ]
+    return ReadModel(version, words, entries)
+
+
+class ReadModelStore:
+    """
+    持有目前的 `ReadModel`。`get()` 在版本相符時直接回傳 (不加鎖)，
+    `refresh()` 以鎖保證同時只有一個執行緒重建，其餘執行緒等待後共用結果。
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._model: Optional[ReadModel] = None
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+
+    def get(self, version: int) -> Optional[ReadModel]:
+        model = self._model
+        if model is not None and model.version >= version:
+            return model
+        return None
+
+    def refresh(self, version: int) -> ReadModel:
+        with self._lock:
+            model = self.get(version)
+            if model is not None:
+                return model
+
+            started = time.perf_counter()
+            model = load(self.engine)
+            self._model = model
+            self.rebuilds += 1
+            logger.info(
+                f"已重建唯讀模型: 版本={model.version}, 單字={model.word_count}, 練習題={model.entry_count}, "
+                f"耗時 {(time.perf_counter() - started) * 1000:.1f}ms"
+            )
+            return model
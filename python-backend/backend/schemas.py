@@ -1,7 +1,11 @@
-from dataclasses import field
-from typing import List, Optional, Dict
+from typing import Annotated, List, Literal, Optional, Dict
 
-from pydantic import BaseModel, RootModel
+from pydantic import BaseModel, ConfigDict, Field, RootModel, TypeAdapter
+
+# 匿名學習者 id 由前端產生 (例如 UUID)
+LEARNER_ID_PATTERN = r"^[A-Za-z0-9_-]{1,64}$"
+# 單一 /add-words、/add-practices 請求最多的單字 / 練習題數，超過時分成多個請求
+MAX_ADD_ITEMS = 5000
 
 
 class ExampleSchema(BaseModel):
@@ -13,18 +17,16 @@ class PartsResponse(BaseModel):
     count: int
     parts: List[int]
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class DefinitionSchema(BaseModel):
     pos: Optional[str] = None
     definition: Optional[str] = None
     translation: Optional[str] = None
-    examples: List[ExampleSchema] = field(default_factory=list)
+    examples: List[ExampleSchema] = Field(default_factory=list)
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class PronunciationSchema(BaseModel):
@@ -43,27 +45,37 @@ class WordSchema(BaseModel):
     word: str
     pos: Optional[str] = None
     meaning: Optional[str] = None
-    pronunciations: List[PronunciationSchema] = field(default_factory=list)
-    definitions: List[DefinitionSchema] = field(default_factory=list)
-    verbs: List[VerbFormSchema] = field(default_factory=list)
+    pronunciations: List[PronunciationSchema] = Field(default_factory=list)
+    definitions: List[DefinitionSchema] = Field(default_factory=list)
+    verbs: List[VerbFormSchema] = Field(default_factory=list)
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class PartResponse(BaseModel):
     words: List[WordSchema]
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ChoiceSchema(BaseModel):
     choice_order: int
     choice_text: str
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ChoiceStatsSchema(BaseModel):
+    choice_order: int
+    choice_text: Optional[str] = None
+    picks: int
+
+
+class QuestionStatsSchema(BaseModel):
+    attempts: int
+    correct: int
+    accuracy: Optional[float] = None
+    choices: List[ChoiceStatsSchema]
 
 
 class PracticeEntrySchema(BaseModel):
@@ -72,24 +84,22 @@ class PracticeEntrySchema(BaseModel):
     question_hash: int
     answer: str
     choices: List[ChoiceSchema]
+    stats: Optional[QuestionStatsSchema] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class PracticeResponse(BaseModel):
     entries: List[PracticeEntrySchema]
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class TopicsResponse(BaseModel):
     count: int
     topics: List[str]
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class EntryCreateSchema(BaseModel):
@@ -97,11 +107,10 @@ class EntryCreateSchema(BaseModel):
     answer: str
     choices: List[str]
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
-class AddPracticesRequestSchema(RootModel[Dict[str, EntryCreateSchema]]):
+class AddPracticesRequestSchema(RootModel[Annotated[Dict[str, EntryCreateSchema], Field(max_length=MAX_ADD_ITEMS)]]):
     pass
 
 
@@ -109,25 +118,249 @@ class AddPracticesResponseSchema(BaseModel):
     message: str
     added_entries: List[str]
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
-class WordCreateSchema(BaseModel):
-    part: int
-    topic: str
+class TopicWordSchema(BaseModel):
     word: str
     pos: Optional[str] = None
     meaning: Optional[str] = None
-    pronunciations: List[PronunciationSchema] = field(default_factory=list)
-    definitions: List[DefinitionSchema] = field(default_factory=list)
-    verbs: List[VerbFormSchema] = field(default_factory=list)
+    pronunciations: List[PronunciationSchema] = Field(default_factory=list)
+    definitions: List[DefinitionSchema] = Field(default_factory=list)
+    verbs: List[VerbFormSchema] = Field(default_factory=list)
+
+
+class WordCreateSchema(TopicWordSchema):
+    part: int
+    topic: str
 
 
 class AddWordsRequestSchema(BaseModel):
-    words: List[WordCreateSchema]
+    words: List[WordCreateSchema] = Field(..., max_length=MAX_ADD_ITEMS)
 
 
 class AddWordsResponseSchema(BaseModel):
     message: str
     added_words: List[str]
+
+
+class ReplaceTopicRequestSchema(BaseModel):
+    words: List[TopicWordSchema] = Field(default_factory=list)
+    entries: Dict[str, EntryCreateSchema] = Field(default_factory=dict)
+
+
+class ReplaceTopicResponseSchema(BaseModel):
+    message: str
+    version: int  # 替換後的全域資料版本 (內容未改變時為目前版本)
+    added_words: List[str]
+    updated_words: List[str]
+    deleted_words: List[str]
+    added_entries: List[str]
+    updated_entries: List[str]
+    deleted_entries: List[str]
+
+
+class ReviewItemSchema(BaseModel):
+    item_type: Literal["word", "entry"]
+    item_id: int
+    due: int
+    interval: int
+    reps: int
+    is_new: bool = False
+    word: Optional[WordSchema] = None
+    entry: Optional[PracticeEntrySchema] = None
+
+
+class ReviewBatchResponse(BaseModel):
+    learner_id: str
+    now: int
+    items: List[ReviewItemSchema]
+
+
+class ReviewResultSchema(BaseModel):
+    item_type: Literal["word", "entry"]
+    item_id: int
+    grade: int = Field(..., ge=0, le=5)
+    reviewed_at: Optional[int] = None
+
+
+class ReviewGradeRequestSchema(BaseModel):
+    results: List[ReviewResultSchema] = Field(..., min_length=1, max_length=500)
+
+
+class ReviewStateSchema(BaseModel):
+    item_type: Literal["word", "entry"]
+    item_id: int
+    due: int
+    interval: int
+    ease: int
+    reps: int
+    lapses: int
+
+
+class ReviewGradeResponseSchema(BaseModel):
+    updated: int
+    states: List[ReviewStateSchema]
+
+
+class GradeAnswerSchema(BaseModel):
+    entry_id: str
+    choice_order: Optional[int] = None
+    choice_text: Optional[str] = None
+
+
+class GradeRequestSchema(BaseModel):
+    part: int
+    topic: str
+    learner_id: Optional[str] = Field(None, pattern=LEARNER_ID_PATTERN)
+    answers: List[GradeAnswerSchema] = Field(..., min_length=1, max_length=1000)
+
+
+class GradeResultSchema(BaseModel):
+    entry_id: str
+    correct: bool
+    choice_order: Optional[int] = None
+    correct_choice_order: Optional[int] = None
+    answer: str
+
+
+class GradeResponseSchema(BaseModel):
+    total: int
+    correct: int
+    score: float
+    results: List[GradeResultSchema]
+
+
+class EntryStatsSchema(QuestionStatsSchema):
+    entry_id: str
+    question: str
+
+
+class PracticeStatsResponse(BaseModel):
+    part: int
+    topic: str
+    attempts: int
+    entries: List[EntryStatsSchema]
+
+
+class WordChangeSchema(WordSchema):
+    id: int
+    part: int
+    topic: str
+    version: int
+
+
+class EntryChangeSchema(BaseModel):
+    id: int
+    part: int
+    topic: str
+    version: int
+    entry_id: str
+    question: str
+    question_hash: int
+    answer: str
+    choices: List[ChoiceSchema]
+
+
+class DeletedItemSchema(BaseModel):
+    item_type: Literal["word", "entry"]
+    item_id: int
+    part: int
+    topic: str
+    version: int
+
+
+class ChangesResponse(BaseModel):
+    since: Optional[int] = None
+    version: int
+    reset: bool = False
+    words: List[WordChangeSchema]
+    entries: List[EntryChangeSchema]
+    deleted: List[DeletedItemSchema]
+
+
+class BundleFileSchema(BaseModel):
+    file: str
+    sha256: str
+    size: int
+
+
+class SnapshotSchema(BundleFileSchema):
+    version: int
+
+
+class TopicBundleSchema(BundleFileSchema):
+    part: int
+    topic: str
+    version: int
+    words: int
+    entries: int
+
+
+class BundleManifestResponse(BaseModel):
+    version: int
+    generated_at: int
+    snapshot: SnapshotSchema
+    topics: List[TopicBundleSchema]
+
+
+class SqlStatementSchema(BaseModel):
+    statement: str
+    count: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    slow: int
+    plan: Optional[List[str]] = None
+
+
+class SqlStatsResponse(BaseModel):
+    pid: int
+    since: int
+    statements: int
+    total_ms: float
+    slow_ms: float
+    top: List[SqlStatementSchema]
+
+
+class AllocationStatSchema(BaseModel):
+    location: str
+    size_diff: int
+    size: int
+    count_diff: int
+    count: int
+
+
+class RouteAllocationSchema(BaseModel):
+    route: str
+    requests: int
+    net_bytes: int
+    mean_bytes: float
+
+
+class AllocationReportResponse(BaseModel):
+    pid: int
+    since: int
+    traced_bytes: int
+    peak_bytes: int
+    top: List[AllocationStatSchema]
+    routes: List[RouteAllocationSchema]
+
+
+class IngestJobResponse(BaseModel):
+    job_id: str
+    kind: Optional[Literal["words", "practices"]] = None  # 其他 worker 佇列中的工作無法得知
+    status: Literal["queued", "done", "failed"]
+    version: Optional[int] = None
+    added: List[str] = Field(default_factory=list)
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+    submitted_at: Optional[int] = None
+    finished_at: Optional[int] = None
+
+
+# 管理端的批次寫入請求以 `TypeAdapter.validate_json()` 直接由請求本文的 bytes 驗證整批資料，
+# 不先以 json.loads() 建立中間的 dict / list 再逐層驗證
+ADD_WORDS_ADAPTER = TypeAdapter(AddWordsRequestSchema)
+ADD_PRACTICES_ADAPTER = TypeAdapter(AddPracticesRequestSchema)
+REPLACE_TOPIC_ADAPTER = TypeAdapter(ReplaceTopicRequestSchema)
@@ -0,0 +1,160 @@
+"""
+SQL 陳述式的執行時間統計與慢查詢紀錄 (每個 worker 各自統計)。
+
+`SqlStats.install(engine)` 以 `sqlalchemy.event` 的 `before_cursor_execute` / `after_cursor_execute`
+量測每個陳述式，依正規化後的 SQL (字面值與 `IN` / 多列 `VALUES` 清單合併為 `?`、空白合併) 彙總
+次數、總時間與最長時間；超過 `slow_ms` 的陳述式以 WARNING 記錄並附上 `EXPLAIN QUERY PLAN`
+(只支援 SQLite，每種陳述式只查詢一次)。`GET /admin/sql-stats` 依總時間列出前 N 名。
+
+量測的是 `cursor.execute()` 本身：SQLite 在此時執行到第一列，其餘列在取用時才計算，
+因此大量讀取的 SELECT 實際耗時會比統計值長。
+"""
+import functools
+import logging
+import re
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("quiz-api")
+
+OTHER = "(其他)"  # 不同陳述式超過 max_statements 後合併於此
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+VALUES_LIST = re.compile(r"\bVALUES\s*(\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+WHITESPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=2048)
+def normalize(statement: str) -> str:
+    """SQLAlchemy 編譯後的 SQL 字串會重複出現，因此以 LRU 快取正規化結果。"""
+    text = STRING_LITERAL.sub("?", statement)
+    text = NUMBER_LITERAL.sub("?", text)
+    text = IN_LIST.sub("IN (?)", text)
+    text = VALUES_LIST.sub(r"VALUES \1", text)
+    return WHITESPACE.sub(" ", text).strip()
+
+
+class StatementStats:
+    __slots__ = ("count", "total", "max", "slow", "plan")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+        self.plan: Optional[List[str]] = None
+
+
+class StatementSummary(NamedTuple):
+    statement: str
+    count: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    slow: int
+    plan: Optional[List[str]]
+
+
+def explain(cursor, statement: str, parameters, executemany: bool) -> List[str]:
+    """以同一個 DBAPI 連線執行 `EXPLAIN QUERY PLAN`，依節點深度縮排。"""
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    rows = cursor.connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+class SqlStats:
+    def __init__(self, slow_ms: float = 100.0, max_statements: int = 1000):
+        self.slow_ms = slow_ms
+        self.max_statements = max_statements
+        self.started_at = time.time()
+        self._statements: Dict[str, StatementStats] = {}
+        self._lock = threading.Lock()
+
+    def install(self, engine: Engine):
+        explainable = engine.dialect.name == "sqlite"
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info["sql_stats_started"] = time.perf_counter()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info["sql_stats_started"]
+            key, slow = self.record(statement, elapsed)
+            if slow:
+                self.log_slow(key, statement, elapsed, cursor, parameters, executemany, explainable)
+
+    def record(self, statement: str, elapsed: float):
+        """回傳 (彙總用的鍵, 是否超過慢查詢門檻)。"""
+        key = normalize(statement)
+        slow = bool(self.slow_ms) and elapsed * 1000 >= self.slow_ms
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                if len(self._statements) >= self.max_statements:
+                    key = OTHER
+                stats = self._statements.setdefault(key, StatementStats())
+            stats.count += 1
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            stats.slow += slow
+        return key, slow
+
+    def log_slow(self, key: str, statement: str, elapsed: float, cursor, parameters, executemany: bool,
+                 explainable: bool):
+        stats = self._statements.get(key)
+        if stats is not None and stats.plan is None and explainable and key != OTHER \
+                and statement.lstrip().upper().startswith(EXPLAINABLE):
+            try:
+                stats.plan = explain(cursor, statement, parameters, executemany)
+            except Exception as exc:
+                stats.plan = [f"(EXPLAIN 失敗: {exc})"]
+        plan = "\n    ".join(stats.plan or ()) if stats is not None else ""
+        logger.warning(f"慢查詢 {elapsed * 1000:.1f} ms: {key}" + (f"\n    {plan}" if plan else ""))
+
+    @property
+    def count(self) -> int:
+        with self._lock:
+            return sum(stats.count for stats in self._statements.values())
+
+    @property
+    def total(self) -> float:
+        with self._lock:
+            return sum(stats.total for stats in self._statements.values())
+
+    @property
+    def slow(self) -> int:
+        with self._lock:
+            return sum(stats.slow for stats in self._statements.values())
+
+    def top(self, limit: int = 20, order_by: str = "total") -> List[StatementSummary]:
+        """依總時間 (`total`)、最長時間 (`max`)、平均時間 (`mean`) 或次數 (`count`) 排序。"""
+        with self._lock:
+            summaries = [
+                StatementSummary(key, stats.count, stats.total * 1000, stats.total * 1000 / stats.count,
+                                 stats.max * 1000, stats.slow, stats.plan)
+                for key, stats in self._statements.items()
+            ]
+        sort_key = {
+            "total": lambda s: s.total_ms, "max": lambda s: s.max_ms,
+            "mean": lambda s: s.mean_ms, "count": lambda s: s.count,
+        }[order_by]
+        return sorted(summaries, key=sort_key, reverse=True)[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self.started_at = time.time()
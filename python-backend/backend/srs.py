@@ -0,0 +1,155 @@
+"""
+間隔重複 (Spaced Repetition) 排程，採用 SM-2 演算法。
+
+每位匿名學習者對每個單字 / 練習題各有一筆 `ReviewState`，
+本模組只負責狀態計算與資料庫存取，不依賴 FastAPI。
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, exists, or_, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+import models
+
+ITEM_TYPES: Dict[str, int] = {"word": 0, "entry": 1}
+ITEM_TYPE_NAMES: Dict[int, str] = {v: k for k, v in ITEM_TYPES.items()}
+
+DAY_SECONDS = 86400
+RELEARN_DELAY = 600  # 答錯後 10 分鐘再次出現
+DEFAULT_EASE = 2500
+MIN_EASE = 1300
+
+
+def schedule(
+        state: Optional[models.ReviewState],
+        grade: int,
+        now: int
+) -> Tuple[int, int, int, int, int]:
+    """
+    依 SM-2 計算一次作答後的新狀態。
+
+    :param state: 目前狀態，首次複習時為 None
+    :param grade: 自評分數 0~5，小於 3 視為答錯
+    :param now: 作答時間 (epoch 秒)
+    :return: (due, interval, ease, reps, lapses)
+    """
+    ease = state.ease if state else DEFAULT_EASE
+    interval = state.interval if state else 0
+    reps = state.reps if state else 0
+    lapses = state.lapses if state else 0
+
+    if grade < 3:
+        return now + RELEARN_DELAY, 0, max(MIN_EASE, ease - 200), 0, lapses + (1 if reps else 0)
+
+    q = 5 - grade
+    ease = max(MIN_EASE, ease + 100 - q * (80 + q * 20))
+    if reps == 0:
+        interval = 1
+    elif reps == 1:
+        interval = 6
+    else:
+        interval = max(interval + 1, round(interval * ease / 1000))
+
+    return now + interval * DAY_SECONDS, interval, ease, reps + 1, lapses
+
+
+def fetch_due(db: Session, learner_id: str, now: int, limit: int) -> List[models.ReviewState]:
+    """
+    取得學習者最早到期的 `limit` 筆狀態，走 (learner_id, due) 索引。
+    項目已被刪除的狀態 (保留於 `review_states`) 以主鍵查詢排除，不會佔用名額。
+    """
+    state = models.ReviewState
+    return db.query(state).filter(
+        state.learner_id == learner_id,
+        state.due <= now,
+        or_(
+            and_(state.item_type == ITEM_TYPES["word"], exists().where(models.Word.id == state.item_id)),
+            and_(state.item_type == ITEM_TYPES["entry"], exists().where(models.Entry.id == state.item_id))
+        )
+    ).order_by(state.due).limit(limit).all()
+
+
+def fetch_new(
+        db: Session,
+        learner_id: str,
+        item_type: int,
+        part: int,
+        topic: str,
+        limit: int
+) -> List[int]:
+    """
+    從指定 part / topic 中挑出學習者尚未複習過的項目 id。
+    """
+    model = models.Word if item_type == ITEM_TYPES["word"] else models.Entry
+    seen = db.query(models.ReviewState.item_id).filter(
+        models.ReviewState.learner_id == learner_id,
+        models.ReviewState.item_type == item_type
+    )
+    rows = db.query(model.id).filter(
+        model.part == part,
+        model.topic == topic,
+        model.id.not_in(seen)
+    ).order_by(model.id).limit(limit).all()
+    return [row[0] for row in rows]
+
+
+def missing_items(db: Session, keys: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    回傳 keys 中在 words / entries 表格內不存在的 (item_type, item_id)。
+    """
+    missing = []
+    for item_type, model in ((ITEM_TYPES["word"], models.Word), (ITEM_TYPES["entry"], models.Entry)):
+        ids = {item_id for t, item_id in keys if t == item_type}
+        if not ids:
+            continue
+        found = {row[0] for row in db.query(model.id).filter(model.id.in_(ids)).all()}
+        missing.extend((item_type, item_id) for item_id in sorted(ids - found))
+    return missing
+
+
+def apply_grades(
+        db: Session,
+        learner_id: str,
+        results: List[Tuple[int, int, int, int]]
+) -> List[dict]:
+    """
+    批次套用作答結果並以單一 upsert 寫回，不負責 commit。
+
+    :param results: [(item_type, item_id, grade, reviewed_at), ...]，依作答順序排列
+    :return: 每個項目最終狀態的 dict 清單
+    """
+    keys = {(item_type, item_id) for item_type, item_id, _, _ in results}
+    existing = db.query(models.ReviewState).filter(
+        models.ReviewState.learner_id == learner_id,
+        tuple_(models.ReviewState.item_type, models.ReviewState.item_id).in_(list(keys))
+    ).all()
+    states: Dict[Tuple[int, int], models.ReviewState] = {
+        (s.item_type, s.item_id): s for s in existing
+    }
+
+    rows: Dict[Tuple[int, int], dict] = {}
+    for item_type, item_id, grade, reviewed_at in results:
+        key = (item_type, item_id)
+        due, interval, ease, reps, lapses = schedule(states.get(key), grade, reviewed_at)
+        row = dict(
+            learner_id=learner_id, item_type=item_type, item_id=item_id,
+            due=due, interval=interval, ease=ease, reps=reps, lapses=lapses,
+            last_review=reviewed_at
+        )
+        rows[key] = row
+        # 同一批次重複作答同一項目時，以前一次的結果作為下一次的起點
+        states[key] = models.ReviewState(**row)
+
+    if rows:
+        stmt = sqlite_insert(models.ReviewState).values(list(rows.values()))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["learner_id", "item_type", "item_id"],
+            set_={
+                col: stmt.excluded[col]
+                for col in ("due", "interval", "ease", "reps", "lapses", "last_review")
+            }
+        )
+        db.execute(stmt)
+
+    return list(rows.values())
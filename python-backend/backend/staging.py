@@ -0,0 +1,227 @@
+"""
+整個主題的原子替換 (`PUT /topics/{part}/{topic}`)：先寫入暫存表，再以單一短交易換入。
+
+1. 載入：在同一條連線上建立 `TEMP` 暫存表 (`staging_words` / `staging_entries` / `staging_choices`)
+   並寫入新的單字與練習題。暫存表位於連線私有的 temp 資料庫，寫入時不持有 `data.db` 的寫入鎖，
+   JSON 序列化、雜湊等 Python 端的工作都在此階段完成
+2. 換入：遞增全域資料版本 (取得寫入鎖) 後，以集合式 SQL 比對暫存表與正式表：
+   - 不在新內容中的單字 / 練習題刪除並寫入 `tombstones`；練習題的選項、統計經由 `ondelete='CASCADE'` 一併刪除
+   - 內容有變的資料列就地更新 (保留 id，學習者的作答統計與複習狀態不受影響)，`version` 設為本次版本
+   - 新的資料列新增；內容完全相同的資料列不改動，`version` 也不變
+
+讀取端 (WAL) 只會看到替換前或替換後的主題。內容完全相同時不遞增版本。
+被刪除項目的複習狀態保留在 `review_states`，`srs.fetch_due()` 查詢到期項目時即排除，不佔用 `/review` 的名額；`words` / `entries` 的 id 為 AUTOINCREMENT，
+之後新增的項目不會取得被刪除的 id，保留的複習狀態、作答紀錄與 tombstone 不會指向新的項目。
+"""
+import time
+from typing import Dict, List, NamedTuple
+
+from sqlalchemy import text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+import changes
+import ingest
+import models
+import srs
+import versioning
+from schemas import EntryCreateSchema, TopicWordSchema
+
+STAGING_TABLES = ("staging_words", "staging_entries", "staging_choices")
+
+CREATE_STAGING = (
+    "CREATE TEMP TABLE staging_words ("
+    "word TEXT PRIMARY KEY, pos TEXT, meaning TEXT, pronunciations TEXT, definitions TEXT, verbs TEXT)",
+    "CREATE TEMP TABLE staging_entries ("
+    "entry_id TEXT PRIMARY KEY, question TEXT NOT NULL, question_hash INTEGER NOT NULL, answer TEXT NOT NULL)",
+    "CREATE TEMP TABLE staging_choices ("
+    "entry_id TEXT NOT NULL, choice_order INTEGER NOT NULL, choice_text TEXT NOT NULL, "
+    "PRIMARY KEY (entry_id, choice_order))",
+)
+
+DELETE_WORDS = text(
+    "DELETE FROM main.words WHERE part = :part AND topic = :topic "
+    "AND word NOT IN (SELECT word FROM temp.staging_words) "
+    "RETURNING id, word"
+)
+UPDATE_WORDS = text(
+    "UPDATE main.words SET pos = s.pos, meaning = s.meaning, pronunciations = s.pronunciations, "
+    "definitions = s.definitions, verbs = s.verbs, version = :version "
+    "FROM temp.staging_words AS s "
+    "WHERE words.part = :part AND words.topic = :topic AND words.word = s.word "
+    "AND (words.pos IS NOT s.pos OR words.meaning IS NOT s.meaning "
+    # JSON 欄位以 json() 正規化 (去除空白) 後比較，不受寫入時分隔符號格式的影響
+    "OR json(words.pronunciations) IS NOT json(s.pronunciations) "
+    "OR json(words.definitions) IS NOT json(s.definitions) "
+    "OR json(words.verbs) IS NOT json(s.verbs)) "
+    "RETURNING words.word"
+)
+INSERT_WORDS = text(
+    "INSERT INTO main.words (part, topic, word, pos, meaning, pronunciations, definitions, verbs, version) "
+    "SELECT :part, :topic, s.word, s.pos, s.meaning, s.pronunciations, s.definitions, s.verbs, :version "
+    "FROM temp.staging_words AS s "
+    "WHERE NOT EXISTS (SELECT 1 FROM main.words AS w WHERE w.part = :part AND w.topic = :topic AND w.word = s.word) "
+    "RETURNING word"
+)
+DELETE_ENTRIES = text(
+    "DELETE FROM main.entries WHERE part = :part AND topic = :topic "
+    "AND entry_id NOT IN (SELECT entry_id FROM temp.staging_entries) "
+    "RETURNING id, entry_id"
+)
+INSERT_ENTRIES = text(
+    "INSERT INTO main.entries (entry_id, question, question_hash, answer, topic, part, version) "
+    "SELECT s.entry_id, s.question, s.question_hash, s.answer, :topic, :part, :version "
+    "FROM temp.staging_entries AS s "
+    "WHERE NOT EXISTS ("
+    "SELECT 1 FROM main.entries AS e WHERE e.part = :part AND e.topic = :topic AND e.entry_id = s.entry_id) "
+    "RETURNING entry_id"
+)
+UPDATE_ENTRIES = text(
+    "UPDATE main.entries SET question = s.question, question_hash = s.question_hash, answer = s.answer, "
+    "version = :version "
+    "FROM temp.staging_entries AS s "
+    "WHERE entries.part = :part AND entries.topic = :topic AND entries.entry_id = s.entry_id "
+    "AND (entries.question IS NOT s.question OR entries.answer IS NOT s.answer) "
+    "RETURNING entries.id"
+)
+# 選項依 (練習題, choice_order) 比對，就地更新以保留 choice_stats
+DELETE_CHOICES = text(
+    "DELETE FROM main.choices WHERE id IN ("
+    "SELECT c.id FROM main.choices AS c JOIN main.entries AS e ON e.id = c.entry_id "
+    "WHERE e.part = :part AND e.topic = :topic AND NOT EXISTS ("
+    "SELECT 1 FROM temp.staging_choices AS sc "
+    "WHERE sc.entry_id = e.entry_id AND sc.choice_order = c.choice_order)) "
+    "RETURNING entry_id"
+)
+UPDATE_CHOICES = text(
+    "UPDATE main.choices SET choice_text = sc.choice_text "
+    "FROM main.entries AS e, temp.staging_choices AS sc "
+    "WHERE choices.entry_id = e.id AND e.part = :part AND e.topic = :topic "
+    "AND sc.entry_id = e.entry_id AND sc.choice_order = choices.choice_order "
+    "AND choices.choice_text IS NOT sc.choice_text "
+    "RETURNING choices.entry_id"
+)
+INSERT_CHOICES = text(
+    "INSERT INTO main.choices (entry_id, choice_text, choice_order) "
+    "SELECT e.id, sc.choice_text, sc.choice_order "
+    "FROM temp.staging_choices AS sc "
+    "JOIN main.entries AS e ON e.part = :part AND e.topic = :topic AND e.entry_id = sc.entry_id "
+    "WHERE NOT EXISTS (SELECT 1 FROM main.choices AS c WHERE c.entry_id = e.id AND c.choice_order = sc.choice_order) "
+    "RETURNING entry_id"
+)
+ENTRY_IDS = text("SELECT id, entry_id FROM main.entries WHERE part = :part AND topic = :topic")
+
+
+class Replacement(NamedTuple):
+    version: int  # 內容未改變時為 0
+    added_words: List[str]
+    updated_words: List[str]
+    deleted_words: List[str]
+    added_entries: List[str]
+    updated_entries: List[str]
+    deleted_entries: List[str]
+    swap_ms: float  # 持有寫入鎖的時間
+
+    @property
+    def changed(self) -> bool:
+        return self.version > 0
+
+
+def duplicate_words(words: List[TopicWordSchema]) -> List[str]:
+    seen = set()
+    return [item.word for item in words if item.word in seen or seen.add(item.word)]
+
+
+def load(conn: Connection, words: List[TopicWordSchema], entries: Dict[str, EntryCreateSchema]):
+    """建立暫存表並寫入新內容 (只寫入 temp 資料庫)。"""
+    for table in STAGING_TABLES:
+        conn.execute(text(f"DROP TABLE IF EXISTS temp.{table}"))
+    for ddl in CREATE_STAGING:
+        conn.execute(text(ddl))
+    if words:
+        conn.execute(
+            text("INSERT INTO temp.staging_words (word, pos, meaning, pronunciations, definitions, verbs) "
+                 "VALUES (:word, :pos, :meaning, :pronunciations, :definitions, :verbs)"),
+            [ingest.word_columns(item) for item in words]
+        )
+    if entries:
+        conn.execute(
+            text("INSERT INTO temp.staging_entries (entry_id, question, question_hash, answer) "
+                 "VALUES (:entry_id, :question, :question_hash, :answer)"),
+            [dict(entry_id=entry_id, question=data.question, question_hash=ingest.question_hash(data.question),
+                  answer=data.answer)
+             for entry_id, data in entries.items()]
+        )
+        choices = [
+            dict(entry_id=entry_id, choice_order=idx, choice_text=ingest.choice_text(choice))
+            for entry_id, data in entries.items()
+            for idx, choice in enumerate(data.choices, start=1)
+        ]
+        if choices:
+            conn.execute(
+                text("INSERT INTO temp.staging_choices (entry_id, choice_order, choice_text) "
+                     "VALUES (:entry_id, :choice_order, :choice_text)"),
+                choices
+            )
+    conn.commit()
+
+
+def swap(db: Session, part: int, topic: str) -> Replacement:
+    """以暫存表的內容替換正式表中的主題，需在載入暫存表的同一條連線上呼叫。"""
+    started = time.perf_counter()
+    version = versioning.bump(db)
+    params = dict(part=part, topic=topic, version=version)
+
+    deleted_words = db.execute(DELETE_WORDS, params).all()
+    for word_id, _ in deleted_words:
+        changes.record_deletion(db, srs.ITEM_TYPES["word"], word_id, part, topic, version)
+    updated_words = db.execute(UPDATE_WORDS, params).scalars().all()
+    added_words = db.execute(INSERT_WORDS, params).scalars().all()
+
+    deleted_entries = db.execute(DELETE_ENTRIES, params).all()
+    for entry_pk, _ in deleted_entries:
+        changes.record_deletion(db, srs.ITEM_TYPES["entry"], entry_pk, part, topic, version)
+    added_entries = db.execute(INSERT_ENTRIES, params).scalars().all()
+    field_updated = set(db.execute(UPDATE_ENTRIES, params).scalars())
+    choice_touched = set()
+    for statement in (DELETE_CHOICES, UPDATE_CHOICES, INSERT_CHOICES):
+        choice_touched.update(db.execute(statement, params).scalars())
+
+    entry_ids = {entry_pk: entry_id for entry_pk, entry_id in db.execute(ENTRY_IDS, params)}
+    added = set(added_entries)
+    # 只有選項改變的既有練習題也標記為本次版本
+    choice_only = [pk for pk in choice_touched - field_updated if entry_ids[pk] not in added]
+    if choice_only:
+        db.execute(update(models.Entry).where(models.Entry.id.in_(choice_only)).values(version=version))
+    updated_entries = sorted(entry_ids[pk] for pk in field_updated.union(choice_only))
+
+    if not (deleted_words or updated_words or added_words or deleted_entries or added_entries or updated_entries):
+        db.rollback()
+        version = 0
+    else:
+        db.commit()
+    return Replacement(
+        version=version,
+        added_words=sorted(added_words),
+        updated_words=sorted(updated_words),
+        deleted_words=sorted(word for _, word in deleted_words),
+        added_entries=sorted(added_entries),
+        updated_entries=updated_entries,
+        deleted_entries=sorted(entry_id for _, entry_id in deleted_entries),
+        swap_ms=(time.perf_counter() - started) * 1000
+    )
+
+
+def replace_topic(
+        engine: Engine, part: int, topic: str, words: List[TopicWordSchema], entries: Dict[str, EntryCreateSchema]
+) -> Replacement:
+    """載入暫存表並換入；暫存表只存在於這條連線，兩個階段必須使用同一條連線。"""
+    with engine.connect() as conn:
+        try:
+            load(conn, words, entries)
+            with Session(bind=conn) as db:
+                return swap(db, part, topic)
+        finally:
+            for table in STAGING_TABLES:
+                conn.execute(text(f"DROP TABLE IF EXISTS temp.{table}"))
+            conn.commit()
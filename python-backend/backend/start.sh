@@ -1,4 +1,4 @@
 #!/bin/bash
 
+python migrate.py
 python app.py
-
@@ -0,0 +1,60 @@
+"""
+全域資料版本 (`data_version` 表) 的讀寫與跨 worker 的變更偵測。
+"""
+import threading
+import time
+from typing import Callable
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+import models
+
+
+def bump(db: Session) -> int:
+    """遞增全域資料版本並回傳新版本，需與資料寫入在同一交易中呼叫。"""
+    return db.execute(text(
+        "INSERT INTO data_version (id, version) VALUES (1, 1) "
+        "ON CONFLICT (id) DO UPDATE SET version = version + 1 "
+        "RETURNING version"
+    )).scalar_one()
+
+
+def read(engine: Engine) -> int:
+    """讀取目前的全域資料版本，尚未有任何寫入時為 0。"""
+    with engine.connect() as conn:
+        version = conn.execute(
+            select(models.DataVersion.version).where(models.DataVersion.id == 1)
+        ).scalar()
+    return version or 0
+
+
+class VersionWatcher:
+    """
+    以節流方式追蹤全域資料版本。
+
+    `current()` 最多每 `check_interval` 秒查詢一次資料庫，其餘時間回傳記憶體中的值，
+    因此其他 worker 寫入後，最多延遲 `check_interval` 秒即會被察覺；
+    本 worker 自己的寫入則透過 `note()` 立即生效。
+    """
+
+    def __init__(self, reader: Callable[[], int], check_interval: float = 1.0):
+        self.reader = reader
+        self.check_interval = check_interval
+        self._version = -1
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> int:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            version = self.reader()
+            with self._lock:
+                self._version = max(self._version, version)
+                self._checked_at = now
+        return self._version
+
+    def note(self, version: int):
+        with self._lock:
+            self._version = max(self._version, version)
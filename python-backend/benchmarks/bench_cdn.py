@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+CDN 快取標頭與清除 hook 的端對端測試。
+
+以 `corpus.py` 產生資料庫，啟動 API (`CDN_MAX_AGE`、`PURGE_URL` 指向 CDN 替身) 與 `cdnproxy.py`，
+所有請求都經過代理：
+
+1. 依權重重複讀取 `/words?part=&topic=`、`/practice/{part}/{topic}`、`/topics`、`/parts`，
+   回報代理的命中率 (也就是沒有到達 Python 的讀取比例)
+2. 每隔 `--write-every` 個讀取經由代理新增一個單字，確認清除 hook 送達後，
+   下一次讀取該主題即可看到新單字 (回報從寫入到讀到新資料的時間)
+
+用法:
+    python benchmarks/bench_cdn.py --requests 5000 --write-every 500
+"""
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import corpus  # noqa: E402
+import harness  # noqa: E402
+
+
+def start_proxy(upstream: str, port: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "cdnproxy.py"),
+         "--upstream", upstream, "--port", str(port)],
+        preexec_fn=os.setsid
+    )
+    if not harness.wait_ready(port, 30, process, path="/__stats"):
+        harness.stop_server(process)
+        raise RuntimeError("CDN 替身未能啟動")
+    return process
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CDN 快取標頭與清除 hook 的端對端測試")
+    parser.add_argument("--parts", type=int, default=5, help="part 數")
+    parser.add_argument("--topics", type=int, default=4, help="每個 part 的 topic 數")
+    parser.add_argument("--words", type=int, default=100, help="每個 topic 的單字數")
+    parser.add_argument("--entries", type=int, default=40, help="每個 topic 的練習題數")
+    parser.add_argument("--requests", type=int, default=5000, help="讀取請求數")
+    parser.add_argument("--write-every", type=int, default=500, help="每隔幾個讀取新增一個單字 (0 表示不寫入)")
+    parser.add_argument("--workers", type=int, default=1, help="API worker 數")
+    parser.add_argument("--seed", type=int, default=42, help="亂數種子")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-cdn-")
+    api_port, proxy_port = harness.free_port(), harness.free_port()
+    rng = random.Random(args.seed)
+    api = proxy = None
+    try:
+        corpus.write_db(os.path.join(workdir, "data.db"),
+                        corpus.iter_corpus(args.parts, args.topics, args.words, args.entries, args.seed))
+        keys = [(p, corpus.topic_name(t)) for p in range(1, args.parts + 1) for t in range(args.topics)]
+        check_interval = 0.2
+        api = harness.start_server(workdir, api_port, ["--workers", str(args.workers)], env={
+            "CDN_MAX_AGE": "3600",
+            "PURGE_URL": f"http://127.0.0.1:{proxy_port}/__purge",
+            "DATA_VERSION_CHECK_INTERVAL": str(check_interval),
+            "WORDS_RATE_LIMIT": "0",
+        })
+        proxy = start_proxy(f"http://127.0.0.1:{api_port}", proxy_port)
+
+        headers = {"Authorization": f"Bearer {harness.BEARER_TOKEN}"}
+        freshness = []
+        with httpx.Client(base_url=f"http://127.0.0.1:{proxy_port}", timeout=60) as client:
+            started = time.perf_counter()
+            for i in range(1, args.requests + 1):
+                part, topic = rng.choice(keys)
+                path = rng.choices(
+                    [f"/words?part={part}&topic={topic}", f"/practice/{part}/{topic}", "/topics", "/parts"],
+                    weights=[50, 35, 10, 5]
+                )[0]
+                client.get(path).raise_for_status()
+
+                if args.write_every and i % args.write_every == 0:
+                    word = f"zz-cdn-{i}"
+                    client.post("/add-words", headers=headers,
+                                json={"words": [corpus.make_word(rng, part, topic, word)]}).raise_for_status()
+                    written = time.perf_counter()
+                    while True:
+                        words = client.get(f"/words?part={part}&topic={topic}").json()["words"]
+                        if any(w["word"] == word for w in words):
+                            freshness.append((time.perf_counter() - written) * 1000)
+                            break
+                        if time.perf_counter() - written > 10:
+                            raise RuntimeError(f"寫入 10 秒後仍讀不到 {word}，清除 hook 可能未生效")
+                        time.sleep(0.02)
+            elapsed = time.perf_counter() - started
+            stats = client.get("/__stats").json()
+    finally:
+        if proxy is not None:
+            harness.stop_server(proxy)
+        if api is not None:
+            harness.stop_server(api)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    cached = stats["hits"] + stats["misses"]
+    print(f"經由代理讀取 {cached} 次 ({elapsed:.1f}s)：命中 {stats['hits']}，未命中 {stats['misses']}，"
+          f"命中率 {stats['hits'] / cached * 100 if cached else 0:.1f}%")
+    print(f"清除 {stats['purges']} 次，共移除 {stats['purged']} 筆快取")
+    if freshness:
+        print(f"寫入後讀到新資料：平均 {sum(freshness) / len(freshness):.0f} ms，"
+              f"最久 {max(freshness):.0f} ms (清除 hook 延遲 DATA_VERSION_CHECK_INTERVAL={check_interval}s)")
+
+
+if __name__ == "__main__":
+    main()
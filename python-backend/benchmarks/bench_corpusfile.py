@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+共用語料檔 (`CORPUS_FILE`) 與各 worker 自有唯讀模型的記憶體比較。
+
+對每個資料量以 `corpus.py` 產生資料庫，分別以「唯讀模型」與「語料檔」兩種模式啟動多 worker 的 API，
+讓每個 worker 都讀過所有 `/words` 與 `/practice` 後，讀取各 worker 的 `/proc/<pid>/status`：
+
+- RssAnon：worker 私有的記憶體 (Python 物件)
+- RssFile：對應檔案的頁面 (語料檔的 mmap 由 page cache 提供，多個 worker 共用同一份)
+
+用法:
+    python benchmarks/bench_corpusfile.py --workers 2 --words 100 400 1600
+"""
+import argparse
+import http.client
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import corpus  # noqa: E402
+import harness  # noqa: E402
+
+
+def worker_pids(pid: int):
+    """uvicorn 以 multiprocessing spawn 啟動的 worker (排除 resource tracker 等其他子進程)。"""
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        children = [int(child) for child in f.read().split()]
+    pids = []
+    for child in children:
+        with open(f"/proc/{child}/cmdline", "rb") as f:
+            if b"spawn_main" in f.read():
+                pids.append(child)
+    return pids
+
+
+def memory_mib(pid: int):
+    values = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("RssAnon", "RssFile"):
+                values[key] = int(value.split()[0]) / 1024
+    return values["RssAnon"], values["RssFile"]
+
+
+def touch_all(port: int, paths, rounds: int):
+    """以短連線重複請求，讓連線分散到每個 worker。"""
+    for _ in range(rounds):
+        for path in paths:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            conn.request("GET", path, headers={"Connection": "close"})
+            response = conn.getresponse()
+            response.read()
+            conn.close()
+            if response.status != 200:
+                raise RuntimeError(f"{path} 回應 {response.status}")
+
+
+def measure(workdir: str, workers: int, paths, rounds: int, corpus_file: bool):
+    port = harness.free_port()
+    env = {"CORPUS_FILE": os.path.join(workdir, "corpus.bin") if corpus_file else ""}
+    process = harness.start_server(workdir, port, ["--workers", str(workers)], env=env)
+    try:
+        touch_all(port, paths, rounds)
+        time.sleep(0.5)
+        samples = [memory_mib(pid) for pid in worker_pids(process.pid)]
+    finally:
+        harness.stop_server(process)
+    anon = sum(s[0] for s in samples) / len(samples)
+    file = sum(s[1] for s in samples) / len(samples)
+    return anon, file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="共用語料檔與唯讀模型的記憶體比較")
+    parser.add_argument("--parts", type=int, default=5, help="part 數")
+    parser.add_argument("--topics", type=int, default=4, help="每個 part 的 topic 數")
+    parser.add_argument("--words", type=int, nargs="+", default=[100, 400, 1600], help="每個 topic 的單字數")
+    parser.add_argument("--entries", type=int, default=40, help="每個 topic 的練習題數")
+    parser.add_argument("--workers", type=int, default=2, help="API worker 數")
+    parser.add_argument("--rounds", type=int, default=None, help="每個端點的請求次數 (預設 workers * 3)")
+    args = parser.parse_args()
+
+    rounds = args.rounds or args.workers * 3
+    print(f"{'單字數':>8} {'資料庫 MiB':>10} | {'唯讀模型 RssAnon':>16} {'RssFile':>8} | "
+          f"{'語料檔 RssAnon':>14} {'RssFile':>8} {'檔案 MiB':>8}")
+    for words in args.words:
+        workdir = tempfile.mkdtemp(prefix="bench-corpusfile-")
+        try:
+            db_path = os.path.join(workdir, "data.db")
+            word_count, _ = corpus.write_db(
+                db_path, corpus.iter_corpus(args.parts, args.topics, words, args.entries)
+            )
+            keys = [(p, corpus.topic_name(t)) for p in range(1, args.parts + 1) for t in range(args.topics)]
+            paths = [f"/words?part={p}&topic={t}" for p, t in keys] + [f"/practice/{p}/{t}" for p, t in keys]
+
+            model_anon, model_file = measure(workdir, args.workers, paths, rounds, corpus_file=False)
+            file_anon, file_file = measure(workdir, args.workers, paths, rounds, corpus_file=True)
+            file_size = os.path.getsize(os.path.join(workdir, "corpus.bin")) / 1024 / 1024
+            print(f"{word_count:>8} {os.path.getsize(db_path) / 1024 / 1024:>10.1f} | "
+                  f"{model_anon:>16.1f} {model_file:>8.1f} | {file_anon:>14.1f} {file_file:>8.1f} {file_size:>8.1f}")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    print("\n(各 worker 的平均值，單位 MiB)")
+
+
+if __name__ == "__main__":
+    main()
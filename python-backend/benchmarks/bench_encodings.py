@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+讀取端點的 JSON / MessagePack / CBOR 比較 (`backend/negotiation.py`)。
+
+以 `corpus.py` 產生暫存資料庫，取單字最多 (JSON 本文最大) 的主題，
+分別對 `/words?part=&topic=` 與 `/practice/{part}/{topic}` 的本文量測：
+
+- 大小：原始位元組數與 gzip 後的位元組數
+- 編碼：伺服器由 JSON 本文轉換的時間 (結果放入讀取快取，同一資料版本只做一次)
+- 解碼：用戶端將本文解析為物件的時間
+
+MessagePack 與 CBOR 分別需要安裝 `msgpack` 與 `cbor2`，未安裝的編碼會略過。
+
+用法:
+    python benchmarks/bench_encodings.py --words 2000 --entries 200 --repeat 20
+"""
+import argparse
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "backend"))
+
+import corpus  # noqa: E402
+import database  # noqa: E402
+import negotiation  # noqa: E402
+import readmodel  # noqa: E402
+from app import entry_to_schema, json_model_body, word_to_schema  # noqa: E402
+from schemas import PartResponse, PracticeResponse  # noqa: E402
+
+DECODERS = {
+    negotiation.JSON: json.loads,
+    negotiation.MSGPACK: lambda body: negotiation.msgpack.unpackb(body),
+    negotiation.CBOR: lambda body: negotiation.cbor2.loads(body),
+}
+
+
+def best_ms(func, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def report(name: str, json_body: bytes, repeat: int):
+    print(f"\n{name}")
+    print(f"{'編碼':<22}{'bytes':>10}{'gzip':>10}{'編碼 ms':>10}{'解碼 ms':>10}")
+    expected = json.loads(json_body)
+    for media_type in negotiation.available():
+        encode_ms, body = best_ms(lambda: negotiation.transcode(json_body, media_type), repeat)
+        decode_ms, decoded = best_ms(lambda: DECODERS[media_type](body), repeat)
+        assert decoded == expected, f"{media_type} 解碼後的內容與 JSON 不同"
+        print(f"{media_type:<22}{len(body):>10,}{len(gzip.compress(body)):>10,}{encode_ms:>10.2f}{decode_ms:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON / MessagePack / CBOR 回應比較")
+    parser.add_argument("--parts", type=int, default=2, help="part 數")
+    parser.add_argument("--topics", type=int, default=2, help="每個 part 的 topic 數")
+    parser.add_argument("--words", type=int, default=2000, help="每個 topic 的單字數")
+    parser.add_argument("--entries", type=int, default=200, help="每個 topic 的練習題數")
+    parser.add_argument("--repeat", type=int, default=20, help="每種量測的重複次數 (取最佳值)")
+    args = parser.parse_args()
+
+    missing = [m for m in (negotiation.MSGPACK, negotiation.CBOR) if m not in negotiation.available()]
+    if missing:
+        print(f"未安裝對應套件，略過: {', '.join(missing)}")
+
+    workdir = tempfile.mkdtemp(prefix="bench-encodings-")
+    try:
+        db_path = os.path.join(workdir, "data.db")
+        corpus.write_db(db_path, corpus.iter_corpus(args.parts, args.topics, args.words, args.entries))
+        engine = database.init_engine(f"sqlite:///{db_path}")
+        model = readmodel.load(engine)
+        engine.dispose()
+
+        words_bodies = {
+            key: json_model_body(PartResponse(words=[word_to_schema(w) for w in words]))
+            for key, words in model.words_by_topic.items()
+        }
+        part, topic = max(words_bodies, key=lambda key: len(words_bodies[key]))
+        practice_body = json_model_body(
+            PracticeResponse(entries=[entry_to_schema(e) for e in model.entries(part, topic)]), exclude_none=True
+        )
+
+        report(f"/words?part={part}&topic={topic} ({len(model.words(part, topic))} 個單字)",
+               words_bodies[(part, topic)], args.repeat)
+        report(f"/practice/{part}/{topic} ({len(model.entries(part, topic))} 題)", practice_body, args.repeat)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+管理端大量匯入：同步寫入與佇列模式 (`INGEST_QUEUE=1`) 的比較。
+
+以 `corpus.py` 產生資料庫，依序以兩種模式啟動 API，`--clients` 個執行緒同時以 `/add-words`
+送出共 `--requests` 個請求 (每個請求 `--words-per-request` 個新單字，模擬爬蟲或 `InsertWordsAPI.py`)，
+同時另一個執行緒持續讀取 `/words?part=&topic=`。回報：
+
+- 匯入耗時、每秒寫入的單字數與寫入請求的延遲百分位數
+- 提交次數 (全域資料版本的增加量；每次遞增對應一個寫入交易，也就是一次 WAL 提交)
+- 匯入期間讀取請求的延遲百分位數
+
+伺服器忙碌 (503) 的寫入請求依 `Retry-After` 等待後重送，並計入重試次數。
+
+用法:
+    python benchmarks/bench_ingest.py --requests 200 --words-per-request 20 --clients 8 --workers 2
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import corpus  # noqa: E402
+import harness  # noqa: E402
+
+MODES = {
+    "sync": {},
+    "queue": {"INGEST_QUEUE": "1"},
+}
+
+
+def make_requests(count: int, words_per_request: int, keys: List[Tuple[int, str]], seed: int) -> List[dict]:
+    rng = random.Random(seed)
+    requests = []
+    for i in range(count):
+        part, topic = keys[i % len(keys)]
+        requests.append({"words": [
+            corpus.make_word(rng, part, topic, f"zz-ingest-{i:05d}-{j:03d}") for j in range(words_per_request)
+        ]})
+    return requests
+
+
+def data_version(db_path: str) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else 0
+
+
+def run_mode(mode: str, args, workdir: str, keys: List[Tuple[int, str]], requests: List[dict]) -> dict:
+    db_path = os.path.join(workdir, "data.db")
+    # 前一個模式留下的 WAL 會套用到新複製的資料庫上
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    shutil.copy(os.path.join(workdir, "base.db"), db_path)
+    version_before = data_version(db_path)
+    port = harness.free_port()
+    process = harness.start_server(workdir, port, ["--workers", str(args.workers), "--migrate"],
+                                   env=dict(MODES[mode], WORDS_RATE_LIMIT="0"))
+    base_url = f"http://127.0.0.1:{port}"
+    headers = {"Authorization": f"Bearer {harness.BEARER_TOKEN}"}
+    write_latencies: List[float] = []
+    read_latencies: List[float] = []
+    retries = [0]
+    errors = [0]
+    stop = threading.Event()
+
+    def write(body: dict):
+        with httpx.Client(base_url=base_url, timeout=120) as client:
+            while True:
+                started = time.perf_counter()
+                response = client.post("/add-words", headers=headers, json=body)
+                if response.status_code == 503:
+                    retries[0] += 1
+                    time.sleep(float(response.headers.get("retry-after", 1)))
+                    continue
+                if response.status_code != 200:
+                    errors[0] += 1
+                write_latencies.append((time.perf_counter() - started) * 1000)
+                return
+
+    def read():
+        rng = random.Random(args.seed)
+        with httpx.Client(base_url=base_url, timeout=60) as client:
+            while not stop.is_set():
+                part, topic = rng.choice(keys)
+                started = time.perf_counter()
+                client.get(f"/words?part={part}&topic={topic}")
+                read_latencies.append((time.perf_counter() - started) * 1000)
+
+    try:
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.clients) as pool:
+            list(pool.map(write, requests))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        reader.join()
+    finally:
+        harness.stop_server(process)
+    version_after = data_version(db_path)
+
+    words = sum(len(body["words"]) for body in requests)
+    return {
+        "elapsed": elapsed,
+        "words_per_sec": words / elapsed,
+        "commits": version_after - version_before,
+        "retries": retries[0],
+        "errors": errors[0],
+        "write_p50": harness.percentile(write_latencies, 50),
+        "write_p99": harness.percentile(write_latencies, 99),
+        "read_p50": harness.percentile(read_latencies, 50),
+        "read_p99": harness.percentile(read_latencies, 99),
+        "reads": len(read_latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="管理端大量匯入：同步寫入與佇列模式的比較")
+    parser.add_argument("--parts", type=int, default=5, help="part 數")
+    parser.add_argument("--topics", type=int, default=4, help="每個 part 的 topic 數")
+    parser.add_argument("--words", type=int, default=100, help="每個 topic 的既有單字數")
+    parser.add_argument("--entries", type=int, default=20, help="每個 topic 的練習題數")
+    parser.add_argument("--requests", type=int, default=200, help="寫入請求數")
+    parser.add_argument("--words-per-request", type=int, default=20, help="每個請求新增的單字數")
+    parser.add_argument("--clients", type=int, default=8, help="同時送出寫入請求的執行緒數")
+    parser.add_argument("--workers", type=int, default=1, help="API worker 數")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES), help="比較的模式")
+    parser.add_argument("--seed", type=int, default=42, help="亂數種子")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-ingest-")
+    try:
+        corpus.write_db(os.path.join(workdir, "base.db"),
+                        corpus.iter_corpus(args.parts, args.topics, args.words, args.entries, args.seed))
+        keys = [(p, corpus.topic_name(t)) for p in range(1, args.parts + 1) for t in range(args.topics)]
+        requests = make_requests(args.requests, args.words_per_request, keys, args.seed)
+        results = {mode: run_mode(mode, args, workdir, keys, requests) for mode in args.modes}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{args.requests} 個請求 × {args.words_per_request} 個單字，{args.clients} 個寫入端，{args.workers} 個 worker")
+    print(f"{'模式':<8} {'耗時':>8} {'單字/秒':>10} {'提交':>6} {'重試':>6} {'錯誤':>6} "
+          f"{'寫入 p50':>10} {'寫入 p99':>10} {'讀取 p50':>10} {'讀取 p99':>10}")
+    for mode, r in results.items():
+        print(f"{mode:<8} {r['elapsed']:>7.2f}s {r['words_per_sec']:>10.0f} {r['commits']:>6} {r['retries']:>6} "
+              f"{r['errors']:>6} {r['write_p50']:>8.1f}ms {r['write_p99']:>8.1f}ms "
+              f"{r['read_p50']:>8.1f}ms {r['read_p99']:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+記憶體內唯讀模型 (`backend/readmodel.py`) 與原本 ORM 查詢路徑的比較。
+
+以 `corpus.py` 產生暫存資料庫，在同一進程中不經 HTTP、不經回應快取，
+分別以「ORM 查詢 + 轉換」與「唯讀模型查表 + 轉換」產生 `/words`、`/practice`、`/topics`、`/parts` 的回應，
+回報每秒可產生的回應數，以及唯讀模型的建立時間與記憶體用量 (tracemalloc 與 RSS 增量)。
+
+用法:
+    python benchmarks/bench_readmodel.py --parts 10 --topics 10 --words 500 --entries 50 --seconds 3
+"""
+import argparse
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "backend"))
+
+import corpus  # noqa: E402
+import database  # noqa: E402
+import grading  # noqa: E402
+import models  # noqa: E402
+import readmodel  # noqa: E402
+from app import word_to_schema, entry_to_schema  # noqa: E402
+from schemas import ChoiceSchema, PartResponse, PartsResponse, PracticeEntrySchema, PracticeResponse, \
+    TopicsResponse  # noqa: E402
+
+
+def rss_mib() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1024 / 1024
+
+
+# 以下為改用唯讀模型之前 app.py 中各端點的查詢方式
+
+def orm_words(db, part, topic):
+    words = db.query(models.Word).filter(models.Word.part == part, models.Word.topic == topic).all()
+    return PartResponse(words=[word_to_schema(w) for w in words])
+
+
+def orm_practice(db, part, topic):
+    entries = db.query(models.Entry).filter(models.Entry.part == part, models.Entry.topic == topic).all()
+    practice_entries = []
+    for entry in entries:
+        choices = db.query(models.Choice).filter(
+            models.Choice.entry_id == entry.id
+        ).order_by(models.Choice.choice_order).all()
+        practice_entries.append(PracticeEntrySchema(
+            entry_id=entry.entry_id,
+            question=entry.question,
+            question_hash=entry.question_hash,
+            answer=grading.display_answer(entry.answer),
+            choices=[ChoiceSchema(choice_order=c.choice_order, choice_text=c.choice_text) for c in choices]
+        ))
+    return PracticeResponse(entries=practice_entries)
+
+
+def orm_topics(db, part, topic):
+    topics = [t[0] for t in db.query(models.Word.topic).distinct().filter(models.Word.part == part).all()]
+    return TopicsResponse(count=len(topics), topics=topics)
+
+
+def orm_parts(db, part, topic):
+    parts = [p[0] for p in db.query(models.Word.part).distinct().filter(models.Word.topic == topic).all()]
+    return PartsResponse(count=len(parts), parts=parts)
+
+
+def model_words(model, part, topic):
+    return PartResponse(words=[word_to_schema(w) for w in model.words(part, topic)])
+
+
+def model_practice(model, part, topic):
+    return PracticeResponse(entries=[entry_to_schema(e) for e in model.entries(part, topic)])
+
+
+def model_topics(model, part, topic):
+    topics = list(model.topics(part))
+    return TopicsResponse(count=len(topics), topics=topics)
+
+
+def model_parts(model, part, topic):
+    parts = list(model.parts(topic))
+    return PartsResponse(count=len(parts), parts=parts)
+
+
+def measure(func, source, keys, seconds, seed):
+    rng = random.Random(seed)
+    count = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(10):
+            part, topic = rng.choice(keys)
+            func(source, part, topic)
+            count += 1
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="唯讀模型與 ORM 路徑比較")
+    parser.add_argument("--parts", type=int, default=10, help="part 數")
+    parser.add_argument("--topics", type=int, default=10, help="每個 part 的 topic 數")
+    parser.add_argument("--words", type=int, default=500, help="每個 topic 的單字數")
+    parser.add_argument("--entries", type=int, default=50, help="每個 topic 的練習題數")
+    parser.add_argument("--seconds", type=float, default=3.0, help="每個端點的量測秒數")
+    parser.add_argument("--seed", type=int, default=42, help="亂數種子")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-readmodel-")
+    try:
+        db_path = os.path.join(workdir, "data.db")
+        word_count, entry_count = corpus.write_db(
+            db_path, corpus.iter_corpus(args.parts, args.topics, args.words, args.entries, args.seed)
+        )
+        engine = database.init_engine(f"sqlite:///{db_path}")
+        print(f"資料庫: {word_count} 個單字、{entry_count} 題練習題 "
+              f"({os.path.getsize(db_path) / 1024 / 1024:.1f} MiB)")
+
+        rss_before = rss_mib()
+        tracemalloc.start()
+        started = time.perf_counter()
+        model = readmodel.load(engine)
+        build_ms = (time.perf_counter() - started) * 1000
+        traced_mib = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+        tracemalloc.stop()
+        rss_after = rss_mib()
+        print(f"唯讀模型: 建立 {build_ms:.0f}ms，tracemalloc {traced_mib:.1f} MiB，"
+              f"RSS 增加 {rss_after - rss_before:.1f} MiB "
+              f"(約 {traced_mib * 1024 * 1024 / max(1, word_count + entry_count):.0f} bytes / 筆)")
+
+        keys = sorted(model.entries_by_topic)
+        db = database.SessionLocal()
+        print(f"\n{'端點':<12}{'ORM req/s':>12}{'唯讀模型 req/s':>16}{'倍數':>8}")
+        for name, orm_func, model_func in (
+                ("words", orm_words, model_words),
+                ("practice", orm_practice, model_practice),
+                ("topics", orm_topics, model_topics),
+                ("parts", orm_parts, model_parts),
+        ):
+            orm_rps = measure(orm_func, db, keys, args.seconds, args.seed)
+            db.expunge_all()
+            model_rps = measure(model_func, model, keys, args.seconds, args.seed)
+            print(f"{name:<12}{orm_rps:>12.1f}{model_rps:>16.1f}{model_rps / orm_rps:>7.1f}x")
+        db.close()
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+最大的 `/words` 回應 (未篩選，回傳所有單字) 的序列化時間。
+
+以 `corpus.py` 產生暫存資料庫並載入唯讀模型，建立 `PartResponse` 後比較：
+
+- FastAPI `response_model` 路徑：回傳模型物件時，FastAPI 先以 `response_model` 再驗證一次，
+  序列化成 dict 後由 `JSONResponse` 以 `json.dumps` 編碼 (改版前每次請求、包含快取命中都會經過)
+- `model_dump_json`：目前讀取端點使用的 `json_model_response()`，由 Pydantic 的序列化器直接輸出位元組
+- `orjson`：`orjson.dumps(model_dump())` (有安裝 orjson 時才量測)
+
+用法:
+    python benchmarks/bench_serialization.py --parts 10 --topics 10 --words 200 --repeat 5
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "backend"))
+
+import corpus  # noqa: E402
+import database  # noqa: E402
+import readmodel  # noqa: E402
+from app import json_model_response, word_to_schema  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_model_field  # noqa: E402
+from schemas import PartResponse  # noqa: E402
+from starlette.responses import JSONResponse  # noqa: E402
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def best_ms(func, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def fastapi_path(field, response: PartResponse) -> bytes:
+    content = asyncio.run(serialize_response(field=field, response_content=response))
+    return JSONResponse(content).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="最大 /words 回應的序列化時間")
+    parser.add_argument("--parts", type=int, default=10, help="part 數")
+    parser.add_argument("--topics", type=int, default=10, help="每個 part 的 topic 數")
+    parser.add_argument("--words", type=int, default=200, help="每個 topic 的單字數")
+    parser.add_argument("--repeat", type=int, default=5, help="每種方式的重複次數 (取最佳值)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-serialization-")
+    try:
+        db_path = os.path.join(workdir, "data.db")
+        corpus.write_db(db_path, corpus.iter_corpus(args.parts, args.topics, args.words, 0))
+        engine = database.init_engine(f"sqlite:///{db_path}")
+        words = readmodel.load(engine).words()
+        engine.dispose()
+
+        build_ms, response = best_ms(lambda: PartResponse(words=[word_to_schema(w) for w in words]), args.repeat)
+        field = create_model_field(name="response", type_=PartResponse, mode="serialization")
+        baseline_ms, expected = best_ms(lambda: fastapi_path(field, response), args.repeat)
+        print(f"/words: {len(words)} 個單字，回應 {len(expected) / 1024 / 1024:.1f} MiB，"
+              f"建立 PartResponse {build_ms:.1f}ms (各方式共同的成本，不計入下表)")
+
+        results = [("FastAPI response_model", baseline_ms)]
+        direct_ms, body = best_ms(lambda: json_model_response(response).body, args.repeat)
+        assert body == expected, "model_dump_json 的輸出與 FastAPI 不同"
+        results.append(("model_dump_json", direct_ms))
+        if orjson is not None:
+            orjson_ms, body = best_ms(lambda: orjson.dumps(response.model_dump()), args.repeat)
+            assert body == expected, "orjson 的輸出與 FastAPI 不同"
+            results.append(("orjson", orjson_ms))
+
+        print(f"\n{'方式':<24}{'ms':>10}{'倍數':>8}")
+        for name, ms in results:
+            print(f"{name:<24}{ms:>10.1f}{baseline_ms / ms:>7.1f}x")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+間隔重複排程的合成負載基準測試。
+
+建立一個暫存 SQLite 資料庫，灌入 `learners x reviewed` 筆 `review_states`
+(預設 10k 學習者，每人已複習 5k 題庫中的 500 題)，
+接著量測「取得前 N 筆到期項目」與「批次提交作答結果」的延遲。
+
+用法:
+    python benchmarks/bench_srs.py --learners 10000 --items 5000 --reviewed 500
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+import models  # noqa: E402
+import srs  # noqa: E402
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(name, samples_ms):
+    print(
+        f"{name:<24} n={len(samples_ms):<6} "
+        f"mean={statistics.fmean(samples_ms):7.3f}ms "
+        f"p50={percentile(samples_ms, 50):7.3f}ms "
+        f"p95={percentile(samples_ms, 95):7.3f}ms "
+        f"p99={percentile(samples_ms, 99):7.3f}ms"
+    )
+
+
+def populate(db_path, learners, items, reviewed, now, seed):
+    """以原生 sqlite3 executemany 快速灌入合成狀態。"""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    sql = (
+        "INSERT INTO review_states "
+        "(learner_id, item_type, item_id, due, interval, ease, reps, lapses, last_review) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+    started = time.perf_counter()
+    for learner in range(learners):
+        learner_id = f"learner-{learner:06d}"
+        rows = []
+        for item_id in rng.sample(range(1, items + 1), reviewed):
+            interval = rng.choice((0, 1, 6, 15, 40, 100))
+            # 約 1/4 的項目已到期
+            due = now + rng.randint(-interval * srs.DAY_SECONDS - 3600, 3 * interval * srs.DAY_SECONDS + 3600)
+            rows.append((learner_id, 0, item_id, due, interval, 2500, 3, 0, now - 86400))
+        conn.executemany(sql, rows)
+        if learner % 500 == 499:
+            conn.commit()
+    conn.commit()
+    conn.close()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="間隔重複排程合成負載基準測試")
+    parser.add_argument("--learners", type=int, default=10000, help="學習者數量")
+    parser.add_argument("--items", type=int, default=5000, help="題庫項目數量")
+    parser.add_argument("--reviewed", type=int, default=500, help="每位學習者已有狀態的項目數")
+    parser.add_argument("--queries", type=int, default=2000, help="到期查詢次數")
+    parser.add_argument("--batches", type=int, default=500, help="批次提交次數")
+    parser.add_argument("--batch-size", type=int, default=20, help="每次提交的作答數")
+    parser.add_argument("--limit", type=int, default=20, help="每次取得的到期項目數")
+    parser.add_argument("--seed", type=int, default=42, help="亂數種子")
+    parser.add_argument("--keep", type=str, default=None, help="保留資料庫於指定路徑")
+    args = parser.parse_args()
+
+    db_path = args.keep or os.path.join(tempfile.mkdtemp(prefix="bench-srs-"), "srs.db")
+    engine = create_engine(f"sqlite:///{db_path}")
+    models.ReviewState.__table__.create(bind=engine, checkfirst=True)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    now = int(time.time())
+    rows = args.learners * args.reviewed
+    elapsed = populate(db_path, args.learners, args.items, args.reviewed, now, args.seed)
+    size_mb = os.path.getsize(db_path) / 2 ** 20
+    print(f"資料庫: {db_path}")
+    print(f"已灌入 {rows:,} 筆狀態，耗時 {elapsed:.1f}s，檔案大小 {size_mb:.1f} MiB "
+          f"({size_mb * 2 ** 20 / rows:.1f} bytes/row)")
+
+    with engine.connect() as conn:
+        plan = conn.exec_driver_sql(
+            "EXPLAIN QUERY PLAN SELECT * FROM review_states "
+            "WHERE learner_id = ? AND due <= ? ORDER BY due LIMIT ?",
+            ("learner-000000", now, args.limit)
+        ).fetchall()
+    print("查詢計畫:", " | ".join(row[-1] for row in plan))
+
+    rng = random.Random(args.seed + 1)
+    due_ms = []
+    with Session() as db:
+        for _ in range(args.queries):
+            learner_id = f"learner-{rng.randrange(args.learners):06d}"
+            started = time.perf_counter()
+            srs.fetch_due(db, learner_id, now, args.limit)
+            due_ms.append((time.perf_counter() - started) * 1000)
+
+    grade_ms = []
+    with Session() as db:
+        for _ in range(args.batches):
+            learner_id = f"learner-{rng.randrange(args.learners):06d}"
+            results = [
+                (0, rng.randint(1, args.items), rng.randint(0, 5), now)
+                for _ in range(args.batch_size)
+            ]
+            started = time.perf_counter()
+            srs.apply_grades(db, learner_id, results)
+            db.commit()
+            grade_ms.append((time.perf_counter() - started) * 1000)
+
+    report(f"fetch_due(limit={args.limit})", due_ms)
+    report(f"apply_grades(n={args.batch_size})", grade_ms)
+
+    if not args.keep:
+        engine.dispose()
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+後端啟動時間基準測試。
+
+1. 以 `python -X importtime -c "import app"` 量測匯入 `backend/app.py` 的時間，列出最耗時的模組
+2. 在暫存目錄中啟動 `backend/app.py`，量測從進程啟動到第一次 `/heartbeat` 回應 200 的時間
+
+任一項超過門檻時以非零狀態碼結束，可放在 CI 中作為啟動時間的預算檢查。
+
+用法:
+    python benchmarks/bench_startup.py --runs 5 --max-import-ms 1500 --max-startup-ms 3000
+"""
+import argparse
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import harness  # noqa: E402
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def measure_import(workdir):
+    """回傳 (匯入 app 的累計毫秒數, [(模組, 累計毫秒數), ...] 依耗時排序)。"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=workdir, env=dict(os.environ, PYTHONPATH=harness.BACKEND_DIR),
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True
+    )
+    total_ms = 0.0
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative_ms = int(match.group(2)) / 1000
+        depth = (len(match.group(3)) - 1) // 2
+        if match.group(4) == "app" and depth == 0:
+            total_ms = cumulative_ms
+        elif depth <= 1:
+            modules.append((match.group(4), cumulative_ms))
+    modules.sort(key=lambda m: m[1], reverse=True)
+    return total_ms, modules
+
+
+def measure_startup(workdir, timeout):
+    """回傳從進程啟動到第一次 /heartbeat 回應 200 的毫秒數。"""
+    port = harness.free_port()
+    env = dict(os.environ, HOST="127.0.0.1", PORT=str(port), BEARER_TOKEN=harness.BEARER_TOKEN)
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(harness.BACKEND_DIR, "app.py"), "--log-file", os.path.join(workdir, "api.log")],
+        cwd=workdir, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        preexec_fn=os.setsid
+    )
+    try:
+        if not harness.wait_ready(port, timeout, process):
+            raise RuntimeError(f"伺服器未能在 {timeout} 秒內回應 /heartbeat")
+        return (time.perf_counter() - started) * 1000
+    finally:
+        harness.stop_server(process)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="後端啟動時間基準測試")
+    parser.add_argument("--runs", type=int, default=5, help="量測次數，取中位數")
+    parser.add_argument("--top", type=int, default=10, help="列出最耗時的模組數")
+    parser.add_argument("--max-import-ms", type=float, default=1500.0, help="匯入 app 的時間上限 (毫秒)")
+    parser.add_argument("--max-startup-ms", type=float, default=3000.0, help="冷啟動到 /heartbeat 的時間上限 (毫秒)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="單次啟動的逾時秒數")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-startup-")
+    try:
+        shutil.copy(os.path.join(harness.BACKEND_DIR, "data.db"), os.path.join(workdir, "data.db"))
+        harness.migrate(workdir)
+
+        import_runs = [measure_import(workdir) for _ in range(args.runs)]
+        import_ms = statistics.median(run[0] for run in import_runs)
+        print(f"匯入 app: 中位數 {import_ms:.1f}ms (上限 {args.max_import_ms:.0f}ms)")
+        for name, cumulative_ms in import_runs[-1][1][:args.top]:
+            print(f"    {cumulative_ms:8.1f}ms  {name}")
+
+        startup_ms = statistics.median(measure_startup(workdir, args.timeout) for _ in range(args.runs))
+        print(f"冷啟動到 /heartbeat: 中位數 {startup_ms:.1f}ms (上限 {args.max_startup_ms:.0f}ms)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    failed = False
+    if import_ms > args.max_import_ms:
+        print(f"失敗: 匯入時間 {import_ms:.1f}ms 超過上限 {args.max_import_ms:.0f}ms")
+        failed = True
+    if startup_ms > args.max_startup_ms:
+        print(f"失敗: 冷啟動時間 {startup_ms:.1f}ms 超過上限 {args.max_startup_ms:.0f}ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+多 worker 讀取擴展性基準測試。
+
+以 `backend/data.db` 的練習題加上 `manual_insert_word/training` 的單字建立暫存資料庫，
+依序以 1, 2, 4, 8 個 worker 啟動 `backend/app.py`，
+用多個客戶端進程對讀取端點施壓，回報各設定的 requests/sec 與相對單 worker 的加速比。
+
+用法:
+    python benchmarks/bench_workers.py --workers 1 2 4 8 --clients 32 --duration 10
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import harness  # noqa: E402
+
+TRAINING_DIR = os.path.join(harness.BASE_DIR, "manual_insert_word", "training")
+
+
+def seed_database(workdir):
+    """複製 data.db 並直接寫入訓練資料中的單字，回傳 (part, topic) 清單。"""
+    db_path = os.path.join(workdir, "data.db")
+    shutil.copy(os.path.join(harness.BACKEND_DIR, "data.db"), db_path)
+    conn = sqlite3.connect(db_path)
+    rows = []
+    for part in sorted(os.listdir(TRAINING_DIR)):
+        part_dir = os.path.join(TRAINING_DIR, part)
+        for file_name in sorted(os.listdir(part_dir)):
+            topic = os.path.splitext(file_name)[0]
+            with open(os.path.join(part_dir, file_name), encoding="utf-8") as f:
+                for item in json.load(f):
+                    rows.append((
+                        int(part), topic, item["word"], item.get("pos"), item.get("meaning"),
+                        json.dumps([{"pos": item.get("pos"), "lang": "us", "pron": item["word"]}]),
+                        json.dumps([{"pos": item.get("pos"), "definition": item.get("meaning"), "examples": []}]),
+                        "[]"
+                    ))
+    conn.executemany(
+        "INSERT OR IGNORE INTO words (part, topic, word, pos, meaning, pronunciations, definitions, verbs) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    conn.commit()
+    word_topics = conn.execute("SELECT DISTINCT part, topic FROM words").fetchall()
+    entry_topics = conn.execute("SELECT DISTINCT part, topic FROM entries").fetchall()
+    conn.close()
+    return word_topics, entry_topics
+
+
+def client_loop(args):
+    port, paths, duration, offset = args
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    count = errors = 0
+    index = offset
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            if response.status == 200:
+                count += 1
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.close()
+    return count, errors
+
+
+def run_load(port, paths, clients, duration):
+    with multiprocessing.Pool(clients) as pool:
+        results = pool.map(client_loop, [(port, paths, duration, i * 7) for i in range(clients)])
+    count = sum(r[0] for r in results)
+    errors = sum(r[1] for r in results)
+    return count / duration, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多 worker 讀取擴展性基準測試")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="要測試的 worker 數")
+    parser.add_argument("--clients", type=int, default=32, help="客戶端進程數")
+    parser.add_argument("--duration", type=float, default=10.0, help="每個設定的施壓秒數")
+    parser.add_argument("--warmup", type=float, default=2.0, help="施壓前的暖機秒數")
+    parser.add_argument("--output", type=str, default=None, help="將結果寫入 JSON 檔")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-workers-")
+    word_topics, entry_topics = seed_database(workdir)
+    paths = ["/topics", "/parts"]
+    paths += [f"/words?part={part}&topic={topic}" for part, topic in word_topics]
+    paths += [f"/practice/{part}/{topic}" for part, topic in entry_topics]
+    print(f"資料庫: {workdir}/data.db，端點組合 {len(paths)} 個，CPU 核心數 {os.cpu_count()}")
+
+    results = []
+    baseline = None
+    try:
+        for workers in args.workers:
+            port = harness.free_port()
+            process = harness.start_server(workdir, port, ["--workers", str(workers), "--migrate"])
+            try:
+                run_load(port, paths, min(args.clients, 8), args.warmup)
+                rps, errors = run_load(port, paths, args.clients, args.duration)
+            finally:
+                harness.stop_server(process)
+            baseline = baseline or rps
+            speedup = rps / baseline
+            results.append(dict(workers=workers, rps=round(rps, 1), errors=errors,
+                                speedup=round(speedup, 2), efficiency=round(speedup / workers, 2)))
+            print(f"workers={workers:<3} {rps:10.1f} req/s  加速比 {speedup:5.2f}x  "
+                  f"效率 {speedup / workers:6.1%}  錯誤 {errors}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(dict(cpu_count=os.cpu_count(), clients=args.clients, results=results), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
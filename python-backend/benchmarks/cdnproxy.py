@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+本機測試用的 CDN 替身：簡易的快取反向代理，支援 Surrogate-Key 清除。
+
+- GET 回應依 `Surrogate-Control` 的 max-age (沒有時依 `Cache-Control` 的 s-maxage / max-age) 保存，
+  `no-store`、`no-cache`、`private` 不保存；快取鍵為路徑 + query + `Accept`
+- 回應加上 `X-Cache: HIT / MISS / BYPASS`，並移除 `Surrogate-Key`、`Surrogate-Control` (與 CDN 相同)
+- `POST /__purge`：清除 `Surrogate-Key` 標頭或 JSON 本文 `{"keys": [...]}` 列出的鍵，
+  可直接作為 API 的 `PURGE_URL`
+- `GET /__stats`：命中、未命中、清除次數
+
+用法:
+    python benchmarks/cdnproxy.py --upstream http://127.0.0.1:8000 --port 8080
+"""
+import argparse
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, NamedTuple, Optional, Set, Tuple
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "content-length", "content-encoding"}
+EDGE_HEADERS = {"surrogate-key", "surrogate-control"}
+MAX_AGE = re.compile(r"(?:^|,)\s*(s-maxage|max-age)=(\d+)")
+
+
+class Entry(NamedTuple):
+    status: int
+    headers: Tuple[Tuple[str, str], ...]
+    body: bytes
+    expires: float
+    keys: Tuple[str, ...]
+
+
+def ttl(headers: httpx.Headers) -> Optional[int]:
+    """回應可保存的秒數，不可保存時回傳 None。"""
+    surrogate = headers.get("surrogate-control")
+    if surrogate:
+        values = dict(MAX_AGE.findall(surrogate))
+        if "max-age" in values:
+            return int(values["max-age"])
+    cache_control = headers.get("cache-control", "")
+    if any(directive in cache_control for directive in ("no-store", "no-cache", "private")):
+        return None
+    values = dict(MAX_AGE.findall(cache_control))
+    value = values.get("s-maxage", values.get("max-age"))
+    return int(value) if value else None
+
+
+def create_proxy(upstream: str) -> Starlette:
+    cache: Dict[Tuple[str, str], Entry] = {}
+    tagged: Dict[str, Set[Tuple[str, str]]] = {}
+    stats = {"hits": 0, "misses": 0, "bypass": 0, "purges": 0, "purged": 0}
+    client = httpx.AsyncClient(base_url=upstream, timeout=60)
+
+    async def purge(request: Request):
+        keys = request.headers.get("surrogate-key", "").split()
+        if not keys and request.headers.get("content-type", "").startswith("application/json"):
+            keys = (await request.json()).get("keys", [])
+        purged = 0
+        for key in keys:
+            for cache_key in tagged.pop(key, ()):
+                if cache.pop(cache_key, None) is not None:
+                    purged += 1
+        stats["purges"] += 1
+        stats["purged"] += purged
+        return JSONResponse({"purged": purged})
+
+    async def get_stats(request: Request):
+        return JSONResponse(dict(stats, entries=len(cache)))
+
+    async def forward(request: Request):
+        path = request.url.path + (f"?{request.url.query}" if request.url.query else "")
+        cache_key = (path, request.headers.get("accept", ""))
+        if request.method == "GET":
+            entry = cache.get(cache_key)
+            if entry is not None and entry.expires > time.monotonic():
+                stats["hits"] += 1
+                return Response(entry.body, status_code=entry.status,
+                                headers=dict(entry.headers, **{"X-Cache": "HIT"}))
+
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in ("host", "content-length")}
+        upstream_response = await client.request(request.method, path, headers=headers, content=await request.body())
+        response_headers = tuple(
+            (k, v) for k, v in upstream_response.headers.items() if k.lower() not in HOP_HEADERS | EDGE_HEADERS
+        )
+        seconds = ttl(upstream_response.headers) if request.method == "GET" else None
+        if seconds and upstream_response.status_code == 200:
+            stats["misses"] += 1
+            keys = tuple(upstream_response.headers.get("surrogate-key", "").split())
+            cache[cache_key] = Entry(200, response_headers, upstream_response.content,
+                                     time.monotonic() + seconds, keys)
+            for key in keys:
+                tagged.setdefault(key, set()).add(cache_key)
+            cache_status = "MISS"
+        else:
+            stats["bypass"] += 1
+            cache_status = "BYPASS"
+        return Response(upstream_response.content, status_code=upstream_response.status_code,
+                        headers=dict(response_headers, **{"X-Cache": cache_status}))
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await client.aclose()
+
+    return Starlette(routes=[
+        Route("/__purge", purge, methods=["POST"]),
+        Route("/__stats", get_stats, methods=["GET"]),
+        Route("/{path:path}", forward, methods=["GET", "POST"]),
+    ], lifespan=lifespan)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本機測試用的快取反向代理 (CDN 替身)")
+    parser.add_argument("--upstream", type=str, required=True, help="API 位址，例如 http://127.0.0.1:8000")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    uvicorn.run(create_proxy(args.upstream), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
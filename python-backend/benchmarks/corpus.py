@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+合成語料產生器，用於在接近正式環境的資料量下測試讀取 / 寫入路徑與查詢計畫。
+
+以固定亂數種子產生 `Word` (含發音、定義、例句、動詞變化) 與 `Entry` / `Choice`
+(與正式題庫相同格式：題目為「序號. 中文意思」、答案為「字母. 單字」、每 10 題共用一組選項)，
+每個 (part, topic) 使用獨立的亂數序列，因此任何子集合或平行產生的結果都與整批產生一致。
+
+輸出方式：
+- `--db PATH`：先執行遷移，再以原生 sqlite3 批次寫入資料庫檔案
+- `--training DIR`：輸出 `DIR/<part>/<topic>.json` 單字檔 (與 `manual_insert_word/training` 相同結構，
+  並已包含完整的發音 / 定義欄位)
+- `--practices DIR`：輸出 `DIR/<part>/<topic>.json` 練習題檔 (`/add-practices` 的請求格式)
+
+用法:
+    python benchmarks/corpus.py --parts 50 --topics 20 --words 5000 --entries 200 --db /tmp/big.db
+    python benchmarks/corpus.py --parts 2 --topics 3 --words 100 --training /tmp/training --practices /tmp/practices
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import time
+from typing import Dict, Iterator, List, Tuple
+
+ONSETS = ("b", "c", "d", "f", "g", "h", "l", "m", "n", "p", "r", "s", "t", "v", "br", "cl", "dr", "gr", "pl",
+          "pr", "sh", "st", "tr", "th")
+VOWELS = ("a", "e", "i", "o", "u", "ai", "ea", "io", "ou")
+CODAS = ("", "", "n", "r", "s", "t", "l", "m", "ct", "nd", "st")
+SUFFIXES = ("", "", "", "tion", "ment", "ity", "ous", "ive", "al", "ize", "ness", "ance")
+POS = ("n", "v", "adj", "adv")
+HANZI = "的一是在不了有和人這中大為上個國我以要他時來用們生到作地於出就分對成會可主發年動同工也能下過子說產種面而方後多定行學法所民得經"
+LANGS = ("uk", "us")
+CHOICE_LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+Corpus = Tuple[int, str, List[dict], Dict[str, dict]]
+
+
+def make_word_name(rng: random.Random) -> str:
+    syllables = "".join(rng.choice(ONSETS) + rng.choice(VOWELS) + rng.choice(CODAS)
+                        for _ in range(rng.randint(1, 3)))
+    return syllables + rng.choice(SUFFIXES)
+
+
+def make_meaning(rng: random.Random) -> str:
+    return "".join(rng.choice(HANZI) for _ in range(rng.randint(2, 6)))
+
+
+def make_sentence(rng: random.Random, word: str) -> str:
+    filler = [make_word_name(rng) for _ in range(rng.randint(4, 12))]
+    filler.insert(rng.randrange(len(filler) + 1), word)
+    return " ".join(filler).capitalize() + "."
+
+
+def make_word(rng: random.Random, part: int, topic: str, word: str) -> dict:
+    """產生一筆 `/add-words` 格式的單字。"""
+    pos = rng.choice(POS)
+    meaning = make_meaning(rng)
+    return {
+        "part": part,
+        "topic": topic,
+        "word": word,
+        "pos": pos,
+        "meaning": meaning,
+        "pronunciations": [
+            {"pos": pos, "lang": lang, "url": f"https://audio.example.com/{lang}/{word}.mp3", "pron": f"/{word}/"}
+            for lang in LANGS
+        ],
+        "definitions": [
+            {
+                "pos": rng.choice(POS),
+                "definition": " ".join(make_word_name(rng) for _ in range(rng.randint(5, 15))),
+                "translation": make_meaning(rng) if i else meaning,
+                "examples": [
+                    {"text": make_sentence(rng, word), "translation": make_meaning(rng) * 2}
+                    for _ in range(rng.randint(0, 3))
+                ]
+            }
+            for i in range(rng.randint(1, 4))
+        ],
+        "verbs": [
+            {"type": form, "text": word + suffix}
+            for form, suffix in (("past", "ed"), ("past participle", "ed"), ("present participle", "ing"))
+        ] if pos == "v" else []
+    }
+
+
+def make_practices(rng: random.Random, part: int, topic: str, words: List[dict], count: int,
+                   choices: int = 10) -> Dict[str, dict]:
+    """產生 `/add-practices` 格式的練習題，每 `choices` 題共用同一組選項。"""
+    practices = {}
+    group: List[dict] = []
+    for i in range(count):
+        if i % choices == 0:
+            group = rng.sample(words, min(choices, len(words)))
+        answer = rng.randrange(len(group))
+        entry_id = f"entry.{part}-{topic}-{i:06d}"
+        practices[entry_id] = {
+            "question": f"{i % choices + 1}. {group[answer]['meaning']}",
+            "answer": f"{CHOICE_LETTERS[answer]}. {group[answer]['word']}",
+            "choices": [f"{CHOICE_LETTERS[j]}: {w['word']}" for j, w in enumerate(group)]
+        }
+    return practices
+
+
+def topic_name(index: int) -> str:
+    return f"topic-{index:03d}"
+
+
+def generate_topic(seed: int, part: int, topic: str, words: int, entries: int, choices: int = 10) -> Corpus:
+    rng = random.Random(f"{seed}:{part}:{topic}")
+    names = set()
+    while len(names) < words:
+        name = make_word_name(rng)
+        # 音節組合耗盡時加上數字以保證 (part, topic, word) 唯一
+        names.add(name if name not in names else f"{name}{len(names)}")
+    word_list = [make_word(rng, part, topic, name) for name in sorted(names)]
+    practices = make_practices(rng, part, topic, word_list, entries, choices) if word_list else {}
+    return part, topic, word_list, practices
+
+
+def _generate(args) -> Corpus:
+    return generate_topic(*args)
+
+
+def iter_corpus(parts: int, topics: int, words: int, entries: int, seed: int = 42, choices: int = 10,
+                jobs: int = 1) -> Iterator[Corpus]:
+    """依 (part, topic) 順序產生語料，`jobs > 1` 時以多進程平行產生。"""
+    tasks = [(seed, part, topic_name(t), words, entries, choices)
+             for part in range(1, parts + 1) for t in range(topics)]
+    if jobs <= 1:
+        yield from map(_generate, tasks)
+        return
+    with multiprocessing.get_context("spawn").Pool(jobs) as pool:
+        yield from pool.imap(_generate, tasks, chunksize=1)
+
+
+def question_hash(question: str) -> int:
+    """與 `/add-practices` 相同的題目雜湊。"""
+    return int(hashlib.sha256(question.encode()).hexdigest()[:8], 16)
+
+
+def word_row(word: dict) -> tuple:
+    return (
+        word["part"], word["topic"], word["word"], word["pos"], word["meaning"],
+        json.dumps(word["pronunciations"], ensure_ascii=False),
+        json.dumps(word["definitions"], ensure_ascii=False),
+        json.dumps(word["verbs"], ensure_ascii=False),
+    )
+
+
+def migrate_db(path: str):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+    import database
+    import migrate
+
+    engine = database.init_engine(f"sqlite:///{os.path.abspath(path)}")
+    migrate.migrate(engine)
+    engine.dispose()
+
+
+def write_db(path: str, corpus: Iterator[Corpus]) -> Tuple[int, int]:
+    """
+    將語料寫入資料庫檔案 (會先執行遷移)，回傳 (單字數, 練習題數)。
+
+    每個 topic 一個交易；Entry 的主鍵由此處直接指定，以便 Choice 不需回查 id。
+    所有資料列都標記為同一個新版本，寫入完成後才將 `data_version` 更新為該版本，讓執行中的 API 捨棄快取。
+    """
+    migrate_db(path)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA foreign_keys=ON")
+    next_entry_id = (conn.execute("SELECT MAX(id) FROM entries").fetchone()[0] or 0) + 1
+    version = (conn.execute("SELECT MAX(version) FROM data_version").fetchone()[0] or 0) + 1
+    word_count = entry_count = 0
+    for part, topic, words, practices in corpus:
+        with conn:
+            conn.executemany(
+                "INSERT INTO words (part, topic, word, pos, meaning, pronunciations, definitions, verbs, version) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (word_row(word) + (version,) for word in words)
+            )
+            entry_rows = []
+            choice_rows = []
+            for entry_id, entry in practices.items():
+                entry_rows.append((next_entry_id, entry_id, entry["question"], question_hash(entry["question"]),
+                                   entry["answer"], topic, part, version))
+                choice_rows.extend(
+                    (next_entry_id, choice.split(": ", 1)[-1], order)
+                    for order, choice in enumerate(entry["choices"], start=1)
+                )
+                next_entry_id += 1
+            conn.executemany(
+                "INSERT INTO entries (id, entry_id, question, question_hash, answer, topic, part, version) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                entry_rows
+            )
+            conn.executemany("INSERT INTO choices (entry_id, choice_text, choice_order) VALUES (?, ?, ?)", choice_rows)
+        word_count += len(words)
+        entry_count += len(practices)
+    with conn:
+        conn.execute("INSERT INTO data_version (id, version) VALUES (1, ?) "
+                     "ON CONFLICT (id) DO UPDATE SET version = MAX(version + 1, excluded.version)", (version,))
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return word_count, entry_count
+
+
+def write_json(directory: str, part: int, topic: str, data):
+    part_dir = os.path.join(directory, str(part))
+    os.makedirs(part_dir, exist_ok=True)
+    with open(os.path.join(part_dir, f"{topic}.json"), "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合成語料產生器")
+    parser.add_argument("--parts", type=int, default=50, help="part 數")
+    parser.add_argument("--topics", type=int, default=20, help="每個 part 的 topic 數")
+    parser.add_argument("--words", type=int, default=5000, help="每個 topic 的單字數")
+    parser.add_argument("--entries", type=int, default=200, help="每個 topic 的練習題數")
+    parser.add_argument("--choices", type=int, default=10, help="每題的選項數")
+    parser.add_argument("--seed", type=int, default=42, help="亂數種子")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="平行產生的進程數")
+    parser.add_argument("--db", type=str, default=None, help="寫入的資料庫檔案路徑")
+    parser.add_argument("--training", type=str, default=None, help="輸出單字 JSON 的目錄 (<part>/<topic>.json)")
+    parser.add_argument("--practices", type=str, default=None, help="輸出練習題 JSON 的目錄 (<part>/<topic>.json)")
+    args = parser.parse_args()
+
+    if not (args.db or args.training or args.practices):
+        parser.error("請至少指定 --db、--training 或 --practices 其中之一")
+    if not 1 <= args.choices <= len(CHOICE_LETTERS):
+        parser.error(f"--choices 必須介於 1 與 {len(CHOICE_LETTERS)} 之間")
+
+    started = time.perf_counter()
+    corpus = iter_corpus(args.parts, args.topics, args.words, args.entries, args.seed, args.choices, args.jobs)
+
+    def tee(items: Iterator[Corpus]) -> Iterator[Corpus]:
+        for part, topic, words, practices in items:
+            if args.training:
+                write_json(args.training, part, topic, [
+                    {k: v for k, v in word.items() if k not in ("part", "topic")} for word in words
+                ])
+            if args.practices and practices:
+                write_json(args.practices, part, topic, practices)
+            yield part, topic, words, practices
+
+    if args.db:
+        word_count, entry_count = write_db(args.db, tee(corpus))
+    else:
+        word_count = entry_count = 0
+        for _, _, words, practices in tee(corpus):
+            word_count += len(words)
+            entry_count += len(practices)
+
+    elapsed = time.perf_counter() - started
+    print(f"已產生 {args.parts * args.topics} 個 topic、{word_count} 個單字、{entry_count} 題練習題 ({elapsed:.1f}s)")
+    if args.db:
+        print(f"資料庫: {args.db} ({os.path.getsize(args.db) / 1024 / 1024:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
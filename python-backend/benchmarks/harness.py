@@ -0,0 +1,89 @@
+"""
+基準測試共用工具：在暫存目錄中啟動 / 停止 API 伺服器、百分位數計算。
+"""
+import http.client
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Sequence
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(BASE_DIR, "backend")
+BEARER_TOKEN = "bench"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def migrate(workdir: str):
+    """在 workdir 中對 data.db 執行資料庫結構遷移。"""
+    subprocess.run([sys.executable, os.path.join(BACKEND_DIR, "migrate.py")], cwd=workdir,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+
+
+def start_server(
+        workdir: str,
+        port: int,
+        args: Sequence[str] = (),
+        env: Optional[Dict[str, str]] = None,
+        timeout: float = 60.0,
+        quiet: bool = True
+) -> subprocess.Popen:
+    """以 workdir 為工作目錄 (即使用其中的 data.db) 啟動 backend/app.py，並等待 /heartbeat 就緒。"""
+    server_env = dict(os.environ, HOST="127.0.0.1", PORT=str(port), BEARER_TOKEN=BEARER_TOKEN)
+    server_env.update(env or {})
+    output = subprocess.DEVNULL if quiet else None
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "app.py"), "--log-file", os.path.join(workdir, "api.log"), *args],
+        cwd=workdir, env=server_env,
+        stdout=output, stderr=output,
+        preexec_fn=os.setsid
+    )
+    if not wait_ready(port, timeout, process):
+        stop_server(process)
+        raise RuntimeError(f"伺服器未能在 {timeout} 秒內啟動，請查看 {workdir}/api.log")
+    return process
+
+
+def wait_ready(port: int, timeout: float, process: Optional[subprocess.Popen] = None, path: str = "/heartbeat") -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            return False
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", path)
+            status = conn.getresponse().status
+            conn.close()
+            if status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.01)
+    return False
+
+
+def stop_server(process: subprocess.Popen):
+    if process.poll() is not None:
+        return
+    os.killpg(os.getpgid(process.pid), signal.SIGTERM)
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        os.killpg(os.getpgid(process.pid), signal.SIGKILL)
+        process.wait()
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """最近秩 (nearest-rank) 百分位數，samples 為空時回傳 0。"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+後端 API 負載與延遲基準測試。
+
+流程：
+1. 在暫存目錄建立空資料庫並執行 `migrate.py`
+2. 啟動 `backend/app.py` (可指定 worker 數)
+3. 透過 `/add-words`、`/add-practices` 灌入 `corpus.py` 以固定亂數種子產生的資料；
+   或以 `--db` 直接使用 `corpus.py --db` 預先產生的大型資料庫
+4. 以可設定的並行數與請求組合對 `/words`、`/practice/{part}/{topic}`、`/topics`、`/parts`
+   與管理端 POST 施壓，回報每個端點的吞吐量與 p50 / p95 / p99 延遲
+5. 結果寫成 JSON，可用 `--compare` 與另一次 (例如前一個 commit) 的結果比較
+
+用法:
+    python benchmarks/loadtest.py --concurrency 64 --duration 30 --output results.json
+    python benchmarks/loadtest.py --compare baseline.json --output results.json
+    python benchmarks/loadtest.py --mix words_topic=60,practice=40 --workers 4
+    python benchmarks/loadtest.py --db /tmp/big.db --duration 60
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Tuple
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import corpus  # noqa: E402
+import harness  # noqa: E402
+
+DEFAULT_MIX = "words_topic=40,practice=30,topics=10,parts=10,words_part=5,add_words=3,add_practices=2"
+ENDPOINTS = ("words_topic", "words_part", "words_all", "practice", "topics", "parts", "add_words", "add_practices")
+
+
+def seed_via_api(base_url: str, items: Iterator[corpus.Corpus], chunk: int = 500) -> List[Tuple[int, str]]:
+    """透過管理端 API 灌入語料，回傳 (part, topic) 清單。"""
+    headers = {"Authorization": f"Bearer {harness.BEARER_TOKEN}"}
+    keys = []
+    with httpx.Client(base_url=base_url, headers=headers, timeout=120) as client:
+        for part, topic, words, practices in items:
+            for i in range(0, len(words), chunk):
+                response = client.post("/add-words", json={"words": words[i:i + chunk]})
+                response.raise_for_status()
+            if practices:
+                response = client.post("/add-practices", params={"part": part, "topic": topic}, json=practices)
+                response.raise_for_status()
+            keys.append((part, topic))
+    return keys
+
+
+def read_keys(db_path: str) -> List[Tuple[int, str]]:
+    """取得既有資料庫中同時有單字與練習題的 (part, topic)。"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return conn.execute(
+            "SELECT DISTINCT part, topic FROM words INTERSECT SELECT DISTINCT part, topic FROM entries"
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise SystemExit(f"未知的端點 '{name}'，可用: {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Client:
+    """單一客戶端進程內的虛擬使用者群。"""
+
+    def __init__(self, index: int, base_url: str, keys: List[Tuple[int, str]], mix: Dict[str, float], seed: int,
+                 run_id: str):
+        self.index = index
+        self.run_id = run_id
+        self.base_url = base_url
+        self.keys = keys
+        self.parts = sorted({part for part, _ in keys})
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.rng = random.Random(seed * 1000 + index)
+        self.counter = 0
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def unique_name(self) -> str:
+        """寫入請求使用的唯一名稱，含本次執行的 id，重複使用同一資料庫也不會 409。"""
+        return f"lt{self.run_id}x{self.index}x{self.counter}"
+
+    def next_request(self) -> Tuple[str, str, str, dict]:
+        name = self.rng.choices(self.names, self.weights)[0]
+        part, topic = self.rng.choice(self.keys)
+        self.counter += 1
+        if name == "words_topic":
+            return name, "GET", "/words", {"params": {"part": part, "topic": topic}}
+        if name == "words_part":
+            return name, "GET", "/words", {"params": {"part": self.rng.choice(self.parts)}}
+        if name == "words_all":
+            return name, "GET", "/words", {}
+        if name == "practice":
+            return name, "GET", f"/practice/{part}/{topic}", {}
+        if name == "topics":
+            return name, "GET", "/topics", {"params": {"part": self.rng.choice(self.parts)}}
+        if name == "parts":
+            return name, "GET", "/parts", {}
+        if name == "add_words":
+            word = corpus.make_word(self.rng, part, topic, self.unique_name())
+            return name, "POST", "/add-words", {"json": {"words": [word]}}
+        words = [corpus.make_word(self.rng, part, topic, f"{self.unique_name()}{c}") for c in "abcd"]
+        practices = corpus.make_practices(self.rng, part, topic, words, 1, len(words))
+        practices = {f"entry.{self.unique_name()}": entry for entry in practices.values()}
+        return name, "POST", "/add-practices", {"params": {"part": part, "topic": topic}, "json": practices}
+
+    async def user(self, client: httpx.AsyncClient, deadline: float, budget: List[int]):
+        while time.monotonic() < deadline and budget[0] != 0:
+            budget[0] -= 1
+            name, method, path, kwargs = self.next_request()
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                elapsed = (time.perf_counter() - started) * 1000
+                if response.status_code == 200:
+                    self.latencies[name].append(elapsed)
+                else:
+                    self.errors[name] += 1
+            except httpx.HTTPError:
+                self.errors[name] += 1
+
+    async def run(self, concurrency: int, duration: float, requests: int):
+        headers = {"Authorization": f"Bearer {harness.BEARER_TOKEN}"}
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        budget = [requests if requests > 0 else -1]
+        deadline = time.monotonic() + duration
+        async with httpx.AsyncClient(base_url=self.base_url, headers=headers, limits=limits, timeout=30) as client:
+            await asyncio.gather(*(self.user(client, deadline, budget) for _ in range(concurrency)))
+
+
+def client_process(args):
+    index, base_url, keys, mix, seed, run_id, concurrency, duration, requests = args
+    client = Client(index, base_url, keys, mix, seed, run_id)
+    started = time.perf_counter()
+    asyncio.run(client.run(concurrency, duration, requests))
+    return dict(client.latencies), dict(client.errors), time.perf_counter() - started
+
+
+def run_load(base_url, keys, mix, seed, procs, concurrency, duration, requests):
+    per_proc = max(1, concurrency // procs)
+    per_proc_requests = requests // procs if requests > 0 else 0
+    run_id = f"{int(time.time() * 1000) % 10 ** 10:x}"
+    jobs = [(i, base_url, keys, mix, seed, run_id, per_proc, duration, per_proc_requests) for i in range(procs)]
+    with multiprocessing.get_context("spawn").Pool(procs) as pool:
+        outputs = pool.map(client_process, jobs)
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    for proc_latencies, proc_errors, _ in outputs:
+        for name, samples in proc_latencies.items():
+            latencies[name].extend(samples)
+        for name, count in proc_errors.items():
+            errors[name] += count
+    wall = max(output[2] for output in outputs)
+    return latencies, errors, wall
+
+
+def summarize(samples: List[float], errors: int, wall: float) -> dict:
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / wall, 1) if wall else 0.0,
+        "mean_ms": round(sum(samples) / len(samples), 3) if samples else 0.0,
+        "p50_ms": round(harness.percentile(samples, 50), 3),
+        "p95_ms": round(harness.percentile(samples, 95), 3),
+        "p99_ms": round(harness.percentile(samples, 99), 3),
+        "max_ms": round(max(samples), 3) if samples else 0.0,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=harness.BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(results: dict):
+    print(f"{'端點':<16}{'請求數':>9}{'錯誤':>7}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, row in list(results["endpoints"].items()) + [("total", results["total"])]:
+        print(f"{name:<16}{row['count']:>9}{row['errors']:>7}{row['rps']:>10.1f}"
+              f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}")
+
+
+def print_comparison(results: dict, baseline: dict):
+    print(f"\n與 {baseline['meta'].get('commit', '?')} 比較 (正值代表變慢 / 吞吐量下降):")
+    print(f"{'端點':<16}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    rows = dict(results["endpoints"], total=results["total"])
+    base_rows = dict(baseline["endpoints"], total=baseline["total"])
+    for name, row in rows.items():
+        base = base_rows.get(name)
+        if not base:
+            continue
+
+        def delta(key, invert=False):
+            if not base[key]:
+                return "     n/a"
+            change = (row[key] - base[key]) / base[key] * 100
+            return f"{-change if invert else change:+9.1f}%"
+
+        print(f"{name:<16}{delta('rps', invert=True)}{delta('p50_ms')}{delta('p95_ms')}{delta('p99_ms')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="後端 API 負載與延遲基準測試")
+    parser.add_argument("--parts", type=int, default=5, help="產生的 part 數")
+    parser.add_argument("--topics", type=int, default=4, help="每個 part 的 topic 數")
+    parser.add_argument("--words", type=int, default=200, help="每個 topic 的單字數")
+    parser.add_argument("--entries", type=int, default=40, help="每個 topic 的練習題數")
+    parser.add_argument("--seed", type=int, default=42, help="亂數種子")
+    parser.add_argument("--mix", type=str, default=DEFAULT_MIX, help="請求組合，格式 name=weight,...")
+    parser.add_argument("--concurrency", type=int, default=32, help="總並行連線數")
+    parser.add_argument("--procs", type=int, default=max(1, min(4, (os.cpu_count() or 1) // 2)), help="客戶端進程數")
+    parser.add_argument("--duration", type=float, default=20.0, help="施壓秒數")
+    parser.add_argument("--requests", type=int, default=0, help="總請求數上限 (0 表示只依時間)")
+    parser.add_argument("--warmup", type=float, default=3.0, help="施壓前的暖機秒數")
+    parser.add_argument("--db", type=str, default=None,
+                        help="使用既有的資料庫檔案 (例如 corpus.py --db 的輸出)，不再透過 API 灌入資料；寫入請求會修改此檔案")
+    parser.add_argument("--workers", type=int, default=1, help="API worker 數")
+    parser.add_argument("--output", type=str, default=None, help="將結果寫入 JSON 檔")
+    parser.add_argument("--compare", type=str, default=None, help="與先前的結果 JSON 比較")
+    parser.add_argument("--keep", action="store_true", help="保留暫存目錄 (資料庫與 api.log)")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    server_args = ["--workers", str(args.workers)]
+    # 所有模擬用戶端都來自 127.0.0.1，停用每個用戶端的頻率限制 (並行上限與等待佇列仍然有效)
+    env = {"WORDS_RATE_LIMIT": "0"}
+    if args.db:
+        keys = read_keys(args.db)
+        if not keys:
+            raise SystemExit(f"{args.db} 中沒有同時包含單字與練習題的 topic")
+        env["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+        server_args.append("--migrate")
+    else:
+        harness.migrate(workdir)
+    port = harness.free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    process = harness.start_server(workdir, port, server_args, env=env)
+    try:
+        if args.db:
+            print(f"使用既有資料庫 {args.db}，共 {len(keys)} 個 topic")
+        else:
+            started = time.perf_counter()
+            keys = seed_via_api(base_url, corpus.iter_corpus(args.parts, args.topics, args.words, args.entries,
+                                                             args.seed))
+            print(f"已灌入 {len(keys)} 個 topic、{len(keys) * args.words} 個單字、{len(keys) * args.entries} 題練習題 "
+                  f"({time.perf_counter() - started:.1f}s)")
+
+        if args.warmup > 0:
+            run_load(base_url, keys, mix, args.seed + 1, args.procs, args.concurrency, args.warmup, 0)
+        latencies, errors, wall = run_load(
+            base_url, keys, mix, args.seed, args.procs, args.concurrency, args.duration, args.requests
+        )
+    finally:
+        harness.stop_server(process)
+        if args.keep:
+            print(f"暫存目錄: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    all_samples = [s for samples in latencies.values() for s in samples]
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "keep")},
+            "wall_seconds": round(wall, 3),
+        },
+        "endpoints": {
+            name: summarize(latencies.get(name, []), errors.get(name, 0), wall)
+            for name in mix
+        },
+        "total": summarize(all_samples, sum(errors.values()), wall),
+    }
+
+    print_report(results)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(results, json.load(f))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n結果已寫入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
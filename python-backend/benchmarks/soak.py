@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+長時間浸泡測試 (soak test)：持續施壓數小時 (或指定的請求數)，定期取樣資源用量並找出單調增長。
+
+流程：
+1. 以 `corpus.py` 產生資料庫 (或以 `--db` 使用既有的資料庫)，啟動 `backend/app.py`
+2. 背景以 `loadtest.py` 的請求組合 (含管理端寫入) 持續施壓
+3. 每 `--interval` 秒取樣：
+   - 由 `/proc/<pid>` 讀取 API 主進程與各 worker 的 RSS、開啟的檔案描述子數
+   - 由 `/metrics` 讀取 GC 追蹤的物件數、SQLAlchemy 連線池狀態、讀取快取筆數與 GC 次數
+4. 捨棄前 `--settle` 比例的樣本 (啟動、快取填滿) 後，將其餘樣本均分為 5 段比較平均值；
+   各段平均值不曾下降且總增長超過 `--growth-threshold` % 的數列標記為「持續增長」
+
+只支援 Linux (`/proc`)。多 worker 時 `/metrics` 每次只取樣到處理該請求的 worker，數列依 pid 分開。
+
+用法:
+    python benchmarks/soak.py --duration 3600 --interval 10 --output soak.json
+    python benchmarks/soak.py --requests 200000 --workers 2
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import corpus  # noqa: E402
+import harness  # noqa: E402
+import loadtest  # noqa: E402
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+METRIC_LINE = re.compile(r"^(\w+)\{(.*)\} (\S+)$")
+# 只分析應趨於穩定的數值；計數器 (GC 次數) 與讀取快取筆數 (填滿前必然增長) 只記錄不判定
+ANALYZED_METRICS = ("quiz_gc_objects", "quiz_db_pool_connections")
+RECORDED_METRICS = ANALYZED_METRICS + ("quiz_read_cache_entries", "quiz_gc_collections_total")
+WINDOWS = 5
+
+
+def process_tree(pid: int) -> List[int]:
+    """API 主進程與其子進程 (worker)。"""
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # 第 2 欄 (程序名稱) 可能含空白，從最後一個 ')' 之後開始解析
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return [pid] + sorted(children)
+
+
+def sample_process(pid: int) -> Dict[str, float]:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            rss = int(f.read().split()[1]) * PAGE_SIZE
+        fds = len(os.listdir(f"/proc/{pid}/fd"))
+    except OSError:
+        return {}
+    return {f"rss_bytes@{pid}": rss, f"open_fds@{pid}": fds}
+
+
+def sample_metrics(client: httpx.Client) -> Dict[str, float]:
+    """讀取 /metrics 中需要的數值，鍵為 `名稱{去掉 pid 的標籤}@pid`。"""
+    try:
+        text = client.get("/metrics").text
+    except httpx.HTTPError:
+        return {}
+    samples = {}
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if not match or match.group(1) not in RECORDED_METRICS:
+            continue
+        name, label_text, value = match.groups()
+        pairs = [pair for pair in label_text.split(",") if not pair.startswith("pid=")]
+        pid = re.search(r'pid="(\d+)"', label_text).group(1)
+        series = f"{name}{{{','.join(pairs)}}}" if pairs else name
+        samples[f"{series}@{pid}"] = float(value)
+    return samples
+
+
+def analyze(times: List[float], values: List[float], settle: float, threshold: float) -> dict:
+    """捨棄前段樣本後，比較各段平均值並以最小平方法估計每小時的增長量。"""
+    skip = int(len(values) * settle)
+    times, values = times[skip:], values[skip:]
+    if len(values) < WINDOWS:
+        return {"samples": len(values), "growing": False}
+    size = len(values) / WINDOWS
+    means = [
+        sum(values[int(i * size):int((i + 1) * size)]) / len(values[int(i * size):int((i + 1) * size)])
+        for i in range(WINDOWS)
+    ]
+    mean_t, mean_v = sum(times) / len(times), sum(values) / len(values)
+    variance = sum((t - mean_t) ** 2 for t in times)
+    slope = sum((t - mean_t) * (v - mean_v) for t, v in zip(times, values)) / variance if variance else 0.0
+    growth = means[-1] - means[0]
+    growth_pct = growth / means[0] * 100 if means[0] else (100.0 if growth > 0 else 0.0)
+    monotonic = all(later >= earlier for earlier, later in zip(means, means[1:]))
+    return {
+        "samples": len(values),
+        "first": means[0],
+        "last": means[-1],
+        "growth_pct": round(growth_pct, 2),
+        "slope_per_hour": round(slope * 3600, 3),
+        "growing": monotonic and growth > 0 and growth_pct >= threshold,
+    }
+
+
+def format_value(series: str, value: float) -> str:
+    if series.startswith("rss_bytes"):
+        return f"{value / 1024 / 1024:.1f} MiB"
+    return f"{value:.0f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="長時間浸泡測試：資源用量取樣與洩漏偵測")
+    parser.add_argument("--parts", type=int, default=5, help="產生的 part 數")
+    parser.add_argument("--topics", type=int, default=4, help="每個 part 的 topic 數")
+    parser.add_argument("--words", type=int, default=200, help="每個 topic 的單字數")
+    parser.add_argument("--entries", type=int, default=40, help="每個 topic 的練習題數")
+    parser.add_argument("--seed", type=int, default=42, help="亂數種子")
+    parser.add_argument("--db", type=str, default=None, help="使用既有的資料庫檔案 (寫入請求會修改此檔案)")
+    parser.add_argument("--mix", type=str, default=loadtest.DEFAULT_MIX, help="請求組合，格式 name=weight,...")
+    parser.add_argument("--concurrency", type=int, default=16, help="總並行連線數")
+    parser.add_argument("--procs", type=int, default=1, help="客戶端進程數")
+    parser.add_argument("--duration", type=float, default=3600.0, help="施壓秒數")
+    parser.add_argument("--requests", type=int, default=0, help="總請求數上限 (設定時不限時間)")
+    parser.add_argument("--interval", type=float, default=10.0, help="取樣間隔秒數")
+    parser.add_argument("--settle", type=float, default=0.2, help="不列入判定的前段樣本比例")
+    parser.add_argument("--growth-threshold", type=float, default=5.0, help="標記為持續增長的最小增幅 (%%)")
+    parser.add_argument("--workers", type=int, default=1, help="API worker 數")
+    parser.add_argument("--output", type=str, default=None, help="將樣本與報告寫入 JSON 檔")
+    parser.add_argument("--fail-on-growth", action="store_true", help="有持續增長的數列時以狀態碼 1 結束")
+    args = parser.parse_args()
+
+    if not os.path.isdir("/proc/self/fd"):
+        raise SystemExit("soak.py 需要 Linux 的 /proc")
+    mix = loadtest.parse_mix(args.mix)
+    workdir = tempfile.mkdtemp(prefix="soak-")
+    env = {"WORDS_RATE_LIMIT": "0"}
+    if args.db:
+        keys = loadtest.read_keys(args.db)
+        env["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+    else:
+        corpus.write_db(os.path.join(workdir, "data.db"),
+                        corpus.iter_corpus(args.parts, args.topics, args.words, args.entries, args.seed))
+        keys = loadtest.read_keys(os.path.join(workdir, "data.db"))
+    if not keys:
+        raise SystemExit("資料庫中沒有同時包含單字與練習題的 topic")
+
+    port = harness.free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    process = harness.start_server(workdir, port, ["--workers", str(args.workers), "--migrate"], env=env)
+    duration = args.duration if args.requests <= 0 else float("inf")
+    load_result = {}
+
+    def drive():
+        load_result["latencies"], load_result["errors"], load_result["wall"] = loadtest.run_load(
+            base_url, keys, mix, args.seed, args.procs, args.concurrency, duration, args.requests
+        )
+
+    samples: Dict[str, List[Tuple[float, float]]] = defaultdict(list)
+    load = threading.Thread(target=drive, daemon=True)
+    started = time.monotonic()
+    try:
+        load.start()
+        with httpx.Client(base_url=base_url, timeout=30) as client:
+            while True:
+                elapsed = time.monotonic() - started
+                values = {}
+                for pid in process_tree(process.pid):
+                    values.update(sample_process(pid))
+                values.update(sample_metrics(client))
+                for series, value in values.items():
+                    samples[series].append((elapsed, value))
+                print(f"[{elapsed:7.0f}s] " + "  ".join(
+                    f"{series}={format_value(series, value)}" for series, value in sorted(values.items())
+                    if series.startswith(("rss_bytes", "open_fds"))
+                ), flush=True)
+                if not load.is_alive():
+                    break
+                load.join(args.interval)
+    finally:
+        harness.stop_server(process)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {}
+    for series, points in sorted(samples.items()):
+        # 閒置連線數會增長到連線池大小為止，不代表洩漏
+        if not series.startswith(("rss_bytes", "open_fds") + ANALYZED_METRICS) or 'state="checked_in"' in series:
+            continue
+        times, values = [t for t, _ in points], [v for _, v in points]
+        report[series] = analyze(times, values, args.settle, args.growth_threshold)
+
+    requests = sum(len(v) for v in load_result.get("latencies", {}).values())
+    errors = sum(load_result.get("errors", {}).values())
+    print(f"\n共 {requests} 個成功請求、{errors} 個錯誤，{time.monotonic() - started:.0f} 秒，"
+          f"每段 {len(next(iter(samples.values()), [])) * (1 - args.settle) / WINDOWS:.0f} 個樣本")
+    print(f"{'數列':<48} {'首段':>12} {'末段':>12} {'增幅':>8} {'每小時':>12}")
+    for series, result in report.items():
+        if "first" not in result:
+            print(f"{series:<48} 樣本不足 ({result['samples']})")
+            continue
+        flag = "  <- 持續增長" if result["growing"] else ""
+        print(f"{series:<48} {format_value(series, result['first']):>12} {format_value(series, result['last']):>12} "
+              f"{result['growth_pct']:>7.1f}% {format_value(series, result['slope_per_hour']):>12}{flag}")
+    growing = [series for series, result in report.items() if result["growing"]]
+    print("\n未發現持續增長的數列" if not growing else f"\n持續增長: {', '.join(growing)}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "commit": loadtest.git_commit(),
+                    "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "config": {k: v for k, v in vars(args).items() if k != "output"},
+                    "requests": requests,
+                    "errors": errors,
+                },
+                "report": report,
+                "samples": {series: points for series, points in samples.items()},
+            }, f, ensure_ascii=False, indent=2)
+        print(f"結果已寫入 {args.output}")
+    if growing and args.fail_on_growth:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
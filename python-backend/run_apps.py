@@ -47,6 +47,8 @@ def start_app(app_dir, app_name, tag, color, args):
     cmd = [sys.executable, "app.py"]
 
     # 添加命令列參數
+    if app_name == "API" and args.workers:
+        cmd.extend(["--workers", str(args.workers)])
     if app_name == "API" and args.api_args:
         cmd.extend(args.api_args.split())
     elif app_name == "爬蟲" and args.crawler_args:
@@ -79,6 +81,41 @@ def start_app(app_dir, app_name, tag, color, args):
         return None, None
 
 
+def run_migrations(api_dir):
+    """在啟動 API worker 之前執行一次資料庫結構遷移 (不含回填)，回傳是否成功"""
+    log("系統", "正在執行資料庫結構遷移...", Colors.SYSTEM)
+    result = subprocess.run(
+        [sys.executable, "migrate.py", "--no-backfill"],
+        cwd=api_dir,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT
+    )
+    for line in result.stdout.decode('utf-8', errors='replace').splitlines():
+        print(f"{Colors.API}[遷移] {line}{Colors.RESET}")
+
+    if result.returncode != 0:
+        log("系統", f"資料庫結構遷移失敗，返回代碼: {result.returncode}", Colors.ERROR)
+        return False
+    return True
+
+
+def start_backfill(api_dir):
+    """API 啟動後於背景執行待完成的資料回填；回填以短交易分批進行，中斷後下次啟動時由檢查點繼續"""
+    try:
+        process = subprocess.Popen(
+            [sys.executable, "migrate.py", "--backfill-only"],
+            cwd=api_dir,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            preexec_fn=os.setsid
+        )
+    except Exception as e:
+        log("系統", f"啟動資料回填時出錯: {str(e)}", Colors.ERROR)
+        return None
+    threading.Thread(target=stream_output, args=(process, "回填", Colors.API), daemon=True).start()
+    return process
+
+
 def stop_app(process, app_name):
     """停止應用程式"""
     if process and process.poll() is None:
@@ -101,11 +138,12 @@ def stop_app(process, app_name):
             log("系統", f"停止 {app_name} 時出錯: {str(e)}", Colors.ERROR)
 
 
-def handle_signals(api_process, crawler_process):
+def handle_signals(api_process, crawler_process, backfill_process):
     """處理終止信號"""
 
     def signal_handler(sig, frame):
         log("系統", "收到終止信號，正在關閉應用...", Colors.SYSTEM)
+        stop_app(backfill_process, "資料回填")
         stop_app(crawler_process, "爬蟲")
         stop_app(api_process, "API")
         log("系統", "所有應用已停止", Colors.SYSTEM)
@@ -122,6 +160,9 @@ def main():
     parser.add_argument("--crawler-only", action="store_true", help="僅啟動爬蟲服務")
     parser.add_argument("--api-args", type=str, help="傳遞給 API 應用的命令列參數")
     parser.add_argument("--crawler-args", type=str, help="傳遞給爬蟲應用的命令列參數")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="API worker 進程數 (預設為 CPU 核心數，設為 1 則以單一進程執行)")
+    parser.add_argument("--skip-migrate", action="store_true", help="啟動 API 前不執行資料庫結構遷移")
     args = parser.parse_args()
 
     # 定義目錄路徑
@@ -140,22 +181,30 @@ def main():
 
     api_process = None
     crawler_process = None
+    backfill_process = None
     api_thread = None
     crawler_thread = None
 
     try:
         log("系統", "正在啟動 NTUST 英簡單系統...", Colors.SYSTEM)
+        if not args.crawler_only:
+            log("系統", f"API worker 數量: {args.workers}", Colors.SYSTEM)
 
         # 啟動 API 服務
+        if not args.crawler_only and not args.skip_migrate:
+            if not run_migrations(api_dir):
+                return 1
         if not args.crawler_only:
             api_process, api_thread = start_app(api_dir, "API", "API", Colors.API, args)
+            if not args.skip_migrate:
+                backfill_process = start_backfill(api_dir)
 
         # 啟動爬蟲服務
         if not args.api_only:
             crawler_process, crawler_thread = start_app(crawler_dir, "爬蟲", "爬蟲", Colors.CRAWLER, args)
 
         # 設置信號處理
-        handle_signals(api_process, crawler_process)
+        handle_signals(api_process, crawler_process, backfill_process)
 
         # 保持主線程運行
         log("系統", "所有服務已啟動。按 Ctrl+C 停止...", Colors.SYSTEM)
@@ -191,6 +240,7 @@ def main():
         log("系統", f"發生未預期的錯誤: {str(e)}", Colors.ERROR)
     finally:
         # 確保所有進程在退出前停止
+        stop_app(backfill_process, "資料回填")
         stop_app(crawler_process, "爬蟲")
         stop_app(api_process, "API")
         log("系統", "所有服務已停止", Colors.SYSTEM)